@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+import logging
+
+from .workspaces import Workspaces
+
+class Capacities:
+    def __init__(self, client):
+        self.client = client
+        self.workspaces = Workspaces(client)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/capacities/groups-assign-to-capacity
+    async def set_workspace_capacity(self, workspace_name: str, capacity: str) -> None:
+        item = await self.workspaces.find_workspace(workspace_name)
+
+        if item is None:
+            raise RuntimeError(f"Unable to find workspace with name: '{workspace_name}'")
+
+        if 'capacityId' in item:
+            if item['capacityId'] == capacity:
+                logging.info(f"Workspace with id: {item['id']} is already assigned to capacity {capacity}.")
+                return item
+            logging.warning(f"Workspace with id: {item['id']} is assigned to the wrong capacity with id {item['capacityId']}. "
+            + f"Proceeding to assign capacity with id {capacity}.")
+        else:
+            logging.info(f"Workspace with id: {item['id']} is not assigned to capacity. Proceeding to assign capacity with id {capacity}.")
+
+        url = self.client.base_url + "groups/" + item['id'] + "/AssignToCapacity"
+
+        payload = {
+            "capacityId": capacity
+        }
+
+        response = await self.client.request_json("POST", url, expected_codes = [self.client.http_ok_code], data = payload, headers = self.client.url_encoded_headers)
+
+        logging.info(f"Successfully changed capacity of workspace {workspace_name} to {capacity}.")
+        self.client.name_cache.invalidate("groups")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/capacities/groups-capacity-assignment-status
+    async def get_workspace_capacity(self, workspace_name: str) -> None:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/CapacityAssignmentStatus"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info(f"Successfully retrieved capacity of workspace {workspace_name}.")
+        return response['capacityId']
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+import json
+
+from typing import List
+from ..utils.utils import Utils
+from .workspaces import Workspaces
+
+utils = Utils()
+
+class Dataflows:
+    def __init__(self, client):
+        self.client = client
+        self.workspaces = Workspaces(client)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflow-storage-accounts/get-dataflow-storage-accounts
+    async def get_dataflow_storage_accounts(self) -> List:
+        url = self.client.base_url + "dataflowStorageAccounts/"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved dataflow storage accounts.")
+        return response['value']
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/get-dataflows
+    async def get_dataflows(self, workspace_name: str) -> List:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/dataflows"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved dataflows.")
+        self.client.name_cache.set_listing(("dataflows", workspace_id), response['value'])
+        return response['value']
+
+    async def find_dataflow(self, workspace_name: str, dataflow_name: str) -> dict:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        return await self.client.lookup(("dataflows", workspace_id), dataflow_name, lambda: self.get_dataflows(workspace_name))
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/get-dataflow
+    async def get_dataflow(self, workspace_name: str, dataflow_name: str) -> List:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        dataflow = await self.find_dataflow(workspace_name, dataflow_name)
+
+        if dataflow is None:
+            logging.info('Dataflow with name: ' + dataflow_name + ' does not exist.')
+            return None
+
+        url = self.client.base_url + "groups/" + workspace_id + "/dataflows/" + dataflow['objectId']
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved dataflow.")
+        return json.dumps(response, indent=10)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/get-dataflow-data-sources
+    async def get_dataflow_datasources(self, workspace_name: str, dataflow_name: str) -> List:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        dataflow = await self.find_dataflow(workspace_name, dataflow_name)
+
+        if dataflow is None:
+            logging.info('Dataflow with name: ' + dataflow_name + ' does not exist.')
+            return None
+
+        url = self.client.base_url + "groups/" + workspace_id + "/dataflows/" + dataflow['objectId'] + "/datasources"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved dataflow datasources.")
+        return json.dumps(response, indent=10)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/delete-dataflow
+    async def delete_dataflow(self, workspace_name: str, dataflow_name: str) -> None:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        dataflow = await self.find_dataflow(workspace_name, dataflow_name)
+
+        if dataflow is None:
+            logging.info('Dataflow with name: ' + dataflow_name + " does not exist. Cannot delete the dataflow.")
+            return None
+
+        await self.export_dataflow(workspace_name, dataflow_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/dataflows/" + dataflow['objectId']
+
+        await self.client.request_json("DELETE", url, expected_codes = [self.client.http_ok_code])
+
+        self.client.name_cache.invalidate("dataflows", workspace_id)
+        logging.info("Successfully deleted dataflow with name: " + dataflow_name + " in workspace: " + workspace_name)
+
+    async def export_dataflow(self, workspace_name: str, dataflow_name: str) -> None:
+        dataflow_json = await self.get_dataflow(workspace_name, dataflow_name)
+
+        if dataflow_json is None:
+            return None
+
+        blob = utils.blob_client(dataflow_name + ".json")
+        await asyncio.to_thread(blob.upload_blob, dataflow_json.encode("utf-8"), overwrite = True)
+        logging.info("Exported dataflow: " + dataflow_name + " in workspace: " + workspace_name)
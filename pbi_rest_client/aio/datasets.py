@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+import logging
+
+from typing import AsyncIterator, List
+from .workspaces import Workspaces
+
+class Datasets:
+    def __init__(self, client):
+        self.client = client
+        self.workspaces = Workspaces(client)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-datasets
+    def iter_datasets(self, page_size: int = None) -> AsyncIterator[dict]:
+        url = self.client.base_url + "datasets"
+
+        return self.client.iter_odata_async(url, page_size)
+
+    async def get_datasets(self, page_size: int = None) -> List:
+        datasets = [item async for item in self.iter_datasets(page_size)]
+        logging.info("Successfully retrieved datasets.")
+        self.client.name_cache.set_listing(("datasets",), datasets)
+        return datasets
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-datasets-in-group
+    async def get_datasets_in_workspace(self, workspace_name: str) -> List:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved datasets in workspace: " + workspace_name)
+        self.client.name_cache.set_listing(("datasets", workspace_id), response["value"])
+        return response["value"]
+
+    async def get_dataset_id(self, dataset_name: str) -> str:
+        item = await self.client.lookup(("datasets",), dataset_name, self.get_datasets)
+
+        if item is None:
+            logging.warning(f"Unable to find dataset with name: '{dataset_name}'")
+            return None
+
+        logging.info(f"Found dataset with name {dataset_name} and dataset id {item['id']}.")
+        return {dataset_name: item['id']}
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-dataset-in-group
+    async def get_dataset_in_workspace_id(self, dataset_name: str, workspace_name: str) -> str:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        item = await self.client.lookup(("datasets", workspace_id), dataset_name, lambda: self.get_datasets_in_workspace(workspace_name))
+
+        if item is None:
+            logging.warning(f"Unable to find dataset with name: '{dataset_name}'")
+            return None
+
+        logging.info(f"Found dataset with name {dataset_name} and dataset id {item['id']}.")
+        return {dataset_name: item['id']}
+
+    async def require_dataset_in_workspace_id(self, dataset_name: str, workspace_name: str) -> tuple:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        dataset = await self.get_dataset_in_workspace_id(dataset_name, workspace_name)
+
+        if dataset is None:
+            raise RuntimeError(f"Unable to find dataset with name: '{dataset_name}' in workspace: '{workspace_name}'")
+        return workspace_id, dataset[dataset_name]
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-parameters
+    async def get_dataset_parameters(self, dataset_name: str) -> str:
+        dataset = await self.get_dataset_id(dataset_name)
+
+        if dataset is None:
+            raise RuntimeError(f"Unable to find dataset with name: '{dataset_name}'")
+
+        url = self.client.base_url + "datasets/" + dataset[dataset_name] + "/parameters"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved dataset parameters.")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-parameters-in-group
+    async def get_dataset_in_group_parameters(self, dataset_name: str, workspace_name: str) -> str:
+        workspace_id, dataset_id = await self.require_dataset_in_workspace_id(dataset_name, workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/parameters"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved dataset parameters.")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-datasources-in-group
+    async def get_datasources(self, dataset_name: str, workspace_name: str) -> str:
+        workspace_id, dataset_id = await self.require_dataset_in_workspace_id(dataset_name, workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/datasources"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved dataset datasources.")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/take-over-in-group
+    async def take_dataset_owner(self, dataset_name: str, workspace_name: str) -> None:
+        workspace_id, dataset_id = await self.require_dataset_in_workspace_id(dataset_name, workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/Default.TakeOver"
+
+        await self.client.request_json("POST", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info(f"Successfully took over dataset: {dataset_name} in workspace: {workspace_name}.")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+import logging
+
+from typing import AsyncIterator, List
+from ..gateways import Gateways as PayloadBuilder
+
+class Gateways:
+    def __init__(self, client):
+        self.client = client
+
+    def payload_string_builder(self, gateway: dict, credential_type: str) -> tuple:
+        # Credential serialization and encryption are CPU-only, so the synchronous implementation is reused
+        builder = PayloadBuilder(self.client)
+        builder.gateway = gateway
+        return builder.payload_string_builder(credential_type)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/get-gateways
+    def iter_gateways(self, page_size: int = None) -> AsyncIterator[dict]:
+        url = self.client.base_url + "gateways"
+
+        return self.client.iter_odata_async(url, page_size)
+
+    async def get_gateways(self, page_size: int = None) -> List:
+        gateways = [item async for item in self.iter_gateways(page_size)]
+        logging.info("Successfully retrieved gateways.")
+        return gateways
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/get-gateway
+    async def get_gateway(self, gateway_name: str) -> List:
+        gateway = None
+
+        async for item in self.iter_gateways():
+            if item["name"] == gateway_name:
+                logging.info("Found gateway with name " + gateway_name)
+                gateway = item
+                break
+
+        if gateway is None:
+            logging.warning("Unable to find gateway with name: " + gateway_name)
+            return None
+
+        url = self.client.base_url + "gateways/" + gateway['id']
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved gateway with name: " + gateway_name)
+        return response
+
+    async def require_gateway(self, gateway_name: str) -> dict:
+        gateway = await self.get_gateway(gateway_name)
+
+        if gateway is None:
+            raise RuntimeError("Unable to find gateway with name: " + gateway_name)
+        return gateway
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/get-datasources
+    async def get_datasources(self, gateway_name: str) -> List:
+        gateway = await self.require_gateway(gateway_name)
+
+        url = self.client.base_url + "gateways/" + gateway['id'] + "/datasources"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved datasources.")
+        return response["value"]
+
+    async def find_datasource(self, gateway_name: str, datasource_name: str) -> dict:
+        for item in await self.get_datasources(gateway_name):
+            if item["datasourceName"] == datasource_name:
+                logging.info("Found datasource with name: " + datasource_name)
+                return item
+
+        logging.warning("Unable to find datasource with name: " + datasource_name)
+        return None
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/get-datasource
+    async def get_datasource(self, gateway_name: str, datasource_name: str) -> List:
+        datasource = await self.find_datasource(gateway_name, datasource_name)
+
+        if datasource is None:
+            return None
+
+        url = self.client.base_url + "gateways/" + datasource['gatewayId'] + "/datasources/" + datasource['id']
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved datasource.")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/get-datasource-status
+    async def get_datasource_status(self, gateway_name: str, datasource_name: str) -> List:
+        datasource = await self.find_datasource(gateway_name, datasource_name)
+
+        if datasource is None:
+            return None
+
+        url = self.client.base_url + "gateways/" + datasource['gatewayId'] + "/datasources/" + datasource['id'] + "/status"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved datasource status.")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/create-datasource
+    async def create_datasource(self, gateway_name: str, datasource_name: str) -> str:
+        gateway = await self.require_gateway(gateway_name)
+        connection_details, encrypted_credentials = self.payload_string_builder(gateway, 'Basic')
+
+        url = self.client.base_url + "gateways/" + gateway['id'] + "/datasources"
+
+        payload = {
+            "dataSourceType": "Sql",
+            "connectionDetails": connection_details,
+            "datasourceName": datasource_name,
+            "credentialDetails": {
+                "credentialType": "Basic",
+                "credentials": encrypted_credentials,
+                "encryptedConnection": "Encrypted",
+                "encryptionAlgorithm": "RSA-OAEP",
+                "privacyLevel": "Organizational",
+                "useCallerAADIdentity": "False",
+                "useEndUserOAuth2Credentials": "False"
+            }
+        }
+
+        response = await self.client.request_json("POST", url, expected_codes = [self.client.http_created_code], json = payload)
+
+        logging.info("Successfully created datasource with name: " + datasource_name)
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/update-datasource
+    async def update_datasource(self, gateway_name: str, datasource_name: str) -> str:
+        gateway = await self.require_gateway(gateway_name)
+        datasource = await self.find_datasource(gateway_name, datasource_name)
+
+        if datasource is None:
+            raise RuntimeError("Unable to find datasource with name: " + datasource_name)
+
+        connection_details, encrypted_credentials = self.payload_string_builder(gateway, 'Basic')
+
+        url = self.client.base_url + "gateways/" + gateway['id'] + "/datasources/" + datasource['id']
+
+        payload = {
+            "credentialDetails": {
+                "credentialType": "Basic",
+                "credentials": encrypted_credentials,
+                "encryptedConnection": "Encrypted",
+                "encryptionAlgorithm": "RSA-OAEP",
+                "privacyLevel": "Organizational",
+                "useCallerAADIdentity": "False",
+                "useEndUserOAuth2Credentials": "True"
+            }
+        }
+
+        response = await self.client.request_json("PATCH", url, expected_codes = [self.client.http_ok_code], json = payload)
+
+        logging.info("Successfully updated datasource with name: " + datasource_name)
+        return response
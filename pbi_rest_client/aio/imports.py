@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+import aiohttp
+import os
+import json
+
+from ..config import BaseConfig
+from ..utils.utils import Utils
+from .workspaces import Workspaces
+from .dataflows import Dataflows
+from .reports import Reports
+from ..polling import Backoff
+from ..imports import backup_blob_name
+
+config = BaseConfig()
+utils = Utils()
+
+class Imports:
+    def __init__(self, client):
+        self.client = client
+        self.workspaces = Workspaces(client)
+        self.dataflows = Dataflows(client)
+        self.reports = Reports(client)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/imports/post-import
+    async def import_file_into_workspace(self, workspace_name: str, display_name: str, file_name: str, **kwargs) -> None:
+        ''' Imports files into Power BI without blocking the event loop
+        Args:
+            workspace_name (string): The name of the workspace in Power BI. Service Account must have permissions to write to the workspace.
+            display_name (string): The display name that will be assigned to the objects imported into the Power BI workspace.
+            file_name (string): Local PBIX or dataflow JSON file, or blob name when restore_from_blob is set.
+        Returns:
+            dict: The finished import
+        '''
+        restore_from_blob = kwargs.get('restore_from_blob', False)
+        dataflow = kwargs.get('dataflow', False)
+        skip_report = kwargs.get('skip_report', False)
+        timeout = kwargs.get('timeout', config.POLL_TIMEOUT)
+
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+
+        if restore_from_blob:
+            blob = utils.blob_client(file_name)
+
+            def download() -> None:
+                with open(file_name, 'wb') as file:
+                    blob.download_blob().readinto(file)
+
+            await asyncio.to_thread(download)
+
+        if not os.path.isfile(file_name):
+            raise FileNotFoundError(2, f"No such file or directory: '{file_name}'. Please check the file exists and try again.")
+
+        url = (
+            f"{self.client.base_url}"
+            + "groups/"
+            + f"{workspace_id}"
+            + "/imports?"
+            + f"datasetDisplayName={'model.json' if dataflow else display_name}"
+            + ("&nameConflict=Abort" if dataflow else "&nameConflict=CreateOrOverwrite")
+            + ("&skipReport=true" if skip_report else "")
+        )
+
+        form = aiohttp.FormData()
+        upload = None
+
+        if dataflow:
+            with open(file_name, 'r') as f:
+                dataflow_name = json.load(f)['name']
+            if await self.dataflows.find_dataflow(workspace_name, dataflow_name) != None:
+                logging.info("Deleting dataflow: " + dataflow_name + " before importing into workspace: " + workspace_name)
+                await self.dataflows.delete_dataflow(workspace_name, dataflow_name)
+            with open(file_name, 'rb') as f:
+                form.add_field('value', f.read(), filename = 'model.json', content_type = 'application/json')
+        else:
+            report_name = file_name.rstrip('.pbix')
+            if await self.reports.get_report(workspace_name, report_name) != None:
+                logging.info("Backing up PBIX file: " + file_name + " to blob container: " + config.STORAGE_BLOB_CONTAINER_NAME)
+                # Straight to blob, exporting to <report_name>.pbix locally would overwrite the file being imported
+                await self.reports.export_report_to_blob(workspace_name, report_name, backup_blob_name(report_name))
+            upload = open(file_name, 'rb')
+            form.add_field('filename', upload, filename = os.path.basename(file_name))
+
+        try:
+            response = await self.client.request_json("POST", url, expected_codes = [self.client.http_accepted_code], data = form, headers = {})
+        finally:
+            if upload != None:
+                upload.close()
+
+        import_id = response["id"]
+        logging.info(f"Uploading file with import id: {import_id}")
+
+        return await self.wait_for_import(workspace_name, workspace_id, import_id, timeout)
+
+    async def wait_for_import(self, workspace_name: str, workspace_id: str, import_id: str, timeout: float = None) -> dict:
+        return await asyncio.wait_for(self.poll_import(workspace_name, workspace_id, import_id), timeout or None)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/imports/get-import-in-group
+    async def poll_import(self, workspace_name: str, workspace_id: str, import_id: str) -> dict:
+        get_import_url = self.client.base_url + f"groups/{workspace_id}/imports/{import_id}"
+        backoff = Backoff()
+
+        while True:
+            response = await self.client.request_json("GET", get_import_url, expected_codes = [self.client.http_ok_code])
+
+            if response["importState"] == "Succeeded":
+                logging.info(f"Successfully imported file to workspace {workspace_name}.")
+                for artifact_type in ("datasets", "reports", "dataflows"):
+                    self.client.name_cache.invalidate(artifact_type, workspace_id)
+                return response
+            if response["importState"] == "Failed":
+                logging.error("Failed to upload file to workspace.")
+                raise RuntimeError(f"Import {import_id} into workspace {workspace_name} failed: {response.get('error')}")
+
+            logging.info("Import is currently in progress. . . Please wait.")
+            await asyncio.sleep(backoff.next())
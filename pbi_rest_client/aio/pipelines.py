@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+
+import logging
+
+from typing import AsyncIterator, List
+from .workspaces import Workspaces
+
+class Pipelines:
+    def __init__(self, client):
+        self.client = client
+        self.workspaces = Workspaces(client)
+        self.pipeline_stages = {'dev': 0, 'test': 1, 'prod': 2}
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/get-pipelines
+    def iter_pipelines(self, page_size: int = None) -> AsyncIterator[dict]:
+        url = self.client.base_url + "pipelines"
+
+        return self.client.iter_odata_async(url, page_size)
+
+    async def get_pipelines(self, page_size: int = None) -> List:
+        pipelines = [item async for item in self.iter_pipelines(page_size)]
+        logging.info("Successfully retrieved pipelines.")
+        self.client.name_cache.set_listing(("pipelines",), pipelines, 'displayName')
+        return pipelines
+
+    async def get_pipeline_id(self, pipeline_name: str) -> str:
+        item = await self.client.lookup(("pipelines",), pipeline_name, self.get_pipelines, 'displayName')
+
+        if item is None:
+            raise RuntimeError(f"Unable to find pipeline with name: '{pipeline_name}'")
+
+        logging.info(f"Found pipeline with name {pipeline_name} and pipeline id {item['id']}.")
+        return {pipeline_name: item['id']}
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/get-pipeline
+    async def get_pipeline(self, pipeline_name: str) -> List:
+        pipeline_id = (await self.get_pipeline_id(pipeline_name))[pipeline_name]
+
+        url = self.client.base_url + "pipelines/" + pipeline_id + "?$expand=stages"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info(f"Successfully retrieved pipeline {pipeline_id}.")
+        return response
+
+    def validate_pipeline_stage(self, stage: str) -> int:
+        stage = stage.lower()
+
+        if stage not in self.pipeline_stages:
+            raise Exception(f"Incorrect stage specified. Available options are: {list(self.pipeline_stages.keys())}")
+        return self.pipeline_stages[stage]
+
+    def pipeline_stage_selector(self, type: str, stage: str) -> tuple:
+        ''' Returns the source stage order, target stage order and whether the deployment is backwards '''
+        stage_order = self.validate_pipeline_stage(stage)
+
+        if type == 'promote':
+            if stage_order >= 2:
+                raise Exception("Production is the highest stage in Power BI pipeline. You cannot promote Production to another stage.")
+            return stage_order, stage_order + 1, False
+        if type == 'demote':
+            if stage_order <= 0:
+                raise Exception("Development is the lowest stage in Power BI pipeline. You cannot demote Development to another stage.")
+            return stage_order, stage_order - 1, True
+        raise Exception("Incorrect pipeline stage deployment type specified. Valid options are: 'promote' and 'demote'")
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/get-pipeline-stages
+    async def get_pipeline_stage_assignment(self, pipeline_name: str, workspace_name: str, stage: str) -> List:
+        pipeline_id = (await self.get_pipeline_id(pipeline_name))[pipeline_name]
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        stage_order = self.validate_pipeline_stage(stage)
+
+        url = self.client.base_url + "pipelines/" + pipeline_id + "/stages"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info(f"Successfully retrieved pipeline stages for pipeline {pipeline_name}.")
+        for object in response["value"]:
+            if object["order"] == stage_order:
+                if "workspaceId" not in object:
+                    logging.info(f"Pipeline stage assignment for {pipeline_name} does not exist.")
+                    return False
+                if object["workspaceId"] == workspace_id:
+                    logging.info(f"Pipeline stage assignment for {pipeline_name} already exists.")
+                    return True
+                raise Exception(f"Pipeline stage assignment for {pipeline_name} already exists, but with incorrect workspace id {object['workspaceId']}.")
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/create-pipeline
+    async def create_pipeline(self, pipeline_name: str) -> None:
+        if await self.client.lookup(("pipelines",), pipeline_name, self.get_pipelines, 'displayName') != None:
+            logging.warning(f"Pipeline {pipeline_name} already exists, no changes made.")
+            return
+
+        logging.info(f"Attempting to create pipeline with name: {pipeline_name}...")
+        url = self.client.base_url + "pipelines"
+
+        response = await self.client.request_json("POST", url, expected_codes = [self.client.http_created_code], data = {"displayName": pipeline_name}, headers = self.client.url_encoded_headers)
+
+        logging.info(f"Successfully created pipeline {pipeline_name}.")
+        self.client.name_cache.invalidate("pipelines")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/assign-workspace
+    async def assign_pipeline_workspace(self, pipeline_name: str, workspace_name: str, stage: str) -> None:
+        if await self.get_pipeline_stage_assignment(pipeline_name, workspace_name, stage):
+            logging.info(f"Pipeline stage: '{stage}' in pipeline: '{pipeline_name}' is already assigned to workspace: {workspace_name}.")
+            return "Pipeline stage already assigned."
+
+        pipeline_id = (await self.get_pipeline_id(pipeline_name))[pipeline_name]
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+
+        url = self.client.base_url + "pipelines/" + pipeline_id + f"/stages/{self.validate_pipeline_stage(stage)}/assignWorkspace"
+
+        request_payload = {
+            'workspaceId': workspace_id
+        }
+
+        await self.client.request_json("POST", url, expected_codes = [self.client.http_ok_code], data = request_payload, headers = self.client.url_encoded_headers)
+
+        logging.info(f"Successfully assigned workspace with ID {workspace_id} to pipeline {pipeline_name}.")
+        return f"Pipeline stage assigned successfully with URI: {url}"
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/deploy-all
+    async def pipeline_stage_deploy_all(self, pipeline_name: str, type: str, stage: str) -> None:
+        pipeline_id = (await self.get_pipeline_id(pipeline_name))[pipeline_name]
+        source_stage_order, target_stage_order, is_backwards = self.pipeline_stage_selector(type, stage)
+
+        request_url = self.client.base_url + "pipelines/" + pipeline_id + "/deployAll"
+
+        request_payload = {
+            'sourceStageOrder': source_stage_order,
+            'isBackwardDeployment': is_backwards,
+            'options': {
+                'allowCreateArtifact': True,
+                'allowOverwriteArtifact': True,
+                'allowOverwriteTargetArtifactLabel': True,
+                'allowPurgeData': True,
+                'allowSkipTilesWithMissingPrerequisites': True,
+                'allowTakeOver': True
+            }
+        }
+
+        response = await self.client.request_json("POST", request_url, expected_codes = [self.client.http_accepted_code], json = request_payload)
+
+        for artifact_type in ("datasets", "reports", "dataflows"):
+            self.client.name_cache.invalidate(artifact_type)
+        logging.info(f"Successfully promoted stage: '{stage}' in pipeline: '{pipeline_name}' to stage: '{list(self.pipeline_stages)[target_stage_order]}'.")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/update-pipeline-user
+    async def add_user_to_pipeline(self, pipeline_name: str, principal_id: str, access_right: str, service_principal: bool, group: bool, user_account: bool) -> bool:
+        pipeline_id = (await self.get_pipeline_id(pipeline_name))[pipeline_name]
+
+        url = self.client.base_url + "pipelines/" + pipeline_id + "/users"
+
+        if service_principal and not group and not user_account:
+            principal_type = "App"
+        elif group and not service_principal and not user_account:
+            principal_type = "Group"
+        elif user_account and not service_principal and not group:
+            principal_type = "User"
+        else:
+            logging.error("Only one principal type can be specified.")
+            return False
+
+        request_payload = {
+            "identifier": principal_id,
+            "accessRight": access_right,
+            "principalType": principal_type
+        }
+
+        await self.client.request_json("POST", url, expected_codes = [self.client.http_ok_code], json = request_payload)
+
+        logging.info(f"Successfully assigned user to pipeline: {pipeline_name}.")
+        return True
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+import asyncio
+import hashlib
+import logging
+
+from time import monotonic
+from typing import List
+from ..config import BaseConfig
+from ..utils.utils import Utils
+from ..utils.block_upload import BlockUploader
+from .workspaces import Workspaces
+
+config = BaseConfig()
+utils = Utils()
+
+class Reports:
+    def __init__(self, client):
+        self.client = client
+        self.workspaces = Workspaces(client)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/get-reports-in-group
+    async def get_reports(self, workspace_name: str) -> List:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/reports"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved reports in workspace: " + workspace_name)
+        self.client.name_cache.set_listing(("reports", workspace_id), response["value"])
+        return response["value"]
+
+    async def get_report(self, workspace_name: str, report_name: str) -> List:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        report = await self.client.lookup(("reports", workspace_id), report_name, lambda: self.get_reports(workspace_name))
+
+        if report is None:
+            logging.warning("Unable to find report with name: " + report_name + " in workspace with name: " + workspace_name)
+            return None
+
+        logging.info("Found report with name: " + report_name + " in workspace with name: " + workspace_name)
+        return report
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/export-report-in-group
+    async def export_report(self, workspace_name: str, report_name: str, chunk_size = 1024 * 1024) -> None:
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        report = await self.get_report(workspace_name, report_name)
+
+        if report is None:
+            raise RuntimeError("Unable to find report with name: " + report_name + " in workspace with name: " + workspace_name)
+
+        out_file = report_name + ".pbix"
+        blob = utils.blob_client(out_file)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/reports/" + report['id'] + "/Export"
+
+        headers = await self.client.request_headers()
+
+        async with self.client.semaphore:
+            async with self.client.aio_session.get(url, headers = headers) as response:
+                if response.status != self.client.http_ok_code:
+                    logging.error("Failed to export report: " + report_name + " in workspace: " + workspace_name)
+                    await self.client.raise_http_error(response)
+                with open(out_file, 'wb') as fd:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        fd.write(chunk)
+
+        logging.info("Successfully exported report: " + report_name + " in workspace: " + workspace_name)
+        with open(out_file, "rb") as fd:
+            await asyncio.to_thread(blob.upload_blob, fd, overwrite = True)
+        logging.info("Exported PBIX file to: " + out_file)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/export-report-in-group
+    async def export_report_to_blob(self, workspace_name: str, report_name: str, blob_name: str = None, chunk_size: int = None) -> dict:
+        ''' Streams the exported PBIX into a block blob without touching local disk. Blocks are staged on worker threads
+        while the next one downloads, so the event loop never waits on storage.
+        Args:
+            workspace_name (string): The name of the workspace in Power BI.
+            report_name (string): The name of the report to export.
+            blob_name (string): Destination blob, defaults to <report_name>.pbix.
+            chunk_size (int): Size in bytes of each staged block.
+        Returns:
+            dict: Blob name, bytes uploaded, SHA-256 of the content, block count and throughput.
+        '''
+        workspace_id = await self.workspaces.require_workspace_id(workspace_name)
+        report = await self.get_report(workspace_name, report_name)
+
+        if report is None:
+            raise RuntimeError("Unable to find report with name: " + report_name + " in workspace with name: " + workspace_name)
+
+        blob_name = blob_name or report_name + ".pbix"
+        blob = utils.blob_client(blob_name)
+        uploader = BlockUploader(chunk_size or config.EXPORT_CHUNK_SIZE)
+        checksum = hashlib.sha256()
+        started = monotonic()
+        block_ids = []
+        pending = set()
+        buffer = bytearray()
+        uploaded = 0
+
+        async def stage(data: bytes) -> None:
+            nonlocal pending, uploaded
+            # Bounded like BlockUploader.upload_chunks, at most max_workers blocks are held in memory
+            if len(pending) >= uploader.max_workers:
+                done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                uploaded += sum(task.result() for task in done)
+            block_id = uploader.block_id(len(block_ids))
+            block_ids.append(block_id)
+            pending.add(asyncio.ensure_future(asyncio.to_thread(uploader.stage_data, blob, block_id, data)))
+
+        url = self.client.base_url + "groups/" + workspace_id + "/reports/" + report['id'] + "/Export"
+
+        headers = await self.client.request_headers()
+
+        try:
+            async with self.client.semaphore:
+                async with self.client.aio_session.get(url, headers = headers) as response:
+                    if response.status != self.client.http_ok_code:
+                        logging.error("Failed to export report: " + report_name + " in workspace: " + workspace_name)
+                        await self.client.raise_http_error(response)
+                    async for chunk in response.content.iter_chunked(uploader.block_size):
+                        checksum.update(chunk)
+                        buffer += chunk
+                        while len(buffer) >= uploader.block_size:
+                            await stage(bytes(buffer[:uploader.block_size]))
+                            del buffer[:uploader.block_size]
+            if buffer:
+                await stage(bytes(buffer))
+            uploaded += sum(await asyncio.gather(*pending))
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+
+        await asyncio.to_thread(uploader.commit, blob, block_ids)
+
+        stats = dict(uploader.stats(uploaded, len(block_ids), uploaded, 0, started), blob_name = blob_name, sha256 = checksum.hexdigest())
+        logging.info(f"Exported report: {report_name} in workspace: {workspace_name} to blob: {blob_name} ({uploaded} bytes in {stats['seconds']}s).")
+        return stats
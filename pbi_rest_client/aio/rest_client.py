@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+import aiohttp
+
+from datetime import datetime
+from typing import AsyncIterator, Callable
+from ..config import BaseConfig
+from ..rest_client import RestClient
+
+config = BaseConfig()
+
+class AsyncRestClient(RestClient):
+    def __init__(self, max_concurrency: int = None, pool_maxsize: int = None):
+        super().__init__(pool_maxsize = pool_maxsize)
+        self.max_concurrency = max_concurrency or config.ASYNC_MAX_CONCURRENCY
+        self.aio_session = None
+        self.semaphore = None
+        self._async_token_lock = None
+        self._lookup_locks = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_async()
+
+    async def open(self) -> None:
+        # One connector for every async resource class, sized like the synchronous pool
+        if self.aio_session == None or self.aio_session.closed:
+            connector = aiohttp.TCPConnector(limit = self.pool_maxsize, limit_per_host = self.pool_maxsize)
+            self.aio_session = aiohttp.ClientSession(connector = connector)
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_token_lock = asyncio.Lock()
+
+    async def close_async(self) -> None:
+        if self.aio_session != None:
+            await self.aio_session.close()
+            self.aio_session = None
+        self.close()
+
+    async def check_token_expiration_async(self) -> None:
+        await self.open()
+        if self.token_expiration < datetime.utcnow():
+            async with self._async_token_lock:
+                if self.token_expiration < datetime.utcnow():
+                    await asyncio.to_thread(self.check_token_expiration)
+
+    async def request_headers(self, headers: dict = None) -> dict:
+        await self.check_token_expiration_async()
+        headers = dict(self.json_headers if headers is None else headers)
+        headers.update(self.authz_header)
+        return headers
+
+    async def request_json(self, method: str, url: str, expected_codes: list = None, headers: dict = None, **kwargs):
+        ''' Sends a request through the shared session and returns the decoded JSON body
+        Args:
+            method (string): HTTP verb.
+            url (string): Absolute request URL.
+            expected_codes (list): Status codes treated as success, defaults to the client's expected codes.
+            headers (dict): Request headers, defaults to the JSON headers.
+        Returns:
+            The decoded JSON body, or None when the response has no body.
+        '''
+        expected_codes = expected_codes or self.expected_codes
+        # Multipart bodies are consumed by the first attempt and cannot be replayed
+        replayable = not isinstance(kwargs.get('data'), aiohttp.FormData)
+        attempt = 0
+
+        while True:
+            await self.wait_for_budget_async()
+            request_headers = await self.request_headers(headers)
+
+            try:
+                async with self.semaphore:
+                    async with self.aio_session.request(method, url, headers = request_headers, **kwargs) as response:
+                        self.retry_metrics.record_response(response.status)
+                        if response.status in expected_codes:
+                            body = await response.read()
+                            if not body:
+                                return None
+                            return await response.json(content_type = None)
+                        if not replayable or not self.retry_policy.should_retry(method, response.status, attempt):
+                            await self.raise_http_error(response)
+                        delay = self.retry_policy.delay(attempt, response.headers)
+                        if response.status == 429:
+                            self.rate_limiter.pause(delay)
+                        logging.warning(f"{method} {url} returned {response.status}. Retrying in {delay:.1f}s (attempt {attempt + 1} of {self.retry_policy.max_retries}).")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                self.retry_metrics.record_connection_error()
+                if not replayable or not self.retry_policy.should_retry_error(method, attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"{method} {url} failed with {type(error).__name__}. Retrying in {delay:.1f}s (attempt {attempt + 1} of {self.retry_policy.max_retries}).")
+
+            self.retry_metrics.record_retry(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def wait_for_budget_async(self) -> None:
+        delay = self.rate_limiter.reserve()
+        if delay > 0:
+            self.retry_metrics.record_budget_wait(delay)
+            await asyncio.sleep(delay)
+
+    async def iter_odata_async(self, url: str, page_size: int = None) -> AsyncIterator[dict]:
+        skip = 0
+        next_url = self.page_url(url, page_size, skip)
+
+        while next_url != None:
+            page = await self.request_json("GET", next_url, expected_codes = [self.http_ok_code])
+            items = page.get("value", [])
+
+            if "@odata.nextLink" in page:
+                next_url = page["@odata.nextLink"]
+            elif page_size and len(items) == page_size:
+                skip += page_size
+                next_url = self.page_url(url, page_size, skip)
+            else:
+                next_url = None
+
+            del page
+            for item in items:
+                yield item
+
+    async def lookup(self, key, name: str, fetch: Callable, name_field: str = 'name'):
+        ''' Async counterpart of TTLCache.lookup. Concurrent misses on the same listing share one fetch. '''
+        index = self.name_cache.get(key)
+        if index is not None and name in index:
+            return index[name]
+
+        lock = self._lookup_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = self.name_cache.get(key)
+            if index is None or name not in index:
+                index = self.name_cache.set_listing(key, await fetch(), name_field)
+        return index.get(name)
+
+    async def raise_http_error(self, response: aiohttp.ClientResponse):
+        text = await response.text()
+        logging.error(f"Expected response codes: {self.expected_codes}, response was: {response.status}: {text}.")
+        raise aiohttp.ClientResponseError(
+            response.request_info,
+            response.history,
+            status = response.status,
+            message = text,
+            headers = response.headers
+        )
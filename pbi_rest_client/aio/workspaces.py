@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import logging
+
+from typing import AsyncIterator, List
+
+class Workspaces:
+    def __init__(self, client):
+        self.client = client
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/groups/get-groups
+    async def get_workspace(self, workspace_name: str) -> List:
+        url = self.client.base_url + "groups?$filter=" + "name eq '" + workspace_name + "'"
+
+        workspace = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        if workspace["@odata.count"] <= 0:
+            logging.info("Workspace does not exist or user does not have permissions.")
+            return None
+        logging.info("Successfully retrieved workspace.")
+        return workspace
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/groups/get-groups
+    def iter_workspaces(self, page_size: int = None) -> AsyncIterator[dict]:
+        url = self.client.base_url + "groups"
+
+        return self.client.iter_odata_async(url, page_size or self.client.odata_page_size)
+
+    async def get_workspaces(self, page_size: int = None) -> List:
+        workspaces = [item async for item in self.iter_workspaces(page_size)]
+        logging.info("Successfully retrieved workspaces.")
+        self.client.name_cache.set_listing(("groups",), workspaces)
+        return workspaces
+
+    async def find_workspace(self, workspace_name: str) -> dict:
+        return await self.client.lookup(("groups",), workspace_name, self.get_workspaces)
+
+    async def get_workspace_id(self, workspace_name: str) -> str:
+        item = await self.find_workspace(workspace_name)
+
+        if item is None:
+            logging.warning(f"Unable to find workspace with name: '{workspace_name}'")
+            return None
+
+        logging.info(f"Found workspace with name {workspace_name} and workspace id {item['id']}.")
+        return {workspace_name: item['id']}
+
+    async def require_workspace_id(self, workspace_name: str) -> str:
+        item = await self.find_workspace(workspace_name)
+
+        if item is None:
+            raise RuntimeError(f"Unable to find workspace with name: '{workspace_name}'")
+        return item['id']
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/groups/create-group
+    async def create_workspace(self, workspace_name: str) -> None:
+        workspace = await self.get_workspace(workspace_name)
+
+        if workspace != None:
+            logging.info(f"The workspace {workspace_name} already exists, no changes made.")
+            return workspace["value"]
+
+        logging.info(f"Trying to create workspace with name: {workspace_name}...")
+
+        url = self.client.base_url + "groups?workspaceV2=True"
+
+        payload = {
+            "name": workspace_name
+        }
+
+        response = await self.client.request_json("POST", url, expected_codes = [self.client.http_ok_code], data = payload, headers = self.client.url_encoded_headers)
+
+        logging.info(f"Successfully created workspace {workspace_name}.")
+        self.client.name_cache.invalidate("groups")
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/groups/get-group-users
+    async def get_workspace_users(self, workspace_name: str) -> List:
+        workspace_id = await self.require_workspace_id(workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/users"
+
+        response = await self.client.request_json("GET", url, expected_codes = [self.client.http_ok_code])
+
+        logging.info("Successfully retrieved workspace users.")
+        return response["value"]
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/groups/add-group-user
+    async def add_user_to_workspace(self, workspace_name: str, principal_id: str, access_right: str, service_principal: bool, group: bool, user_account: bool) -> bool:
+        workspace_id = await self.require_workspace_id(workspace_name)
+
+        url = self.client.base_url + "groups/" + workspace_id + "/users"
+
+        if service_principal and not group and not user_account:
+            principal_type = "App"
+        elif group and not service_principal and not user_account:
+            principal_type = "Group"
+        elif user_account and not service_principal and not group:
+            principal_type = "User"
+        else:
+            logging.error("Only one principal type can be specified.")
+            return False
+
+        request_payload = {
+            "identifier": principal_id,
+            "groupUserAccessRight": access_right,
+            "principalType": principal_type
+        }
+
+        await self.client.request_json("POST", url, expected_codes = [self.client.http_ok_code], json = request_payload)
+
+        logging.info(f"Successfully assigned user to workspace: {workspace_name}.")
+        return True
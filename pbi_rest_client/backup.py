@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+from collections import deque
+from datetime import datetime, timezone
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, List
+from .config import BaseConfig
+from .bulk import Bulk
+from .workspaces import Workspaces
+from .reports import Reports
+from .dataflows import Dataflows
+from .utils.utils import Utils
+from .utils.block_upload import BlockUploader
+
+config = BaseConfig()
+utils = Utils()
+
+class BackupItem:
+    def __init__(self, workspace: Dict, artifact_type: str, artifact: Dict, blob_name: str):
+        self.workspace_id = workspace['id']
+        self.workspace_name = workspace['name']
+        self.artifact_type = artifact_type
+        self.id = artifact['id'] if artifact_type == "report" else artifact['objectId']
+        self.name = artifact['name']
+        self.modified = artifact.get('modifiedDateTime')
+        self.blob_name = blob_name
+        self.status = "Pending"
+        self.error = None
+        self.size = None
+        self.sha256 = None
+        self.uploaded = 0
+        self.seconds = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.artifact_type}/{self.id}"
+
+    def entry(self) -> Dict:
+        return {
+            "workspace_id": self.workspace_id,
+            "workspace_name": self.workspace_name,
+            "type": self.artifact_type,
+            "id": self.id,
+            "name": self.name,
+            "modified": self.modified,
+            "blob_name": self.blob_name,
+            "status": self.status,
+            "size": self.size,
+            "sha256": self.sha256,
+            "uploaded": self.uploaded,
+            "seconds": self.seconds,
+            "error": None if self.error is None else str(self.error)
+        }
+
+class BackupIndex:
+    def __init__(self, blob_name: str = "backup/index.json", file_name: str = None, objects_prefix: str = "backup/objects"):
+        ''' Remembers what the last backups stored, so unchanged artifacts are neither exported nor uploaded again
+        Args:
+            blob_name (string): Blob that holds the index, used unless file_name is set.
+            file_name (string): Optional local file that holds the index instead of a blob.
+            objects_prefix (string): Blob prefix of the content addressed objects, named <sha256>.pbix or <sha256>.json.
+        '''
+        self.blob_name = blob_name
+        self.file_name = file_name
+        self.objects_prefix = objects_prefix.rstrip("/")
+        self.artifacts = {}
+        self.objects = set()
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        content = None
+        if self.file_name is not None:
+            if os.path.isfile(self.file_name):
+                with open(self.file_name, 'rb') as f:
+                    content = f.read()
+        else:
+            from azure.core.exceptions import ResourceNotFoundError
+
+            try:
+                content = utils.blob_client(self.blob_name).download_blob().readall()
+            except ResourceNotFoundError:
+                pass
+
+        index = json.loads(content) if content else {}
+        self.artifacts = index.get("artifacts", {})
+        self.objects = set(index.get("objects", []))
+        logging.info(f"Loaded backup index with {len(self.artifacts)} artifacts and {len(self.objects)} objects.")
+
+    def save(self) -> None:
+        content = json.dumps({"artifacts": self.artifacts, "objects": sorted(self.objects)}, indent = 2).encode("utf-8")
+        if self.file_name is not None:
+            with open(self.file_name, 'wb') as f:
+                f.write(content)
+        else:
+            utils.blob_client(self.blob_name).upload_blob(content, overwrite = True)
+
+    def object_name(self, sha256: str, extension: str) -> str:
+        return f"{self.objects_prefix}/{sha256}{extension}"
+
+    def has_object(self, blob_name: str) -> bool:
+        with self._lock:
+            if blob_name in self.objects:
+                return True
+        if utils.blob_client(blob_name).exists():
+            self.add_object(blob_name)
+            return True
+        return False
+
+    def add_object(self, blob_name: str) -> None:
+        with self._lock:
+            self.objects.add(blob_name)
+
+    def unchanged(self, item: BackupItem) -> Dict:
+        ''' Returns the indexed entry when the artifact reports the same modified time as at the last backup '''
+        previous = self.artifacts.get(item.key)
+        if previous is None or item.modified is None or previous.get("modified") != item.modified:
+            return None
+        return previous
+
+    def record(self, item: BackupItem) -> None:
+        if item.status in ("Succeeded", "Unchanged"):
+            self.artifacts[item.key] = {"modified": item.modified, "sha256": item.sha256, "size": item.size, "blob_name": item.blob_name}
+
+class Backup:
+    def __init__(self, client, max_workers: int = None, max_per_workspace: int = None):
+        ''' Exports every report (PBIX) and dataflow (model.json) of a set of workspaces to blob storage
+        Args:
+            max_workers (int): Exports running at the same time across the tenant.
+            max_per_workspace (int): Exports running at the same time within one workspace, so large workspaces do not starve the others.
+        '''
+        self.client = client
+        self.max_workers = max_workers or config.BACKUP_MAX_WORKERS
+        self.max_per_workspace = max_per_workspace or config.BACKUP_MAX_PER_WORKSPACE
+        self.bulk = Bulk(client, self.max_workers)
+        self.index = None
+
+    def backup(self, workspace_names: Iterable[str] = None, prefix: str = None, incremental: bool = False, index: BackupIndex = None) -> Dict:
+        ''' Runs a backup and uploads its manifest
+        Args:
+            workspace_names (iterable): Workspaces to back up, all workspaces the principal can see by default.
+            prefix (string): Blob name prefix of this run, defaults to backup/<UTC timestamp>.
+            incremental (bool): Skip artifacts whose modified time matches the index and store content addressed objects
+                that are only uploaded when no object with the same SHA-256 exists yet.
+            index (BackupIndex): Index used by incremental backups, defaults to the blob backup/index.json.
+        Returns:
+            dict: The manifest, also uploaded to <prefix>/manifest.json.
+        '''
+        started_at = datetime.now(timezone.utc)
+        started = monotonic()
+        prefix = (prefix or "backup/" + started_at.strftime("%Y%m%dT%H%M%SZ")).rstrip("/")
+
+        self.index = None
+        if incremental:
+            self.index = index or BackupIndex()
+            self.index.load()
+
+        items = self.list_items(workspace_names, prefix)
+        logging.info(f"Backing up {len(items)} artifacts with {self.max_workers} workers.")
+        self.run(items)
+
+        if self.index is not None:
+            for item in items:
+                self.index.record(item)
+            self.index.save()
+
+        manifest = {
+            "prefix": prefix,
+            "incremental": incremental,
+            "started": started_at.isoformat(),
+            "seconds": round(monotonic() - started, 3),
+            "succeeded": sum(1 for item in items if item.status == "Succeeded"),
+            "unchanged": sum(1 for item in items if item.status == "Unchanged"),
+            "failed": sum(1 for item in items if item.status == "Failed"),
+            "bytes": sum(item.size or 0 for item in items),
+            "uploaded": sum(item.uploaded for item in items),
+            "items": [item.entry() for item in items]
+        }
+        self.write_manifest(prefix, manifest)
+
+        logging.info(f"Backup finished in {manifest['seconds']}s: {manifest['succeeded']} succeeded, {manifest['unchanged']} unchanged, {manifest['failed']} failed, {manifest['uploaded']} bytes uploaded.")
+        return manifest
+
+    def list_items(self, workspace_names: Iterable[str], prefix: str) -> List[BackupItem]:
+        ''' Lists workspaces once, then the reports and dataflows of every workspace in parallel '''
+        names = self.bulk.workspace_names(workspace_names)
+        workspaces = {name: Workspaces(self.client).find_workspace(name) for name in names}
+        missing = [name for name, workspace in workspaces.items() if workspace is None]
+        if missing:
+            raise ValueError(f"Unknown workspaces: {missing}")
+
+        reports = self.bulk.map(Reports, "get_reports", names)
+        dataflows = self.bulk.map(Dataflows, "get_dataflows", names)
+
+        items = []
+        for name, report_result, dataflow_result in zip(names, reports, dataflows):
+            workspace = workspaces[name]
+            for result in (report_result, dataflow_result):
+                if not result.ok:
+                    raise RuntimeError(f"Failed to list artifacts of workspace {name}: {result.error}")
+            # Blob names use ids, names are not unique within a workspace and may contain '/'
+            for report in report_result.result or []:
+                items.append(BackupItem(workspace, "report", report, f"{prefix}/{workspace['id']}/reports/{report['id']}.pbix"))
+            for dataflow in dataflow_result.result or []:
+                items.append(BackupItem(workspace, "dataflow", dataflow, f"{prefix}/{workspace['id']}/dataflows/{dataflow['objectId']}.json"))
+
+        if self.index is not None:
+            self.add_report_modified_times(items, [workspace['id'] for workspace in workspaces.values()])
+        return items
+
+    def add_report_modified_times(self, items: List[BackupItem], workspace_ids: List[str]) -> None:
+        ''' The workspace report listing has no modified time, so incremental backups read it from the admin API to skip
+        unchanged reports before exporting them. Without admin access the reports are exported and compared by hash.
+        '''
+        modified = {}
+        for result in self.bulk.map(Reports, "get_reports_as_admin", workspace_ids):
+            if not result.ok:
+                logging.warning(f"No report modified times for workspace {result.item}, its reports are exported and compared by hash.")
+                continue
+            for report in result.result or []:
+                modified[report['id']] = report.get('modifiedDateTime')
+
+        for item in items:
+            if item.artifact_type == "report" and item.modified is None:
+                item.modified = modified.get(item.id)
+
+    def run(self, items: List[BackupItem]) -> None:
+        ''' Exports the items round robin across workspaces with at most max_per_workspace running per workspace '''
+        queues = {}
+        for item in items:
+            queues.setdefault(item.workspace_id, deque()).append(item)
+        order = deque(queues)
+        running = {workspace_id: 0 for workspace_id in queues}
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = "pbi-backup") as executor:
+            while order or futures:
+                # Hand out one export per workspace per pass until the pool is full or every workspace is at its limit
+                submitted = True
+                while submitted and len(futures) < self.max_workers:
+                    submitted = False
+                    for _ in range(len(order)):
+                        if len(futures) >= self.max_workers:
+                            break
+                        workspace_id = order.popleft()
+                        if running[workspace_id] < self.max_per_workspace:
+                            item = queues[workspace_id].popleft()
+                            running[workspace_id] += 1
+                            futures[executor.submit(self.export, item)] = item
+                            submitted = True
+                        if queues[workspace_id]:
+                            order.append(workspace_id)
+
+                if futures:
+                    done, _ = wait(list(futures), return_when = FIRST_COMPLETED)
+                    for future in done:
+                        running[futures.pop(future).workspace_id] -= 1
+
+    def export(self, item: BackupItem) -> None:
+        started = monotonic()
+        try:
+            if self.index is not None:
+                self.export_incremental(item)
+            elif item.artifact_type == "report":
+                stats = Reports(self.client).export_report_id_to_blob(item.workspace_id, item.id, item.blob_name)
+                item.size = item.uploaded = stats['uploaded_bytes']
+                item.sha256 = stats['sha256']
+                item.status = "Succeeded"
+            else:
+                stats = Dataflows(self.client).export_dataflow_id(item.workspace_id, item.id, item.blob_name)
+                item.size = item.uploaded = stats['size']
+                item.sha256 = stats['sha256']
+                item.status = "Succeeded"
+        except Exception as error:
+            logging.error(f"Failed to back up {item.artifact_type} {item.name} in workspace {item.workspace_name}: {error}")
+            item.status = "Failed"
+            item.error = error
+        item.seconds = round(monotonic() - started, 3)
+
+    def export_incremental(self, item: BackupItem) -> None:
+        previous = self.index.unchanged(item)
+        if previous is not None:
+            item.sha256, item.size, item.blob_name = previous["sha256"], previous["size"], previous["blob_name"]
+            item.status = "Unchanged"
+            return
+
+        if item.artifact_type == "report":
+            # The hash is only known once the export has been read, so the PBIX is spooled to a temporary file
+            # while it is hashed and only uploaded when no object with the same content exists
+            with tempfile.TemporaryFile() as spool:
+                stats = Reports(self.client).export_report_id_to_stream(item.workspace_id, item.id, spool)
+                item.size, item.sha256 = stats['size'], stats['sha256']
+                item.blob_name = self.index.object_name(item.sha256, ".pbix")
+                if not self.index.has_object(item.blob_name):
+                    spool.seek(0)
+                    uploader = BlockUploader(config.EXPORT_CHUNK_SIZE)
+                    uploader.upload_chunks(utils.blob_client(item.blob_name), iter(lambda: spool.read(uploader.block_size), b""), item.size)
+                    self.index.add_object(item.blob_name)
+                    item.uploaded = item.size
+        else:
+            data = Dataflows(self.client).get_dataflow_definition(item.workspace_id, item.id)
+            item.size, item.sha256 = len(data), hashlib.sha256(data).hexdigest()
+            item.blob_name = self.index.object_name(item.sha256, ".json")
+            if not self.index.has_object(item.blob_name):
+                utils.blob_client(item.blob_name).upload_blob(data, overwrite = True)
+                self.index.add_object(item.blob_name)
+                item.uploaded = item.size
+
+        previous = self.index.artifacts.get(item.key)
+        item.status = "Unchanged" if previous is not None and previous.get("sha256") == item.sha256 else "Succeeded"
+
+    def write_manifest(self, prefix: str, manifest: Dict) -> None:
+        blob_name = f"{prefix}/manifest.json"
+        utils.blob_client(blob_name).upload_blob(json.dumps(manifest, indent = 2).encode("utf-8"), overwrite = True)
+        logging.info(f"Wrote backup manifest to blob: {blob_name}")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+import logging
+
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from .config import BaseConfig
+from .dependencies import dependency_order
+from .imports import Imports
+from .polling import Job, Scheduler
+
+config = BaseConfig()
+
+class ImportJob(Job):
+    def __init__(self, entry: Dict):
+        super().__init__()
+        self.workspace_name = entry['workspace_name']
+        self.display_name = entry.get('display_name')
+        self.file_name = entry['file_name']
+        self.name = entry.get('name', self.file_name)
+        self.options = dict(entry.get('options') or {})
+        self.depends_on = list(entry.get('depends_on') or [])
+        self.timeout = self.options.pop('timeout', config.POLL_TIMEOUT)
+        self.dependencies = []
+        self.workspace_id = None
+        self.import_id = None
+        self.imported = None
+        self.uploaded = None
+
+    def result(self) -> Dict:
+        return {
+            "name": self.name,
+            "workspace_name": self.workspace_name,
+            "file_name": self.file_name,
+            "status": self.status,
+            "import_id": self.import_id,
+            "error": None if self.error is None else str(self.error),
+            "upload_seconds": None if self.uploaded is None else round(self.uploaded - self.started, 3),
+            "total_seconds": None if self.finished is None or self.started is None else round(self.finished - self.started, 3),
+            "import": self.imported
+        }
+
+class BatchImports(Scheduler):
+    polling_status = "Processing"
+
+    def __init__(self, client, max_workers: int = None):
+        self.client = client
+        self.max_workers = max_workers or config.BULK_MAX_WORKERS
+
+    def import_manifest(self, manifest: List[Dict]) -> List[Dict]:
+        ''' Imports every file of a manifest into Power BI
+        Args:
+            manifest (list): Entries with workspace_name, display_name, file_name and optional name, options
+                (keyword arguments of Imports.import_file_into_workspace) and depends_on (names of entries that must import first).
+        Returns:
+            list: One result per entry, in manifest order, with status Succeeded, Failed or Skipped.
+        '''
+        jobs = [ImportJob(entry) for entry in manifest]
+        by_name = {job.name: job for job in jobs}
+
+        if len(by_name) != len(jobs):
+            raise ValueError("Manifest entry names must be unique. Set 'name' on entries that share a file name.")
+
+        for job in jobs:
+            job.dependencies = [by_name[name] for name in job.depends_on]
+
+        order = [by_name[name] for name in dependency_order({job.name: job.depends_on for job in jobs})]
+        self.run_jobs(order, self.max_workers, "pbi-import")
+
+        succeeded = sum(1 for job in jobs if job.status == "Succeeded")
+        logging.info(f"Batch import finished: {succeeded} of {len(jobs)} files imported.")
+        return [job.result() for job in jobs]
+
+    def start_jobs(self, jobs: List[ImportJob], executor: ThreadPoolExecutor, uploads: Dict) -> None:
+        for job in jobs:
+            if job.status != "Pending":
+                continue
+
+            if any(dependency.status in ("Failed", "Skipped") for dependency in job.dependencies):
+                logging.warning(f"Skipping import of {job.name} because a dependency did not import.")
+                job.finish("Skipped", RuntimeError("A dependency did not import."))
+                continue
+            if len(uploads) >= self.max_workers or any(dependency.status != "Succeeded" for dependency in job.dependencies):
+                continue
+
+            job.status = "Uploading"
+            job.started = monotonic()
+            uploads[executor.submit(self.upload, job)] = job
+
+    def upload(self, job: ImportJob) -> str:
+        # Imports keeps per-call state, so every upload gets its own instance
+        imports = Imports(self.client)
+        import_id = imports.upload_file(job.workspace_name, job.display_name, job.file_name, **job.options)
+        job.workspace_id = imports.workspaces.workspace[job.workspace_name]
+        return import_id
+
+    def collect_jobs(self, uploads: Dict) -> None:
+        for future in [future for future in uploads if future.done()]:
+            job = uploads.pop(future)
+            try:
+                job.import_id = future.result()
+            except Exception as error:
+                logging.error(f"Failed to upload {job.file_name} to workspace {job.workspace_name}: {error}")
+                job.finish("Failed", error)
+                continue
+            job.uploaded = monotonic()
+            job.status = "Processing"
+            job.next_poll = job.uploaded
+
+    def poll_jobs(self, jobs: List[ImportJob], executor: ThreadPoolExecutor, uploads: Dict) -> None:
+        imports = Imports(self.client)
+        now = monotonic()
+
+        for job in jobs:
+            if job.status != "Processing" or job.next_poll > now:
+                continue
+            try:
+                job.imported = imports.check_import(job.workspace_name, job.workspace_id, job.import_id)
+            except Exception as error:
+                logging.error(f"Import of {job.file_name} into workspace {job.workspace_name} failed: {error}")
+                job.finish("Failed", error)
+                continue
+
+            if job.imported is not None:
+                job.finish("Succeeded")
+            elif job.timeout and monotonic() - job.uploaded > job.timeout:
+                job.finish("Failed", TimeoutError(f"Timed out after {job.timeout}s waiting for import {job.import_id}."))
+            else:
+                job.next_poll = monotonic() + job.backoff.next()
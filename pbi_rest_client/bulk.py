@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+from .config import BaseConfig
+from .workspaces import Workspaces
+from .reports import Reports
+from .dashboards import Dashboards
+from .datasets import Datasets
+from .dataflows import Dataflows
+from .capacities import Capacities
+
+config = BaseConfig()
+
+class BulkResult:
+    def __init__(self, item, result = None, error: Exception = None):
+        self.item = item
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return f"BulkResult(item={self.item!r}, ok={self.ok})"
+
+class Bulk:
+    def __init__(self, client, max_workers: int = None):
+        self.client = client
+        self.max_workers = max_workers or config.BULK_MAX_WORKERS
+
+        if self.max_workers > self.client.pool_maxsize:
+            logging.warning(f"Bulk max workers {self.max_workers} exceeds the HTTP pool size {self.client.pool_maxsize}. Extra connections will not be reused.")
+
+    def map(self, resource_class, method_name: str, items: Iterable, *args, **kwargs) -> List[BulkResult]:
+        ''' Runs resource_class(client).method_name(item, *args, **kwargs) for every item on a bounded thread pool
+        Args:
+            resource_class (class): Resource class such as Reports. A new instance is created per call because the resource classes keep per-call state.
+            method_name (string): Name of the method to call.
+            items (iterable): First positional argument of each call, usually a workspace name.
+        Returns:
+            list: One BulkResult per item, in input order. Errors are captured per item instead of aborting the sweep.
+        '''
+        items = list(items)
+
+        def call(item):
+            try:
+                return BulkResult(item, getattr(resource_class(self.client), method_name)(item, *args, **kwargs))
+            except Exception as error:
+                logging.error(f"{resource_class.__name__}.{method_name} failed for {item!r}: {error}")
+                return BulkResult(item, error = error)
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+            results = list(executor.map(call, items))
+
+        failed = sum(1 for result in results if not result.ok)
+        logging.info(f"Completed {resource_class.__name__}.{method_name} for {len(results)} items with {failed} failures.")
+        return results
+
+    def workspace_names(self, workspace_names: Iterable[str] = None) -> List[str]:
+        # One listing fills the shared name cache so the workers resolve workspace ids without further calls
+        workspaces = Workspaces(self.client).get_workspaces()
+        if workspace_names is None:
+            return [item['name'] for item in workspaces]
+        return list(workspace_names)
+
+    def get_reports(self, workspace_names: Iterable[str] = None) -> List[BulkResult]:
+        return self.map(Reports, "get_reports", self.workspace_names(workspace_names))
+
+    def get_dashboards(self, workspace_names: Iterable[str] = None) -> List[BulkResult]:
+        return self.map(Dashboards, "get_dashboards", self.workspace_names(workspace_names))
+
+    def get_datasets_in_workspace(self, workspace_names: Iterable[str] = None) -> List[BulkResult]:
+        return self.map(Datasets, "get_datasets_in_workspace", self.workspace_names(workspace_names))
+
+    def get_dataflows(self, workspace_names: Iterable[str] = None) -> List[BulkResult]:
+        return self.map(Dataflows, "get_dataflows", self.workspace_names(workspace_names))
+
+    def set_workspace_capacity(self, workspace_names: Iterable[str], capacity: str) -> List[BulkResult]:
+        return self.map(Capacities, "set_workspace_capacity", self.workspace_names(workspace_names), capacity)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+import logging
+import threading
+
+from time import monotonic
+from typing import Callable, Dict, List
+
+class TTLCache:
+    def __init__(self, ttl: float = None):
+        ''' Thread-safe in-memory cache whose entries expire after a time-to-live
+        Args:
+            ttl (float): Default lifetime of an entry in seconds. None never expires, zero or less disables caching.
+        '''
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return value
+        with self._lock:
+            self._entries[key] = (value, None if ttl is None else monotonic() + ttl)
+        return value
+
+    def invalidate(self, *key_prefix) -> None:
+        ''' Drops every entry whose tuple key starts with key_prefix, or the whole cache when no prefix is given '''
+        with self._lock:
+            if not key_prefix:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if isinstance(key, tuple) and key[:len(key_prefix)] == key_prefix]:
+                logging.debug(f"Invalidating cache entry {key}.")
+                del self._entries[key]
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def set_listing(self, key, items: List, name_field: str = 'name') -> Dict:
+        ''' Indexes a listing response by name so later lookups are O(1). The first item wins on duplicate names. '''
+        index = {}
+        for item in items or []:
+            index.setdefault(item[name_field], item)
+        return self.set(key, index)
+
+    def lookup(self, key, name: str, fetch: Callable[[], List], name_field: str = 'name'):
+        ''' Returns the item called name from the listing cached under key. On a miss the listing is
+        fetched once more, so objects created by another process since the last fetch are still found.
+        '''
+        index = self.get(key)
+        if index is None or name not in index:
+            index = self.set_listing(key, fetch(), name_field)
+        return index.get(name)
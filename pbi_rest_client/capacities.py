@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
 import logging
-import requests
 
 from .workspaces import Workspaces
 
@@ -13,31 +12,32 @@ class Capacities:
     # https://docs.microsoft.com/en-us/rest/api/power-bi/capacities/groups-assign-to-capacity
     def set_workspace_capacity(self, workspace_name: str, capacity: str) -> None:
         self.client.check_token_expiration()
-        self.workspaces.get_workspace_id(workspace_name)
+        # The capacity is read fresh, the cached workspace listing may predate another assignment
+        workspace = self.workspaces.get_workspace(workspace_name)
+        if workspace is None:
+            raise ValueError(f"Workspace {workspace_name} does not exist or the principal has no access to it.")
+        item = workspace['value'][0]
+
+        if 'capacityId' in item:
+            if item['capacityId'] == capacity:
+                logging.info(f"Workspace with id: {item['id']} is already assigned to capacity {capacity}.")
+                return item
+            logging.warning(f"Workspace with id: {item['id']} is assigned to the wrong capacity with id {item['capacityId']}. "
+            + f"Proceeding to assign capacity with id {capacity}.")
+        else:
+            logging.info(f"Workspace with id: {item['id']} is not assigned to capacity. Proceeding to assign capacity with id {capacity}.")
 
-        for item in self.workspaces.workspaces:
-            if item['id'] == self.workspaces.workspace[workspace_name] and 'capacityId' in item:
-                if item['capacityId'] == capacity:
-                    logging.info(f"Workspace with id: {item['id']} is already assigned to capacity {capacity}.")
-                    return item
-                if item['capacityId'] != capacity:
-                    logging.warning(f"Workspace with id: {item['id']} is assigned to the wrong capacity with id {item['capacityId']}. "
-                    + f"Proceeding to assign capacity with id {capacity}.")
-                    break
-            elif item['id'] == self.workspaces.workspace[workspace_name] and 'capacityId' not in item:
-                logging.info(f"Workspace with id: {item['id']} is not assigned to capacity. Proceeding to assign capacity with id {capacity}.")
-                break
-
-        url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/AssignToCapacity"
+        url = self.client.base_url + "groups/" + item['id'] + "/AssignToCapacity"
 
         payload = {
             "capacityId": capacity
         }
 
-        response = requests.post(url, data = payload, headers = self.client.url_encoded_headers)
+        response = self.client.post(url, data = payload, headers = self.client.url_encoded_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info(f"Successfully changed capacity of workspace {workspace_name} to {capacity}.")
+            self.client.name_cache.invalidate("groups")
             return response
         else:
             logging.error(f"Failed to change capacity of workspace {workspace_name} to {capacity}.")
@@ -50,7 +50,7 @@ class Capacities:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/CapacityAssignmentStatus"
 
-        response = requests.get(url, headers = self.client.url_encoded_headers)
+        response = self.client.get(url, headers = self.client.url_encoded_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info(f"Successfully retrieved capacity of workspace {workspace_name}.")
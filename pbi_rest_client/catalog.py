@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+import json
+import sqlite3
+import logging
+
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Dict, List
+from .config import BaseConfig
+from .scanner import Catalog, Scanner
+
+config = BaseConfig()
+
+# modifiedSince is only accepted for the last 30 days, older catalogs need a full scan
+MODIFIED_SINCE_LIMIT = timedelta(days = 30)
+# Overlap with the previous sync so changes made while it ran are not missed
+SYNC_OVERLAP = timedelta(minutes = 5)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS workspaces (id TEXT PRIMARY KEY, name TEXT, data TEXT);
+CREATE TABLE IF NOT EXISTS artifacts (type TEXT, id TEXT, workspace_id TEXT, name TEXT, data TEXT, PRIMARY KEY (type, id));
+CREATE INDEX IF NOT EXISTS artifacts_workspace ON artifacts (workspace_id);
+CREATE TABLE IF NOT EXISTS datasource_instances (id TEXT PRIMARY KEY, data TEXT);
+"""
+
+class CatalogStore:
+    def __init__(self, file_name: str = None):
+        ''' Persists the tenant catalog and the time of the last successful scan in a SQLite file '''
+        self.file_name = file_name or config.CATALOG_FILE
+        self.connection = sqlite3.connect(self.file_name)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def last_scan(self) -> datetime:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'last_scan'").fetchone()
+        return None if row is None else datetime.fromisoformat(row[0])
+
+    def load(self) -> Catalog:
+        catalog = Catalog()
+        for workspace_id, data in self.connection.execute("SELECT id, data FROM workspaces"):
+            catalog.workspaces[workspace_id] = json.loads(data)
+            catalog.workspace_artifacts[workspace_id] = {artifact_type: [] for artifact_type in Catalog.ARTIFACT_TYPES}
+        for artifact_type, artifact_id, workspace_id, data in self.connection.execute("SELECT type, id, workspace_id, data FROM artifacts"):
+            catalog.artifacts.setdefault(artifact_type, {})[artifact_id] = json.loads(data)
+            catalog.workspace_artifacts.setdefault(workspace_id, {}).setdefault(artifact_type, []).append(artifact_id)
+        for instance_id, data in self.connection.execute("SELECT id, data FROM datasource_instances"):
+            catalog.datasource_instances[instance_id] = json.loads(data)
+        catalog.scanned_at = self.last_scan()
+        return catalog
+
+    def save(self, catalog: Catalog, replace: bool = False) -> None:
+        ''' Writes the workspaces of the catalog in one transaction, replacing what is stored for each of them
+        Args:
+            replace (bool): Drop everything stored first, used after a full scan so deleted workspaces disappear.
+        '''
+        with self.connection:
+            if replace:
+                for table in ("workspaces", "artifacts", "datasource_instances"):
+                    self.connection.execute("DELETE FROM " + table)
+
+            self.connection.executemany("DELETE FROM artifacts WHERE workspace_id = ?", [(workspace_id,) for workspace_id in catalog.workspaces])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO workspaces (id, name, data) VALUES (?, ?, ?)",
+                [(workspace_id, workspace.get('name'), json.dumps(workspace)) for workspace_id, workspace in catalog.workspaces.items()]
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO artifacts (type, id, workspace_id, name, data) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (artifact_type, artifact_id, item.get('workspaceId'), item.get('name'), json.dumps(item))
+                    for artifact_type, items in catalog.artifacts.items() for artifact_id, item in items.items()
+                ]
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO datasource_instances (id, data) VALUES (?, ?)",
+                [(instance_id, json.dumps(instance)) for instance_id, instance in catalog.datasource_instances.items()]
+            )
+            if catalog.scanned_at is not None and not catalog.errors:
+                self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)", (catalog.scanned_at.isoformat(),))
+
+    def find(self, artifact_type: str, name: str) -> List[Dict]:
+        rows = self.connection.execute("SELECT data FROM artifacts WHERE type = ? AND name = ?", (artifact_type, name))
+        return [json.loads(data) for (data,) in rows]
+
+class CatalogSync:
+    def __init__(self, client, store: CatalogStore = None, scanner: Scanner = None):
+        self.client = client
+        self.store = store or CatalogStore()
+        self.scanner = scanner or Scanner(client)
+
+    def sync(self, full: bool = False, **kwargs) -> Dict:
+        ''' Brings the stored catalog up to date. Only workspaces modified since the last successful scan are scanned,
+        unless full is set, nothing was scanned before, or the last scan is older than the service accepts.
+        The last scan time only moves forward when every batch succeeded, so failed workspaces are retried by the next sync.
+        Args:
+            kwargs: Scan options passed to Scanner.start_scan.
+        Returns:
+            dict: Mode, workspaces scanned, errors and elapsed seconds.
+        '''
+        started = monotonic()
+        last_scan = self.store.last_scan()
+        incremental = not full and last_scan is not None and datetime.now(timezone.utc) - last_scan < MODIFIED_SINCE_LIMIT - SYNC_OVERLAP
+
+        if incremental:
+            workspace_ids = self.scanner.get_modified_workspaces(last_scan - SYNC_OVERLAP)
+        else:
+            logging.info("Running a full tenant scan.")
+            workspace_ids = self.scanner.get_modified_workspaces()
+
+        catalog = self.scanner.scan(workspace_ids, **kwargs)
+        self.store.save(catalog, replace = not incremental and not catalog.errors)
+
+        seconds = monotonic() - started
+        logging.info(f"Catalog sync scanned {len(workspace_ids)} workspaces in {seconds:.1f}s.")
+        return {
+            "mode": "incremental" if incremental else "full",
+            "workspaces": len(workspace_ids),
+            "errors": catalog.errors,
+            "seconds": round(seconds, 3)
+        }
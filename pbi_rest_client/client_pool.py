@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+import logging
+import threading
+import requests
+
+from time import monotonic, sleep
+from typing import Dict, List, Tuple
+from .config import BaseConfig
+from .rest_client import BaseClient, RestClient
+from .retry import RetryPolicy
+
+config = BaseConfig()
+
+class ClientPool(BaseClient):
+    def __init__(self, principals: List[Tuple[str, str]] = None, pool_maxsize: int = None, retry_policy: RetryPolicy = None):
+        ''' Spreads requests over several service principals, each with its own token and request budget, so tenant-wide
+        work is not capped by the throttling limit of one identity. Accepted by the resource classes like a RestClient, e.g. Workspaces(pool).
+        Args:
+            principals (list): (client_id, client_secret) pairs, defaults to POWER_BI_POOL_CLIENT_IDS and POWER_BI_POOL_CLIENT_SECRETS.
+            pool_maxsize (int): HTTP connections kept per principal.
+            retry_policy (RetryPolicy): Retries of throttled requests across the pool, server errors are retried by each principal.
+        '''
+        super().__init__(retry_policy)
+        principals = principals or self.configured_principals()
+        if not principals:
+            raise ValueError("ClientPool needs at least one principal. Set POWER_BI_POOL_CLIENT_IDS and POWER_BI_POOL_CLIENT_SECRETS.")
+
+        # Members hand throttled responses back to the pool so another principal can send the request right away
+        member_policy = RetryPolicy(retry_statuses = (500, 502, 503, 504))
+        self.clients = [
+            RestClient(pool_maxsize = pool_maxsize, retry_policy = member_policy, client_id = client_id, client_secret = client_secret)
+            for client_id, client_secret in principals
+        ]
+
+        self.pool_maxsize = sum(client.pool_maxsize for client in self.clients)
+        self._lock = threading.Lock()
+        self._in_flight = {id(client): 0 for client in self.clients}
+        self._throttled_until = {id(client): 0.0 for client in self.clients}
+        self._sequence = 0
+        self._last_used = {id(client): 0 for client in self.clients}
+
+    def configured_principals(self) -> List[Tuple[str, str]]:
+        client_ids = [value.strip() for value in config.POWER_BI_POOL_CLIENT_IDS.split(',') if value.strip()]
+        client_secrets = [value.strip() for value in config.POWER_BI_POOL_CLIENT_SECRETS.split(',') if value.strip()]
+
+        if len(client_ids) != len(client_secrets):
+            raise ValueError(f"POWER_BI_POOL_CLIENT_IDS has {len(client_ids)} entries but POWER_BI_POOL_CLIENT_SECRETS has {len(client_secrets)}.")
+        return list(zip(client_ids, client_secrets))
+
+    def acquire(self) -> RestClient:
+        ''' Picks the principal with the fewest requests in flight that is not throttled, the least recently used on a tie.
+        Waits for the first principal to come out of throttling when all of them are.
+        '''
+        while True:
+            with self._lock:
+                now = monotonic()
+                available = [client for client in self.clients if self._throttled_until[id(client)] <= now]
+                if available:
+                    client = min(available, key = lambda client: (self._in_flight[id(client)], self._last_used[id(client)]))
+                    self._sequence += 1
+                    self._in_flight[id(client)] += 1
+                    self._last_used[id(client)] = self._sequence
+                    return client
+                delay = min(self._throttled_until.values()) - now
+
+            logging.warning(f"All {len(self.clients)} principals are throttled, waiting {delay:.1f}s.")
+            self.retry_metrics.record_budget_wait(delay)
+            sleep(delay)
+
+    def release(self, client: RestClient) -> None:
+        with self._lock:
+            self._in_flight[id(client)] -= 1
+
+    def throttle(self, client: RestClient, seconds: float) -> None:
+        with self._lock:
+            self._throttled_until[id(client)] = max(self._throttled_until[id(client)], monotonic() + seconds)
+        client.rate_limiter.pause(seconds)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        ''' Sends the request as the least loaded principal. A throttled (429) request is sent again straight away as
+        another principal, while the throttled one rests for its Retry-After.
+        '''
+        # Every principal may be tried once more than the retry policy allows a single client
+        max_attempts = self.retry_policy.max_retries + len(self.clients) - 1
+        attempt = 0
+
+        while True:
+            client = self.acquire()
+            try:
+                client.check_token_expiration()
+                response = client.request(method, url, **kwargs)
+            finally:
+                self.release(client)
+
+            self.retry_metrics.record_response(response.status_code)
+            if response.status_code != 429 or attempt >= max_attempts or not client.rewind_body(kwargs):
+                return response
+
+            delay = self.retry_policy.delay(attempt, response.headers)
+            logging.warning(f"Principal {client.client_id} was throttled for {delay:.1f}s on {method} {url}. Sending the request as another principal.")
+            self.throttle(client, delay)
+            self.retry_metrics.record_retry(0.0)
+            response.close()
+            attempt += 1
+
+    def check_token_expiration(self) -> None:
+        # Each member renews its own token in the background and is checked when it is picked for a request
+        pass
+
+    def close(self) -> None:
+        for client in self.clients:
+            client.close()
+
+    def metrics(self) -> Dict:
+        ''' Returns pool failover counters and each principal's request, retry and in-flight counts '''
+        with self._lock:
+            in_flight = dict(self._in_flight)
+        return {
+            "pool": self.retry_metrics.snapshot(),
+            "principals": {
+                client.client_id: dict(client.retry_metrics.snapshot(), in_flight = in_flight[id(client)])
+                for client in self.clients
+            }
+        }
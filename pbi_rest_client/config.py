@@ -2,6 +2,20 @@
 
 import os
 
+class EnvSetting:
+    ''' Required environment variable read when the setting is used instead of when the module is imported,
+    so code that never touches storage, Key Vault or App Configuration runs without them configured
+    '''
+    def __init__(self, name: str, template: str = "{}"):
+        self.name = name
+        self.template = template
+
+    def __get__(self, instance, owner) -> str:
+        value = os.getenv(self.name)
+        if value is None:
+            raise KeyError(f"Environment variable {self.name} is not set.")
+        return self.template.format(value)
+
 class BaseConfig(object):
     # 'ServiceAccount' == TRUE or 'ServicePrincipal' == FALSE
     auth_mode = False
@@ -26,44 +40,44 @@ class BaseConfig(object):
     POWER_BI_CLIENT_SECRET = os.getenv('POWER_BI_CLIENT_SECRET')
 
     # Storage Account Configuration
-    STORAGE_ACCOUNT_NAME = os.environ['STORAGE_ACCOUNT_NAME']
-    STORAGE_ACCOUNT_URI = f"https://{STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
+    STORAGE_ACCOUNT_NAME = EnvSetting('STORAGE_ACCOUNT_NAME')
+    STORAGE_ACCOUNT_URI = EnvSetting('STORAGE_ACCOUNT_NAME', "https://{}.blob.core.windows.net")
     STORAGE_BLOB_CONTAINER_NAME = "powerbi-container"
 
     ## Storage Account Tenant ID
-    STORAGE_ACCOUNT_TENANT_ID = os.environ['STORAGE_ACCOUNT_TENANT_ID']
+    STORAGE_ACCOUNT_TENANT_ID = EnvSetting('STORAGE_ACCOUNT_TENANT_ID')
 
     ## Storage Account Client ID of the App Registration / Service Principal
-    STORAGE_ACCOUNT_CLIENT_ID = os.environ['STORAGE_ACCOUNT_CLIENT_ID']
+    STORAGE_ACCOUNT_CLIENT_ID = EnvSetting('STORAGE_ACCOUNT_CLIENT_ID')
 
     ## Storage Account Client Secret of the App Registration / Service Principal
-    STORAGE_ACCOUNT_CLIENT_SECRET = os.environ['STORAGE_ACCOUNT_CLIENT_SECRET']
+    STORAGE_ACCOUNT_CLIENT_SECRET = EnvSetting('STORAGE_ACCOUNT_CLIENT_SECRET')
 
     # Key Vault Configuration
-    KEY_VAULT_NAME = os.environ['KEY_VAULT_NAME']
-    KEY_VAULT_URI = f"https://{KEY_VAULT_NAME}.vault.azure.net"
+    KEY_VAULT_NAME = EnvSetting('KEY_VAULT_NAME')
+    KEY_VAULT_URI = EnvSetting('KEY_VAULT_NAME', "https://{}.vault.azure.net")
 
     ## Key Vault Tenant ID
-    KEY_VAULT_TENANT_ID = os.environ['KEY_VAULT_TENANT_ID']
+    KEY_VAULT_TENANT_ID = EnvSetting('KEY_VAULT_TENANT_ID')
 
     ## Key Vault Client ID of the App Registration / Service Principal
-    KEY_VAULT_CLIENT_ID = os.environ['KEY_VAULT_CLIENT_ID']
+    KEY_VAULT_CLIENT_ID = EnvSetting('KEY_VAULT_CLIENT_ID')
 
     ## Key Vault Client Secret of the App Registration / Service Principal
-    KEY_VAULT_CLIENT_SECRET = os.environ['KEY_VAULT_CLIENT_SECRET']
+    KEY_VAULT_CLIENT_SECRET = EnvSetting('KEY_VAULT_CLIENT_SECRET')
 
     # App Config Configuration
-    APP_CONFIG_NAME = os.environ['APP_CONFIG_NAME']
-    APP_CONFIG_URI = f"https://{APP_CONFIG_NAME}.azconfig.io"
+    APP_CONFIG_NAME = EnvSetting('APP_CONFIG_NAME')
+    APP_CONFIG_URI = EnvSetting('APP_CONFIG_NAME', "https://{}.azconfig.io")
 
     ## App Config Tenant ID
-    APP_CONFIG_TENANT_ID = os.environ['APP_CONFIG_TENANT_ID']
+    APP_CONFIG_TENANT_ID = EnvSetting('APP_CONFIG_TENANT_ID')
 
     ## Key Vault Client ID of the App Registration / Service Principal
-    APP_CONFIG_CLIENT_ID = os.environ['APP_CONFIG_CLIENT_ID']
+    APP_CONFIG_CLIENT_ID = EnvSetting('APP_CONFIG_CLIENT_ID')
 
     ## Key Vault Client Secret of the App Registration / Service Principal
-    APP_CONFIG_CLIENT_SECRET = os.environ['APP_CONFIG_CLIENT_SECRET']
+    APP_CONFIG_CLIENT_SECRET = EnvSetting('APP_CONFIG_CLIENT_SECRET')
 
     # Scope for the Power BI REST API call
     # 'https://analysis.windows.net/powerbi/api/App.Read.All',
@@ -93,11 +107,105 @@ class BaseConfig(object):
     SCOPE = ['https://analysis.windows.net/powerbi/api/.default']
 
     # Azure AD Login Authority URL
-    AUTHORITY = "https://login.microsoftonline.com/" + POWER_BI_TENANT_ID
+    AUTHORITY = EnvSetting('POWER_BI_TENANT_ID', "https://login.microsoftonline.com/{}")
 
     # Power BI Base URL
     PBI_BASE_URL = "https://api.powerbi.com/v1.0/myorg/"
     
+    # HTTP connection pool sizing for the shared REST client session
+    HTTP_POOL_CONNECTIONS = int(os.getenv('PBI_HTTP_POOL_CONNECTIONS', 10))
+    HTTP_POOL_MAXSIZE = int(os.getenv('PBI_HTTP_POOL_MAXSIZE', 10))
+
+    # Lifetime in seconds of the cached name to id listings, zero disables the cache
+    NAME_CACHE_TTL = float(os.getenv('PBI_NAME_CACHE_TTL', 300))
+
+    # Default $top page size for collections that support $top/$skip paging
+    ODATA_PAGE_SIZE = int(os.getenv('PBI_ODATA_PAGE_SIZE', 5000))
+
+    # Maximum number of in-flight requests for the asyncio client
+    ASYNC_MAX_CONCURRENCY = int(os.getenv('PBI_ASYNC_MAX_CONCURRENCY', 16))
+
+    # Default worker count for bulk multi-workspace operations
+    BULK_MAX_WORKERS = int(os.getenv('PBI_BULK_MAX_WORKERS', 8))
+
+    # Retry and backoff policy for throttled (429) and failed requests
+    RETRY_MAX_RETRIES = int(os.getenv('PBI_RETRY_MAX_RETRIES', 5))
+    RETRY_BACKOFF_BASE = float(os.getenv('PBI_RETRY_BACKOFF_BASE', 1))
+    RETRY_BACKOFF_MAX = float(os.getenv('PBI_RETRY_BACKOFF_MAX', 60))
+    RETRY_AFTER_MAX = float(os.getenv('PBI_RETRY_AFTER_MAX', 300))
+
+    # Per-tenant request budget shared by every client in the process, zero disables it
+    RATE_LIMIT_PER_SECOND = float(os.getenv('PBI_RATE_LIMIT_PER_SECOND', 15))
+    RATE_LIMIT_BURST = float(os.getenv('PBI_RATE_LIMIT_BURST', 30))
+
+    # Adaptive polling of long running operations such as imports
+    POLL_INITIAL_DELAY = float(os.getenv('PBI_POLL_INITIAL_DELAY', 0.5))
+    POLL_MAX_DELAY = float(os.getenv('PBI_POLL_MAX_DELAY', 30))
+    POLL_BACKOFF_FACTOR = float(os.getenv('PBI_POLL_BACKOFF_FACTOR', 2))
+    POLL_TIMEOUT = float(os.getenv('PBI_POLL_TIMEOUT', 3600))
+    POLL_MAX_WORKERS = int(os.getenv('PBI_POLL_MAX_WORKERS', 8))
+
+    # Chunk size in bytes for streaming blob downloads into uploads
+    STREAM_CHUNK_SIZE = int(os.getenv('PBI_STREAM_CHUNK_SIZE', 4 * 1024 * 1024))
+
+    # Local PBIX files above this size are imported through a temporary upload location in blocks
+    LARGE_IMPORT_THRESHOLD = int(os.getenv('PBI_LARGE_IMPORT_THRESHOLD', 1024 * 1024 * 1024))
+    IMPORT_BLOCK_SIZE = int(os.getenv('PBI_IMPORT_BLOCK_SIZE', 32 * 1024 * 1024))
+    IMPORT_UPLOAD_WORKERS = int(os.getenv('PBI_IMPORT_UPLOAD_WORKERS', 4))
+
+    # Read size and staged block size when streaming exports into blob storage
+    EXPORT_CHUNK_SIZE = int(os.getenv('PBI_EXPORT_CHUNK_SIZE', 8 * 1024 * 1024))
+
+    # Backup exports running at the same time, overall and within one workspace
+    BACKUP_MAX_WORKERS = int(os.getenv('PBI_BACKUP_MAX_WORKERS', 8))
+    BACKUP_MAX_PER_WORKSPACE = int(os.getenv('PBI_BACKUP_MAX_PER_WORKSPACE', 2))
+
+    # Export-to-file jobs in flight overall and per capacity
+    EXPORT_MAX_CONCURRENCY = int(os.getenv('PBI_EXPORT_MAX_CONCURRENCY', 16))
+    EXPORT_MAX_PER_CAPACITY = int(os.getenv('PBI_EXPORT_MAX_PER_CAPACITY', 5))
+
+    # Dataset and dataflow refreshes running at the same time overall and per capacity, and how long to wait for one
+    REFRESH_MAX_CONCURRENCY = int(os.getenv('PBI_REFRESH_MAX_CONCURRENCY', 16))
+    REFRESH_MAX_PER_CAPACITY = int(os.getenv('PBI_REFRESH_MAX_PER_CAPACITY', 4))
+    REFRESH_TIMEOUT = float(os.getenv('PBI_REFRESH_TIMEOUT', 5 * 60 * 60))
+
+    # DAX queries per executeQueries request (the service currently accepts one), requests sent at the same time,
+    # and lifetime of cached query results, which are also invalidated by a newer dataset refresh
+    QUERY_BATCH_SIZE = int(os.getenv('PBI_QUERY_BATCH_SIZE', 1))
+    QUERY_MAX_WORKERS = int(os.getenv('PBI_QUERY_MAX_WORKERS', 8))
+    QUERY_CACHE_TTL = float(os.getenv('PBI_QUERY_CACHE_TTL', 600))
+
+    # Push dataset ingestion: rows per request, service limits per dataset, concurrent requests and batches read ahead
+    PUSH_BATCH_ROWS = int(os.getenv('PBI_PUSH_BATCH_ROWS', 10000))
+    PUSH_ROWS_PER_HOUR = int(os.getenv('PBI_PUSH_ROWS_PER_HOUR', 1000000))
+    PUSH_REQUESTS_PER_MINUTE = int(os.getenv('PBI_PUSH_REQUESTS_PER_MINUTE', 120))
+    PUSH_MAX_WORKERS = int(os.getenv('PBI_PUSH_MAX_WORKERS', 4))
+    PUSH_MAX_PENDING = int(os.getenv('PBI_PUSH_MAX_PENDING', 8))
+
+    # Admin scanner API: scans running at the same time (16 at most) and getInfo / scanResult requests per hour
+    SCAN_MAX_CONCURRENT = int(os.getenv('PBI_SCAN_MAX_CONCURRENT', 16))
+    SCAN_REQUESTS_PER_HOUR = int(os.getenv('PBI_SCAN_REQUESTS_PER_HOUR', 500))
+
+    # Seconds the App Configuration snapshot is used before the sentinel key is checked, and the sentinel key itself
+    APP_CONFIG_CACHE_TTL = float(os.getenv('PBI_APP_CONFIG_CACHE_TTL', 300))
+    APP_CONFIG_SENTINEL_KEY = os.getenv('PBI_APP_CONFIG_SENTINEL_KEY', 'sentinel')
+
+    # Seconds a Key Vault secret is cached (never past its expiry date) and secrets fetched at the same time when prefetching
+    KEY_VAULT_CACHE_TTL = float(os.getenv('PBI_KEY_VAULT_CACHE_TTL', 900))
+    KEY_VAULT_MAX_WORKERS = int(os.getenv('PBI_KEY_VAULT_MAX_WORKERS', 8))
+
+    # Minutes before expiry the access token is renewed in the background, and the encrypted MSAL token cache shared
+    # by processes on this machine (an empty value keeps tokens in memory only)
+    TOKEN_REFRESH_MINUTES = float(os.getenv('PBI_TOKEN_REFRESH_MINUTES', 10))
+    TOKEN_CACHE_FILE = os.getenv('PBI_TOKEN_CACHE_FILE', os.path.join(os.path.expanduser('~'), '.pbi_rest_client', 'token_cache.bin'))
+
+    # Comma separated client ids and secrets, in the same order, of the service principals in a ClientPool
+    POWER_BI_POOL_CLIENT_IDS = os.getenv('POWER_BI_POOL_CLIENT_IDS', '')
+    POWER_BI_POOL_CLIENT_SECRETS = os.getenv('POWER_BI_POOL_CLIENT_SECRETS', '')
+
+    # SQLite file holding the tenant catalog between syncs
+    CATALOG_FILE = os.getenv('PBI_CATALOG_FILE', 'catalog.db')
+
     # REST Client Headers
     JSON_HEADERS = {
             "Content-Type": "application/json"
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
 import logging
-import requests
 
 from typing import List
 from .workspaces import Workspaces
@@ -19,7 +18,7 @@ class Dashboards:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/dashboards"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             for item in response.json()['value']:
@@ -1,8 +1,8 @@
 #!/usr/bin/env python
 
 import logging
+import hashlib
 import json
-import requests
 import os
 
 from typing import List
@@ -25,7 +25,7 @@ class Dataflows:
 
         url = self.client.base_url + "dataflowStorageAccounts/"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved dataflows.")
@@ -42,36 +42,33 @@ class Dataflows:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/dataflows"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved dataflows.")
             self.dataflows = response.json()['value']
+            self.client.name_cache.set_listing(("dataflows", self.workspaces.workspace[workspace_name]), self.dataflows)
             return self.dataflows
         else:
             logging.error("Failed to retrieve pipelines.")
             self.client.force_raise_http_error(response)
     
+    def find_dataflow(self, workspace_name: str, dataflow_name: str) -> dict:
+        self.workspaces.get_workspace_id(workspace_name)
+        self.dataflow = self.client.name_cache.lookup(("dataflows", self.workspaces.workspace[workspace_name]), dataflow_name, lambda: self.get_dataflows(workspace_name))
+        return self.dataflow
+
     # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/get-dataflow
     def get_dataflow(self, workspace_name: str, dataflow_name: str) -> List:
         self.client.check_token_expiration()
-        self.get_dataflows(workspace_name)
-        dataflow_exists = False
-
-        for item in self.dataflows:
-            if item['name'] == dataflow_name:
-                self.dataflow = item
-                dataflow_exists = True
-                break
-            else:
-                self.dataflow = None
+        self.find_dataflow(workspace_name, dataflow_name)
                 
-        if dataflow_exists:
+        if self.dataflow != None:
             url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/dataflows/" + self.dataflow['objectId']
         else:
             return logging.info('Dataflow with name: ' + dataflow_name + ' does not exist.')
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved dataflows.")
@@ -84,23 +81,14 @@ class Dataflows:
     # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/get-dataflow-data-sources
     def get_dataflow_datasources(self, workspace_name: str, dataflow_name: str) -> List:
         self.client.check_token_expiration()
-        self.get_dataflows(workspace_name)
-        dataflow_exists = False
-
-        for item in self.dataflows:
-            if item['name'] == dataflow_name:
-                self.dataflow = item
-                dataflow_exists = True
-                break
-            else:
-                self.dataflow = None
+        self.find_dataflow(workspace_name, dataflow_name)
                 
-        if dataflow_exists:
+        if self.dataflow != None:
             url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/dataflows/" + self.dataflow['objectId'] + "/datasources"
         else:
             return logging.info('Dataflow with name: ' + dataflow_name + ' does not exist.')
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved dataflows.")
@@ -110,6 +98,44 @@ class Dataflows:
             logging.error("Failed to retrieve dataflows.")
             self.client.force_raise_http_error(response)
 
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/refresh-dataflow
+    def refresh_dataflow(self, workspace_name: str, dataflow_name: str, notify_option: str = "NoNotification") -> None:
+        self.client.check_token_expiration()
+        self.find_dataflow(workspace_name, dataflow_name)
+
+        if self.dataflow == None:
+            raise ValueError(f"Dataflow {dataflow_name} does not exist in workspace {workspace_name}.")
+
+        self.refresh_dataflow_id(self.workspaces.workspace[workspace_name], self.dataflow['objectId'], notify_option)
+
+    def refresh_dataflow_id(self, workspace_id: str, dataflow_id: str, notify_option: str = "NoNotification") -> None:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/dataflows/" + dataflow_id + "/refreshes"
+
+        response = self.client.post(url, json = {"notifyOption": notify_option}, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            logging.info("Successfully triggered refresh of dataflow: " + dataflow_id)
+        else:
+            logging.error("Failed to trigger refresh of dataflow: " + dataflow_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/get-dataflow-transactions
+    def get_dataflow_transactions(self, workspace_id: str, dataflow_id: str) -> List:
+        ''' Returns the refresh transactions of the dataflow, newest first '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/dataflows/" + dataflow_id + "/transactions"
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            return response.json()["value"]
+        else:
+            logging.error("Failed to retrieve transactions of dataflow: " + dataflow_id)
+            self.client.force_raise_http_error(response)
+
     # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/update-dataflow
     def update_dataflow(self, workspace_name: str, dataflow_name: str) -> List:
         self.client.check_token_expiration()
@@ -136,9 +162,10 @@ class Dataflows:
             "computeEngineBehavior": "computeOptimized"
         }
 
-        response = requests.patch(url, json = payload, headers = self.client.json_headers)
+        response = self.client.patch(url, json = payload, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
+            self.client.name_cache.invalidate("dataflows", self.workspaces.workspace[workspace_name])
             logging.info("Successfully retrieved dataflows.")
             self.dataflow_json = json.dumps(response.json(), indent=10)
             return self.dataflow_json
@@ -162,23 +189,49 @@ class Dataflows:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/dataflows/" + self.dataflow['objectId']
         
-        response = requests.delete(url, headers = self.client.json_headers)
+        response = self.client.delete(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             self.dataflow = None
+            self.client.name_cache.invalidate("dataflows", self.workspaces.workspace[workspace_name])
             return logging.info("Successfully deleted dataflow with name: " + dataflow_name + " in workspace: " + workspace_name)
         else:
             logging.error("Failed to delete dataflow with name: " + dataflow_name + " in workspace: " + workspace_name)
             self.client.force_raise_http_error(response)
 
-    def export_dataflow(self, workspace_name: str, dataflow_name: str):
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/dataflows/get-dataflow
+    def get_dataflow_definition(self, workspace_id: str, dataflow_id: str) -> bytes:
+        ''' Returns the dataflow definition (model.json) as the bytes that are backed up '''
         self.client.check_token_expiration()
-        self.get_dataflow(workspace_name, dataflow_name)
 
-        out_file = dataflow_name + ".json"
-        blob = utils.blob_client(out_file)
+        url = self.client.base_url + "groups/" + workspace_id + "/dataflows/" + dataflow_id
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code != self.client.http_ok_code:
+            logging.error("Failed to retrieve dataflow: " + dataflow_id + " in workspace: " + workspace_id)
+            self.client.force_raise_http_error(response)
+
+        self.dataflow_json = json.dumps(response.json(), indent=10)
+        return self.dataflow_json.encode("utf-8")
+
+    def export_dataflow(self, workspace_name: str, dataflow_name: str, blob_name: str = None) -> dict:
+        ''' Uploads the dataflow definition (model.json) to blob storage from memory
+        Returns:
+            dict: Blob name, size and SHA-256 of the uploaded definition, None when the dataflow does not exist.
+        '''
+        self.client.check_token_expiration()
+        self.find_dataflow(workspace_name, dataflow_name)
+
+        if self.dataflow == None:
+            logging.info('Dataflow with name: ' + dataflow_name + ' does not exist.')
+            return None
+
+        return self.export_dataflow_id(self.workspaces.workspace[workspace_name], self.dataflow['objectId'], blob_name or dataflow_name + ".json")
+
+    def export_dataflow_id(self, workspace_id: str, dataflow_id: str, blob_name: str) -> dict:
+        data = self.get_dataflow_definition(workspace_id, dataflow_id)
+        utils.blob_client(blob_name).upload_blob(data, overwrite = True)
 
-        with open(out_file, "w+") as f:
-                f.write(self.dataflow_json)
-        with open(out_file, "rb") as data:
-            blob.upload_blob(data, overwrite = True)
\ No newline at end of file
+        logging.info("Exported dataflow: " + dataflow_id + " to blob: " + blob_name)
+        return {"blob_name": blob_name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
\ No newline at end of file
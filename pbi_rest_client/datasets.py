@@ -2,10 +2,34 @@
 
 import logging
 import json
-import requests
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List
+from .config import BaseConfig
 from .workspaces import Workspaces
+from .polling import Poller
+
+config = BaseConfig()
+
+def pairs_to_dict(value):
+    ''' Turns a JSON value decoded with object_pairs_hook = tuple back into dicts and lists '''
+    if isinstance(value, tuple):
+        return {key: pairs_to_dict(item) for key, item in value}
+    if isinstance(value, list):
+        return [pairs_to_dict(item) for item in value]
+    return value
+
+def query_results(content: bytes) -> List[Dict]:
+    ''' Decodes the results of an executeQueries response. Only results[].tables[].rows keep their objects as tuples of
+    (column, value) pairs, so no dict is built per row. Every other object, such as an error or informationProtectionLabel, is a dict.
+    '''
+    results = []
+    for result in dict(json.loads(content, object_pairs_hook = tuple)).get("results") or []:
+        result = {key: value if key == "tables" else pairs_to_dict(value) for key, value in result}
+        if result.get("tables"):
+            result["tables"] = [{key: value if key == "rows" else pairs_to_dict(value) for key, value in table} for table in result["tables"]]
+        results.append(result)
+    return results
 
 class Datasets:
     def __init__(self, client):
@@ -22,7 +46,7 @@ class Datasets:
 
         url = self.client.base_url + "groups?$filter=" + "name eq '" + workspace_name + "'"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             if response.json()["@odata.count"] <= 0:
@@ -36,20 +60,18 @@ class Datasets:
             self.client.force_raise_http_error(response)
     
     # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-datasets
-    def get_datasets(self) -> List:
+    def iter_datasets(self, page_size: int = None) -> Iterator[dict]:
         self.client.check_token_expiration()
 
         url = self.client.base_url + "datasets"
-        
-        response = requests.get(url, headers = self.client.json_headers)
 
-        if response.status_code == self.client.http_ok_code:
-            logging.info("Successfully retrieved workspaces.")
-            self.datasets = response.json()["value"]
-            return self.datasets
-        else:
-            logging.error("Failed to retrieve workspaces.")
-            self.client.force_raise_http_error(response)
+        return self.client.iter_odata(url, page_size)
+
+    def get_datasets(self, page_size: int = None) -> List:
+        self.datasets = list(self.iter_datasets(page_size))
+        logging.info("Successfully retrieved datasets.")
+        self.client.name_cache.set_listing(("datasets",), self.datasets)
+        return self.datasets
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-datasets
     def bind_to_gateway(self, workspace_name) -> List:
@@ -58,7 +80,7 @@ class Datasets:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/datasets/8e677ee5-5423-4ab4-8c33-3cd4161790af/Default.BindToGateway"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved workspaces.")
@@ -75,11 +97,12 @@ class Datasets:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/datasets"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved workspaces.")
             self.datasets = response.json()["value"]
+            self.client.name_cache.set_listing(("datasets", self.workspaces.workspace[workspace_name]), self.datasets)
             return self.datasets
         else:
             logging.error("Failed to retrieve workspaces.")
@@ -87,32 +110,29 @@ class Datasets:
 
     def get_dataset_id(self, dataset_name: str) -> str:
         self.client.check_token_expiration()
-        self.get_datasets()
-        dataset_missing = True
+        item = self.client.name_cache.lookup(("datasets",), dataset_name, self.get_datasets)
 
-        for item in self.datasets:
-            if item['name'] == dataset_name:
-                logging.info(f"Found workspace with name {dataset_name} and workspace id {item['id']}.")
-                self.dataset = {dataset_name: item['id']}
-                dataset_missing = False
-                return self.dataset
-        if dataset_missing:
-            logging.warning(f"Unable to find workspace with name: '{dataset_name}'")
+        if item is None:
+            logging.warning(f"Unable to find dataset with name: '{dataset_name}'")
+            return None
+
+        logging.info(f"Found dataset with name {dataset_name} and dataset id {item['id']}.")
+        self.dataset = {dataset_name: item['id']}
+        return self.dataset
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-dataset-in-group
     def get_dataset_in_workspace_id(self, dataset_name: str, workspace_name: str) -> str:
         self.client.check_token_expiration()
-        self.get_datasets_in_workspace(workspace_name)
-        dataset_missing = True
+        self.workspaces.get_workspace_id(workspace_name)
+        item = self.client.name_cache.lookup(("datasets", self.workspaces.workspace[workspace_name]), dataset_name, lambda: self.get_datasets_in_workspace(workspace_name))
+
+        if item is None:
+            logging.warning(f"Unable to find dataset with name: '{dataset_name}'")
+            return None
 
-        for item in self.datasets:
-            if item['name'] == dataset_name:
-                logging.info(f"Found workspace with name {dataset_name} and workspace id {item['id']}.")
-                self.dataset = {dataset_name: item['id']}
-                dataset_missing = False
-                return self.dataset
-        if dataset_missing:
-            logging.warning(f"Unable to find workspace with name: '{dataset_name}'")
+        logging.info(f"Found dataset with name {dataset_name} and dataset id {item['id']}.")
+        self.dataset = {dataset_name: item['id']}
+        return self.dataset
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-parameters
     def get_dataset_parameters(self, dataset_name: str) -> str:
@@ -121,7 +141,7 @@ class Datasets:
 
         url = self.client.base_url + "datasets/" + self.dataset[dataset_name] + "/parameters"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved workspaces.")
@@ -138,7 +158,7 @@ class Datasets:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/datasets/" + self.dataset[dataset_name] + "/parameters"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved workspaces.")
@@ -155,7 +175,7 @@ class Datasets:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/datasets/" + self.dataset[dataset_name] + "/datasources"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved workspaces.")
@@ -172,7 +192,7 @@ class Datasets:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/datasets/c8aaf294-e7d3-4ed2-964a-df19bcec5455/Default.TakeOver"
         
-        response = requests.post(url, headers = self.client.json_headers)
+        response = self.client.post(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved dataflows.")
@@ -183,18 +203,284 @@ class Datasets:
             self.client.force_raise_http_error(response)
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/refresh-dataset-in-group
-    def refresh_dataset(self, workspace_name: str) -> List:
+    def refresh_dataset(self, workspace_name: str, dataset_name: str, notify_option: str = "NoNotification") -> str:
+        ''' Triggers a refresh of the dataset
+        Args:
+            workspace_name (string): The name of the workspace in Power BI.
+            dataset_name (string): The name of the dataset to refresh.
+            notify_option (string): NoNotification, MailOnFailure or MailOnCompletion. Service principals can only use NoNotification.
+        Returns:
+            string: The request id of the refresh, matching the requestId in the refresh history.
+        '''
         self.client.check_token_expiration()
-        self.workspaces.get_workspace_id(workspace_name)
+        if self.get_dataset_in_workspace_id(dataset_name, workspace_name) is None:
+            raise ValueError(f"Dataset {dataset_name} does not exist in workspace {workspace_name}.")
 
-        url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/datasets/c8aaf294-e7d3-4ed2-964a-df19bcec5455/Default.TakeOver"
-        
-        response = requests.post(url, headers = self.client.json_headers)
+        return self.refresh_dataset_id(self.workspaces.workspace[workspace_name], self.dataset[dataset_name], {"notifyOption": notify_option})
+
+    def refresh_dataset_id(self, workspace_id: str, dataset_id: str, payload: dict = None) -> str:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/refreshes"
+
+        response = self.client.post(url, json = payload or {"notifyOption": "NoNotification"}, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_accepted_code:
+            logging.info("Successfully triggered refresh of dataset: " + dataset_id)
+            # Enhanced refreshes return the refresh id in the Location header
+            location = response.headers.get('Location')
+            return location.rstrip("/").rsplit("/", 1)[-1] if location else response.headers.get('RequestId')
+        else:
+            logging.error("Failed to trigger refresh of dataset: " + dataset_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/power-bi/connect-data/asynchronous-refresh
+    def enhanced_refresh_dataset(self, workspace_name: str, dataset_name: str, objects: List = None, **kwargs) -> str:
+        ''' Triggers an enhanced refresh, which can target single tables and partitions and be tracked and cancelled by its id
+        Args:
+            workspace_name (string): The name of the workspace in Power BI. It must be on a Premium or PPU capacity.
+            dataset_name (string): The name of the dataset to refresh.
+            objects (list): Tables and partitions to refresh, as {"table": ..., "partition": ...} dicts, (table, partition) tuples
+                or table names. The whole dataset is refreshed when omitted.
+            refresh_type (string): Full, ClearValues, Calculate, DataOnly, Automatic or Defragment.
+            commit_mode (string): transactional or partialBatch.
+            max_parallelism (int): Processing threads the engine may use.
+            retry_count (int): Retries of the refresh inside the engine.
+            apply_refresh_policy (bool): Whether the incremental refresh policy is applied.
+            effective_date (string): Date used by the incremental refresh policy.
+            timeout (string): Engine timeout of a single attempt, e.g. 02:00:00.
+        Returns:
+            string: The refresh id, used with get_refresh_execution_details, wait_for_refresh and cancel_refresh.
+        '''
+        self.client.check_token_expiration()
+
+        if self.get_dataset_in_workspace_id(dataset_name, workspace_name) is None:
+            raise ValueError(f"Dataset {dataset_name} does not exist in workspace {workspace_name}.")
+
+        payload = self.enhanced_refresh_payload(objects, **kwargs)
+        refresh_id = self.refresh_dataset_id(self.workspaces.workspace[workspace_name], self.dataset[dataset_name], payload)
+        logging.info(f"Started enhanced refresh {refresh_id} of dataset: {dataset_name} in workspace: {workspace_name}")
+        return refresh_id
+
+    def enhanced_refresh_payload(self, objects: List = None, **kwargs) -> dict:
+        options = {
+            "type": kwargs.get('refresh_type', "Full"),
+            "commitMode": kwargs.get('commit_mode', "transactional"),
+            "maxParallelism": kwargs.get('max_parallelism'),
+            "retryCount": kwargs.get('retry_count'),
+            "applyRefreshPolicy": kwargs.get('apply_refresh_policy'),
+            "effectiveDate": kwargs.get('effective_date'),
+            "timeout": kwargs.get('timeout')
+        }
+        payload = {key: value for key, value in options.items() if value is not None}
+
+        if objects:
+            payload["objects"] = []
+            for item in objects:
+                if isinstance(item, str):
+                    item = {"table": item}
+                elif isinstance(item, (tuple, list)):
+                    item = {"table": item[0], "partition": item[1]}
+                payload["objects"].append(item)
+        return payload
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-refresh-execution-details-in-group
+    def get_refresh_execution_details(self, workspace_name: str, dataset_name: str, refresh_id: str) -> dict:
+        self.client.check_token_expiration()
+        self.get_dataset_in_workspace_id(dataset_name, workspace_name)
+        return self.get_refresh_execution_details_id(self.workspaces.workspace[workspace_name], self.dataset[dataset_name], refresh_id)
+
+    def get_refresh_execution_details_id(self, workspace_id: str, dataset_id: str, refresh_id: str) -> dict:
+        ''' Returns status, extendedStatus, the per table and partition progress in objects, and any messages of an enhanced refresh '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/refreshes/" + refresh_id
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code in (self.client.http_ok_code, self.client.http_accepted_code):
+            return response.json()
+        else:
+            logging.error("Failed to retrieve execution details of refresh: " + refresh_id)
+            self.client.force_raise_http_error(response)
+
+    def wait_for_refresh(self, workspace_name: str, dataset_name: str, refresh_id: str, timeout: float = None) -> dict:
+        ''' Polls an enhanced refresh until it completes and returns its execution details, raising if it failed or was cancelled '''
+        self.get_dataset_in_workspace_id(dataset_name, workspace_name)
+        workspace_id, dataset_id = self.workspaces.workspace[workspace_name], self.dataset[dataset_name]
+
+        def check():
+            details = self.get_refresh_execution_details_id(workspace_id, dataset_id, refresh_id)
+            if details['status'] == "Completed":
+                return details
+            if details['status'] in ("Failed", "Cancelled", "Disabled"):
+                raise RuntimeError(f"Refresh {refresh_id} {details['status'].lower()}: {details.get('messages')}")
+            return None
+
+        return Poller(timeout = timeout).poll(check, f"refresh {refresh_id}")
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/cancel-refresh-in-group
+    def cancel_refresh(self, workspace_name: str, dataset_name: str, refresh_id: str) -> None:
+        self.client.check_token_expiration()
+        self.get_dataset_in_workspace_id(dataset_name, workspace_name)
+        self.cancel_refresh_id(self.workspaces.workspace[workspace_name], self.dataset[dataset_name], refresh_id)
+
+    def cancel_refresh_id(self, workspace_id: str, dataset_id: str, refresh_id: str) -> None:
+        ''' Cancels a running enhanced refresh '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/refreshes/" + refresh_id
+
+        response = self.client.delete(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
-            logging.info("Successfully retrieved dataflows.")
-            self.dataflow_json = json.dumps(response.json(), indent=10)
-            return self.dataflow_json
+            logging.info("Cancelled refresh: " + refresh_id + " of dataset: " + dataset_id)
         else:
-            logging.error("Failed to retrieve pipelines.")
-            self.client.force_raise_http_error(response)
\ No newline at end of file
+            logging.error("Failed to cancel refresh: " + refresh_id + " of dataset: " + dataset_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-refresh-history-in-group
+    def get_refresh_history(self, workspace_id: str, dataset_id: str, top: int = None) -> List:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/refreshes" + (f"?$top={top}" if top else "")
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            return response.json()["value"]
+        else:
+            logging.error("Failed to retrieve refresh history of dataset: " + dataset_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/get-dataset-to-dataflows-links-in-group
+    def get_upstream_dataflows(self, workspace_id: str) -> List:
+        ''' Returns links between the datasets of the workspace and the dataflows they read from '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/upstreamDataflows"
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            return response.json()["value"]
+        else:
+            logging.error("Failed to retrieve upstream dataflows in workspace: " + workspace_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/datasets/execute-queries-in-group
+    def execute_queries(self, workspace_name: str, dataset_name: str, queries: List[str], **kwargs) -> List[Dict]:
+        ''' Runs DAX queries against a dataset and returns the results as columns
+        Args:
+            workspace_name (string): The name of the workspace in Power BI.
+            dataset_name (string): The name of the dataset to query.
+            queries (list): DAX queries, e.g. EVALUATE VALUES('Date'[Year]).
+            impersonated_user_name (string): Optional UPN to evaluate row-level security for.
+            use_cache (bool): Serve repeated queries from the client's query cache until the dataset is refreshed again.
+            as_numpy (bool): Return numpy arrays instead of lists, requires numpy.
+            max_workers (int): Requests sent at the same time.
+        Returns:
+            list: One result per query, in order, with columns (names in order), data (name to values) and row_count.
+        '''
+        self.client.check_token_expiration()
+
+        if self.get_dataset_in_workspace_id(dataset_name, workspace_name) is None:
+            raise ValueError(f"Dataset {dataset_name} does not exist in workspace {workspace_name}.")
+
+        return self.execute_queries_id(self.workspaces.workspace[workspace_name], self.dataset[dataset_name], queries, **kwargs)
+
+    def execute_queries_id(self, workspace_id: str, dataset_id: str, queries: List[str], **kwargs) -> List[Dict]:
+        impersonated_user_name = kwargs.get('impersonated_user_name')
+        as_numpy = kwargs.get('as_numpy', False)
+        max_workers = kwargs.get('max_workers') or config.QUERY_MAX_WORKERS
+        batch_size = max(1, config.QUERY_BATCH_SIZE)
+
+        results = [None] * len(queries)
+        pending = list(range(len(queries)))
+
+        if kwargs.get('use_cache', False):
+            version = self.get_refresh_version(workspace_id, dataset_id)
+            keys = [("query", dataset_id, version, impersonated_user_name, query) for query in queries]
+            for index in pending:
+                results[index] = self.client.query_cache.get(keys[index])
+            pending = [index for index in pending if results[index] is None]
+            logging.info(f"Serving {len(queries) - len(pending)} of {len(queries)} queries from the query cache.")
+        else:
+            keys = None
+
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+
+        def run(batch: List[int]) -> List:
+            return self.post_queries(workspace_id, dataset_id, [queries[index] for index in batch], impersonated_user_name)
+
+        with ThreadPoolExecutor(max_workers = min(max_workers, len(batches)) or 1, thread_name_prefix = "pbi-query") as executor:
+            for batch, batch_results in zip(batches, executor.map(run, batches)):
+                for index, result in zip(batch, batch_results):
+                    results[index] = self.columnar(result)
+                    if keys is not None:
+                        self.client.query_cache.set(keys[index], results[index])
+
+        if as_numpy:
+            return [self.to_numpy(result) for result in results]
+        return results
+
+    def post_queries(self, workspace_id: str, dataset_id: str, queries: List[str], impersonated_user_name: str = None) -> List[Dict]:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/executeQueries"
+
+        payload = {
+            "queries": [{"query": query} for query in queries],
+            "serializerSettings": {"includeNulls": True}
+        }
+        if impersonated_user_name:
+            payload["impersonatedUserName"] = impersonated_user_name
+
+        response = self.client.post(url, json = payload, headers = self.client.json_headers)
+
+        if response.status_code != self.client.http_ok_code:
+            logging.error("Failed to execute queries against dataset: " + dataset_id)
+            self.client.force_raise_http_error(response)
+
+        results = query_results(response.content)
+        for result in results:
+            if result.get("error"):
+                raise RuntimeError(f"Query against dataset {dataset_id} failed: {result['error']}")
+        return results
+
+    def columnar(self, result: Dict) -> Dict:
+        ''' Turns the rows of the first result table into one list per column in a single pass '''
+        tables = result.get("tables") or [{}]
+        rows = tables[0].get("rows") or []
+
+        if not rows:
+            return {"columns": [], "data": {}, "row_count": 0}
+
+        columns = [name for name, _ in rows[0]]
+        if all(len(row) == len(columns) for row in rows):
+            # includeNulls keeps every column in every row in the same order, so the rows can be transposed directly
+            data = {name: [value for _, value in column] for name, column in zip(columns, zip(*rows))}
+        else:
+            for row in rows:
+                columns.extend(name for name, _ in row if name not in columns)
+            data = {name: [] for name in columns}
+            for row in rows:
+                values = dict(row)
+                for name in columns:
+                    data[name].append(values.get(name))
+
+        return {"columns": columns, "data": data, "row_count": len(rows)}
+
+    def to_numpy(self, result: Dict) -> Dict:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("as_numpy requires numpy. Install it with: pip install numpy")
+        return dict(result, data = {name: numpy.asarray(values) for name, values in result["data"].items()})
+
+    def get_refresh_version(self, workspace_id: str, dataset_id: str) -> str:
+        ''' Identifies the current data of the dataset by its latest refresh, so cached results are dropped after a refresh '''
+        history = self.get_refresh_history(workspace_id, dataset_id, top = 1)
+        if not history:
+            return None
+        return f"{history[0].get('requestId')}:{history[0].get('status')}:{history[0].get('endTime')}"
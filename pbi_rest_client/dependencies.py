@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+from typing import Dict, Iterable, List
+
+def dependency_order(dependencies: Dict[str, Iterable[str]]) -> List[str]:
+    ''' Orders names so every name comes after the names it depends on
+    Args:
+        dependencies (dict): Maps each name to the names it depends on.
+    Returns:
+        list: Names in a valid execution order, ties kept in input order.
+    Raises:
+        ValueError: When a dependency is unknown or the dependencies form a cycle.
+    '''
+    dependencies = {name: list(depends_on or []) for name, depends_on in dependencies.items()}
+
+    for name, depends_on in dependencies.items():
+        for dependency in depends_on:
+            if dependency not in dependencies:
+                raise ValueError(f"'{name}' depends on unknown item '{dependency}'.")
+
+    ordered = []
+    placed = set()
+    remaining = list(dependencies)
+
+    while remaining:
+        ready = [name for name in remaining if all(dependency in placed for dependency in dependencies[name])]
+        if not ready:
+            raise ValueError(f"Circular dependency between: {remaining}")
+        for name in ready:
+            ordered.append(name)
+            placed.add(name)
+        remaining = [name for name in remaining if name not in placed]
+
+    return ordered
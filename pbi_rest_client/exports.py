@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+import logging
+
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from .config import BaseConfig
+from .workspaces import Workspaces
+from .reports import Reports
+from .polling import Job, Scheduler
+from .utils.utils import Utils
+from .utils.block_upload import BlockUploader
+
+config = BaseConfig()
+utils = Utils()
+
+class ExportJob(Job):
+    def __init__(self, entry: Dict):
+        super().__init__()
+        self.workspace_name = entry['workspace_name']
+        self.report_name = entry['report_name']
+        self.format = entry.get('format', 'PDF').upper()
+        self.configuration = entry.get('configuration')
+        self.blob_name = entry.get('blob_name')
+        self.file_name = entry.get('file_name')
+        self.name = entry.get('name', f"{self.workspace_name}/{self.report_name}.{self.format.lower()}")
+        self.timeout = entry.get('timeout', config.POLL_TIMEOUT)
+        self.workspace_id = None
+        self.report_id = None
+        self.capacity = None
+        self.paginated = False
+        self.export_id = None
+        self.size = None
+        self.rendered = None
+
+        if not self.blob_name and not self.file_name:
+            self.blob_name = self.name
+
+    def result(self) -> Dict:
+        return {
+            "name": self.name,
+            "workspace_name": self.workspace_name,
+            "report_name": self.report_name,
+            "format": self.format,
+            "status": self.status,
+            "export_id": self.export_id,
+            "blob_name": self.blob_name,
+            "file_name": self.file_name,
+            "size": self.size,
+            "error": None if self.error is None else str(self.error),
+            "render_seconds": None if self.rendered is None else round(self.rendered - self.started, 3),
+            "total_seconds": None if self.finished is None or self.started is None else round(self.finished - self.started, 3)
+        }
+
+class Exports(Scheduler):
+    def __init__(self, client, max_concurrency: int = None, max_per_capacity: int = None, max_downloads: int = None):
+        ''' Renders reports to files (PDF, PPTX, PNG and the paginated formats) through the export-to-file API
+        Args:
+            max_concurrency (int): Exports in flight across all capacities.
+            max_per_capacity (int): Exports in flight on one capacity, keep it at or below the capacity's concurrent export limit.
+            max_downloads (int): Finished files downloaded at the same time.
+        '''
+        self.client = client
+        self.max_concurrency = max_concurrency or config.EXPORT_MAX_CONCURRENCY
+        self.max_per_capacity = max_per_capacity or config.EXPORT_MAX_PER_CAPACITY
+        self.max_downloads = max_downloads or config.BULK_MAX_WORKERS
+
+    def export_to_file(self, workspace_name: str, report_name: str, file_format: str, **kwargs) -> Dict:
+        ''' Exports one report and waits for the file
+        Args:
+            workspace_name (string): The name of the workspace in Power BI.
+            report_name (string): The name of the report to export.
+            file_format (string): PDF, PPTX, PNG, or for paginated reports also XLSX, DOCX, CSV, XML, MHTML, IMAGE and ACCESSIBLEPDF.
+            blob_name (string): Destination blob, used unless file_name is set.
+            file_name (string): Destination file on local disk.
+            configuration (dict): Optional powerBIReportConfiguration or paginatedReportConfiguration.
+        Returns:
+            dict: The export result with status Succeeded or Failed.
+        '''
+        return self.export_reports([dict(kwargs, workspace_name = workspace_name, report_name = report_name, format = file_format)])[0]
+
+    def export_reports(self, requests: List[Dict]) -> List[Dict]:
+        ''' Runs many exports from one scheduler: jobs are submitted while the concurrency limits allow, all running jobs are
+        polled from this thread with backoff or the service's Retry-After, and finished files are streamed by a small download pool.
+        Args:
+            requests (list): Entries with workspace_name, report_name, format and optional blob_name, file_name, configuration, name and timeout.
+        Returns:
+            list: One result per entry, in request order.
+        '''
+        jobs = [ExportJob(entry) for entry in requests]
+
+        for job in jobs:
+            try:
+                self.resolve(job)
+            except Exception as error:
+                logging.error(f"Failed to resolve report {job.report_name} in workspace {job.workspace_name}: {error}")
+                job.finish("Failed", error)
+
+        self.run_jobs(jobs, self.max_downloads, "pbi-export")
+
+        succeeded = sum(1 for job in jobs if job.status == "Succeeded")
+        logging.info(f"Export finished: {succeeded} of {len(jobs)} files exported.")
+        return [job.result() for job in jobs]
+
+    def resolve(self, job: ExportJob) -> None:
+        reports = Reports(self.client)
+        report = reports.get_report(job.workspace_name, job.report_name)
+        if report is None:
+            raise ValueError(f"Report {job.report_name} does not exist in workspace {job.workspace_name}.")
+
+        workspace = Workspaces(self.client).find_workspace(job.workspace_name)
+        job.workspace_id = workspace['id']
+        job.report_id = report['id']
+        job.capacity = workspace.get('capacityId') or "shared"
+        job.paginated = report.get('reportType') == "PaginatedReport"
+
+    def payload(self, job: ExportJob) -> Dict:
+        payload = {"format": job.format}
+        if job.configuration:
+            payload["paginatedReportConfiguration" if job.paginated else "powerBIReportConfiguration"] = job.configuration
+        return payload
+
+    def in_flight(self, jobs: List[ExportJob]) -> List[ExportJob]:
+        return [job for job in jobs if job.status in ("Running", "Downloading")]
+
+    def start_jobs(self, jobs: List[ExportJob], executor: ThreadPoolExecutor, downloads: Dict) -> None:
+        running = self.in_flight(jobs)
+        per_capacity = {}
+        for job in running:
+            per_capacity[job.capacity] = per_capacity.get(job.capacity, 0) + 1
+
+        for job in jobs:
+            if len(running) >= self.max_concurrency:
+                return
+            if job.status != "Pending" or per_capacity.get(job.capacity, 0) >= self.max_per_capacity:
+                continue
+
+            job.started = monotonic()
+            try:
+                job.export_id = Reports(self.client).export_to(job.workspace_id, job.report_id, self.payload(job))['id']
+            except Exception as error:
+                logging.error(f"Failed to start export {job.name}: {error}")
+                job.finish("Failed", error)
+                continue
+
+            job.status = "Running"
+            job.next_poll = monotonic() + job.backoff.next()
+            running.append(job)
+            per_capacity[job.capacity] = per_capacity.get(job.capacity, 0) + 1
+
+    def poll_jobs(self, jobs: List[ExportJob], executor: ThreadPoolExecutor, downloads: Dict) -> None:
+        reports = Reports(self.client)
+        now = monotonic()
+
+        for job in jobs:
+            if job.status != "Running" or job.next_poll > now:
+                continue
+            try:
+                response = reports.get_export_to_status(job.workspace_id, job.report_id, job.export_id)
+                status = response.json()['status']
+            except Exception as error:
+                logging.error(f"Failed to poll export {job.name}: {error}")
+                job.finish("Failed", error)
+                continue
+
+            if status == "Succeeded":
+                job.rendered = monotonic()
+                job.status = "Downloading"
+                downloads[executor.submit(self.download, job)] = job
+            elif status == "Failed":
+                error = response.json().get('error') or "Export failed."
+                logging.error(f"Export {job.name} failed: {error}")
+                job.finish("Failed", RuntimeError(error))
+            elif job.timeout and monotonic() - job.started > job.timeout:
+                job.finish("Failed", TimeoutError(f"Timed out after {job.timeout}s waiting for export {job.export_id}."))
+            else:
+                retry_after = self.client.retry_policy.retry_after(response.headers)
+                job.next_poll = monotonic() + (retry_after if retry_after is not None else job.backoff.next())
+
+    def download(self, job: ExportJob) -> int:
+        response = Reports(self.client).get_export_to_file(job.workspace_id, job.report_id, job.export_id)
+        with response:
+            chunks = response.iter_content(chunk_size = config.EXPORT_CHUNK_SIZE)
+            if job.file_name:
+                size = 0
+                with open(job.file_name, 'wb') as fd:
+                    for chunk in chunks:
+                        fd.write(chunk)
+                        size += len(chunk)
+                return size
+            return BlockUploader(config.EXPORT_CHUNK_SIZE).upload_chunks(utils.blob_client(job.blob_name), chunks)['uploaded_bytes']
+
+    def collect_jobs(self, downloads: Dict) -> None:
+        for future in [future for future in downloads if future.done()]:
+            job = downloads.pop(future)
+            try:
+                job.size = future.result()
+            except Exception as error:
+                logging.error(f"Failed to download export {job.name}: {error}")
+                job.finish("Failed", error)
+                continue
+            logging.info(f"Exported {job.name} ({job.size} bytes) to " + (job.file_name or f"blob {job.blob_name}"))
+            job.finish("Succeeded")
@@ -1,10 +1,9 @@
 #!/usr/bin/env python
 
 import logging
-import requests
 import os
 
-from typing import List
+from typing import Iterator, List
 from string import Template
 from .helpers.serializecredentials import Helpers
 from .helpers.asymmetrickeyencryptor import AsymmetricKeyEncryptor
@@ -49,20 +48,17 @@ class Gateways:
         return self.connection_details, self.encrypted_credentials
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/get-gateways
-    def get_gateways(self) -> List:
+    def iter_gateways(self, page_size: int = None) -> Iterator[dict]:
         self.client.check_token_expiration()
 
         url = self.client.base_url + "gateways"
-        
-        response = requests.get(url, headers = self.client.json_headers)
 
-        if response.status_code == self.client.http_ok_code:
-            logging.info("Successfully retrieved gateways.")
-            self.gateways = response.json()["value"]
-            return self.gateways
-        else:
-            logging.error("Failed to retrieve gateways.")
-            self.client.force_raise_http_error(response)
+        return self.client.iter_odata(url, page_size)
+
+    def get_gateways(self, page_size: int = None) -> List:
+        self.gateways = list(self.iter_gateways(page_size))
+        logging.info("Successfully retrieved gateways.")
+        return self.gateways
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/gateways/get-gateway
     def get_gateway(self, gateway_name: str) -> List:
@@ -83,7 +79,7 @@ class Gateways:
 
         url = self.client.base_url + "gateways/" + self.gateway_json['id']
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved gateway with name: " + gateway_name)
@@ -100,7 +96,7 @@ class Gateways:
 
         url = self.client.base_url + "gateways/" + self.gateway['id'] + "/datasources"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved datasources.")
@@ -129,7 +125,7 @@ class Gateways:
 
         url = self.client.base_url + "gateways/" + self.gateway_json['id'] + "/datasources/" + self.datasource_json['id']
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved datasources.")
@@ -158,7 +154,7 @@ class Gateways:
 
         url = self.client.base_url + "gateways/" + self.gateway_json['id'] + "/datasources/" + self.datasource_json['id'] + "/status"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved datasources.")
@@ -191,7 +187,7 @@ class Gateways:
             }
         }
 
-        response = requests.post(url, json = payload, headers = self.client.json_headers)
+        response = self.client.post(url, json = payload, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_created_code:
             logging.info("Successfully created datasource with name: " + datasource_name)
@@ -222,7 +218,7 @@ class Gateways:
             }
         }
                 
-        response = requests.patch(url, json = payload, headers = self.client.json_headers)
+        response = self.client.patch(url, json = payload, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully updated datasource with name: " + datasource_name + " and id: ")
@@ -1,20 +1,31 @@
 #!/usr/bin/env python
 
 import logging
-import requests
+import io
 import os
 import json
 
-from time import sleep
+from datetime import datetime, timezone
+from concurrent.futures import Future
+from typing import Callable
 from .config import BaseConfig
 from .utils.utils import Utils
 from .workspaces import Workspaces
 from .dataflows import Dataflows
 from .reports import Reports
+from .polling import Poller
+from .utils.streaming import MultipartStream
+from .utils.block_upload import BlockUploader
 
 config = BaseConfig()
 utils = Utils()
 
+def backup_blob_name(report_name: str) -> str:
+    ''' Blob the deployed report is backed up to before an import replaces it. The timestamped name under backup/ never
+    collides with <report_name>.pbix, which may be the very blob being restored.
+    '''
+    return f"backup/{report_name}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.pbix"
+
 class Imports:
     def __init__(self, client):
         self.client = client
@@ -25,36 +36,55 @@ class Imports:
         self.report_name = None
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/imports/post-import
-    def import_file_into_workspace(self, workspace_name: str, display_name: str, file_name: str, **kwargs) -> None:
-        restore_from_blob = kwargs.get('restore_from_blob', False)
-        blob_container_name = kwargs.get('blob_container_name', None)
-        dataflow = kwargs.get('dataflow', False)
-        skip_report = kwargs.get('skip_report', False)
-        ''' Imports files into Power BI
+    def import_file_into_workspace(self, workspace_name: str, display_name: str, file_name: str, **kwargs) -> dict:
+        ''' Imports files into Power BI and waits for the import to finish
         Args:
             workspace_name (string): The name of the workspace in Power BI. Service Account must have permissions to write to the workspace.
             display_name (string): The display name that will be assigned to the objects imported into the Power BI workspace.
+            timeout (float): Optional limit in seconds for the import to finish.
         Returns:
-            string: Requests HTTP Response
+            dict: The finished import
         '''
+        import_id = self.upload_file(workspace_name, display_name, file_name, **kwargs)
+        return self.wait_for_import(workspace_name, import_id, timeout = kwargs.get('timeout'))
+
+    def begin_import(self, workspace_name: str, display_name: str, file_name: str, callback: Callable[[Future], None] = None, **kwargs) -> Future:
+        ''' Uploads the file and returns straight away with a Future that completes when Power BI has processed the import.
+        Many imports can be started this way and awaited together with concurrent.futures.wait.
+        '''
+        import_id = self.upload_file(workspace_name, display_name, file_name, **kwargs)
+        workspace_id = self.workspaces.workspace[workspace_name]
+        poller = Poller(timeout = kwargs.get('timeout'))
+        return poller.submit(lambda: self.check_import(workspace_name, workspace_id, import_id), f"import {import_id}", callback)
+
+    def upload_file(self, workspace_name: str, display_name: str, file_name: str, **kwargs) -> str:
+        ''' Posts the file to the workspace imports endpoint and returns the import id without waiting for it to finish '''
+        restore_from_blob = kwargs.get('restore_from_blob', False)
+        blob_container_name = kwargs.get('blob_container_name', None)
+        dataflow = kwargs.get('dataflow', False)
+        skip_report = kwargs.get('skip_report', False)
+
+        if not (restore_from_blob or dataflow) and os.path.isfile(file_name) and os.path.getsize(file_name) > config.LARGE_IMPORT_THRESHOLD:
+            logging.info(f"{file_name} is larger than {config.LARGE_IMPORT_THRESHOLD} bytes, importing through a temporary upload location.")
+            return self.upload_large_file(workspace_name, display_name, file_name, **kwargs)
 
         self.workspaces.get_workspace_id(workspace_name)
 
         if restore_from_blob:
-            blob = utils.blob_client(file_name)
-            with open(file_name, 'wb') as file:
-                data = blob.download_blob()
-                file.write(data.readall())
-
-        if not os.path.isfile(file_name):
+            # Blob content is streamed straight into the upload, nothing is written to local disk
+            blob = utils.blob_client(file_name, max_single_get_size = config.STREAM_CHUNK_SIZE, max_chunk_get_size = config.STREAM_CHUNK_SIZE)
+        elif not os.path.isfile(file_name):
             raise FileNotFoundError(2, f"No such file or directory: '{file_name}'. Please check the file exists and try again.")
         
         if dataflow:
             display_name = 'model.json'
-            with open(file_name, 'r') as f:
-                json_data = json.load(f)
-                self.dataflow_name = json_data['name']
-                self.dataflows.get_dataflow(workspace_name, self.dataflow_name)
+            if restore_from_blob:
+                dataflow_content = blob.download_blob().readall()
+            else:
+                with open(file_name, 'rb') as f:
+                    dataflow_content = f.read()
+            self.dataflow_name = json.loads(dataflow_content)['name']
+            self.dataflows.get_dataflow(workspace_name, self.dataflow_name)
         else:
             self.report_name = file_name.rstrip('.pbix')
             self.reports.get_report(workspace_name, self.report_name)
@@ -69,44 +99,190 @@ class Imports:
             + ("&skipReport=true" if skip_report else "")
         )
 
+        headers = self.client.multipart_headers
+        files = {}
+        stream = None
+
         if dataflow:
             if self.dataflows.dataflow != None:
                 logging.info("Deleting dataflow: " + self.dataflow_name + " before importing into workspace: " + workspace_name)
                 self.dataflows.delete_dataflow(workspace_name, self.dataflow_name)
             files = {
-                'value': ("Content-Disposition: form-data name=model.json; filename=model.json Content-Type: application/json", open(file_name, 'rb'))
+                'value': ("Content-Disposition: form-data name=model.json; filename=model.json Content-Type: application/json", io.BytesIO(dataflow_content))
             }
         else:
             if self.reports.report != None:
                 logging.info("Backing up PBIX file: " + file_name + " to blob container: " + config.STORAGE_BLOB_CONTAINER_NAME)
-                self.reports.export_report(workspace_name, self.report_name)
-            files = {
-                'filename': open(file_name, 'rb')
-            }
+                self.reports.export_report_to_blob(workspace_name, self.report_name, backup_blob_name(self.report_name))
+            if restore_from_blob:
+                stream = MultipartStream.from_blob(blob, 'filename', os.path.basename(file_name))
+                headers = dict(self.client.multipart_headers, **{"Content-Type": stream.content_type})
+                logging.info(f"Streaming {stream.size} bytes from blob {file_name} into the import request.")
+            else:
+                files = {
+                    'filename': open(file_name, 'rb')
+                }
 
-        response = requests.post(url, headers = self.client.multipart_headers, files = files)
+        try:
+            response = self.client.post(url, headers = headers, files = files or None, data = stream)
+        finally:
+            for item in files.values():
+                (item[1] if isinstance(item, tuple) else item).close()
 
         if response.status_code == self.client.http_accepted_code:
             logging.info(response.json())
             import_id = response.json()["id"]
             logging.info(f"Uploading file uploading with id: {import_id}")
+            return import_id
         else:
             self.client.force_raise_http_error(response)
 
-        get_import_url = self.client.base_url + f"groups/{self.workspaces.workspace[workspace_name]}/imports/{import_id}"
-        
-        while True:
-            response = requests.get(url = get_import_url, headers = self.client.multipart_headers)
-
-            if response.status_code != self.client.http_ok_code:
-                logging.error("Failed to upload file to workspace.")
-                self.client.force_raise_http_error(response)
-            if response.json()["importState"] == "Succeeded":
-                logging.info(f"Successfully imported file to workspace {workspace_name}.")
-                return
-            if response.json()["importState"] == "Failed":
-                logging.error("Failed to upload file to workspace.")
-                self.client.force_raise_http_error(response)
-            else:
-                logging.info("Import is currently in progress. . . Please wait.")
-                sleep(10)
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/imports/create-temporary-upload-location-in-group
+    def create_temporary_upload_location(self, workspace_id: str) -> str:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + f"groups/{workspace_id}/imports/createTemporaryUploadLocation"
+
+        response = self.client.post(url, headers = self.client.json_headers)
+
+        if response.status_code != self.client.http_ok_code:
+            logging.error("Failed to create temporary upload location.")
+            self.client.force_raise_http_error(response)
+        return response.json()["url"]
+
+    def import_large_file(self, workspace_name: str, display_name: str, file_name: str, **kwargs) -> dict:
+        ''' Imports a PBIX file of any size through a temporary upload location and waits for the import to finish
+        Args:
+            workspace_name (string): The name of the workspace in Power BI.
+            display_name (string): The display name that will be assigned to the objects imported into the Power BI workspace.
+            file_name (string): Path of the local PBIX file.
+            checkpoint_file (string): Where upload progress is recorded, defaults to <file_name>.upload.json.
+            block_size (int): Optional block size in bytes.
+            max_workers (int): Optional number of blocks uploaded at the same time.
+            timeout (float): Optional limit in seconds for the import to finish.
+        Returns:
+            dict: The finished import
+        '''
+        import_id = self.upload_large_file(workspace_name, display_name, file_name, **kwargs)
+        return self.wait_for_import(workspace_name, import_id, timeout = kwargs.get('timeout'))
+
+    def upload_large_file(self, workspace_name: str, display_name: str, file_name: str, **kwargs) -> str:
+        ''' Uploads the file in blocks to a temporary upload location and starts the import from its URL.
+        Progress is kept in a checkpoint file, so running the same upload again after an interruption only sends the missing blocks.
+        '''
+        from azure.core.exceptions import HttpResponseError
+        from azure.storage.blob import BlobClient
+
+        skip_report = kwargs.get('skip_report', False)
+        checkpoint_file = kwargs.get('checkpoint_file') or f"{file_name}.upload.json"
+        uploader = BlockUploader(kwargs.get('block_size'), kwargs.get('max_workers'))
+
+        if not os.path.isfile(file_name):
+            raise FileNotFoundError(2, f"No such file or directory: '{file_name}'. Please check the file exists and try again.")
+
+        self.workspaces.get_workspace_id(workspace_name)
+        workspace_id = self.workspaces.workspace[workspace_name]
+
+        stats = None
+        checkpoint = self.read_upload_checkpoint(checkpoint_file, file_name, workspace_id, uploader.block_size)
+
+        # The existing report is backed up once per upload, a resumed run only sends the missing blocks
+        if checkpoint is None or not checkpoint.get("backed_up"):
+            self.report_name = file_name.rstrip('.pbix')
+            self.reports.get_report(workspace_name, self.report_name)
+            if self.reports.report != None:
+                logging.info("Backing up PBIX file: " + file_name + " to blob container: " + config.STORAGE_BLOB_CONTAINER_NAME)
+                self.reports.export_report_to_blob(workspace_name, self.report_name, backup_blob_name(self.report_name))
+        else:
+            logging.info(f"Resuming upload of {file_name}, the existing report was already backed up.")
+
+        if checkpoint is not None:
+            try:
+                stats = uploader.upload_file(BlobClient.from_blob_url(checkpoint["url"]), file_name)
+                upload_url = checkpoint["url"]
+            except HttpResponseError as error:
+                # Temporary upload locations expire, an old one means starting over
+                logging.warning(f"Could not resume upload of {file_name}, starting a new upload: {error}")
+
+        if stats is None:
+            upload_url = self.create_temporary_upload_location(workspace_id)
+            self.write_upload_checkpoint(checkpoint_file, file_name, workspace_id, uploader.block_size, upload_url)
+            stats = uploader.upload_file(BlobClient.from_blob_url(upload_url), file_name)
+
+        logging.info(f"Uploaded {stats['uploaded_bytes']} bytes of {file_name} in {stats['seconds']}s ({stats['bytes_per_second']} bytes/s).")
+
+        url = (
+            f"{self.client.base_url}"
+            + "groups/"
+            + f"{workspace_id}"
+            + "/imports?"
+            + f"datasetDisplayName={display_name}"
+            + "&nameConflict=CreateOrOverwrite"
+            + ("&skipReport=true" if skip_report else "")
+        )
+
+        response = self.client.post(url, headers = self.client.json_headers, json = {"fileUrl": upload_url})
+
+        if response.status_code == self.client.http_accepted_code:
+            import_id = response.json()["id"]
+            logging.info(f"Importing {file_name} from temporary upload location with id: {import_id}")
+            os.remove(checkpoint_file)
+            return import_id
+        else:
+            self.client.force_raise_http_error(response)
+
+    def read_upload_checkpoint(self, checkpoint_file: str, file_name: str, workspace_id: str, block_size: int) -> dict:
+        ''' Returns the saved upload when it belongs to the same file, workspace and block size, otherwise None '''
+        if not os.path.isfile(checkpoint_file):
+            return None
+
+        with open(checkpoint_file, 'r') as f:
+            checkpoint = json.load(f)
+
+        stat = os.stat(file_name)
+        expected = {"workspace_id": workspace_id, "size": stat.st_size, "modified": stat.st_mtime, "block_size": block_size}
+        if any(checkpoint.get(key) != value for key, value in expected.items()):
+            logging.info(f"Ignoring upload checkpoint {checkpoint_file} because {file_name} or the upload settings changed.")
+            return None
+        return checkpoint
+
+    def write_upload_checkpoint(self, checkpoint_file: str, file_name: str, workspace_id: str, block_size: int, upload_url: str) -> None:
+        # The upload URL carries a short lived SAS token that only grants write access to the temporary location.
+        # Checkpoints are written after the existing report was backed up, which lets a resumed run skip the backup.
+        stat = os.stat(file_name)
+        with open(checkpoint_file, 'w') as f:
+            json.dump({"workspace_id": workspace_id, "size": stat.st_size, "modified": stat.st_mtime, "block_size": block_size, "url": upload_url, "backed_up": True}, f)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/imports/get-import-in-group
+    def get_import(self, workspace_id: str, import_id: str) -> dict:
+        self.client.check_token_expiration()
+
+        get_import_url = self.client.base_url + f"groups/{workspace_id}/imports/{import_id}"
+
+        response = self.client.get(url = get_import_url, headers = self.client.json_headers)
+
+        if response.status_code != self.client.http_ok_code:
+            logging.error("Failed to retrieve import status.")
+            self.client.force_raise_http_error(response)
+        return response
+
+    def check_import(self, workspace_name: str, workspace_id: str, import_id: str) -> dict:
+        ''' Returns the import once it has succeeded, None while it is still in progress, and raises if it failed '''
+        response = self.get_import(workspace_id, import_id)
+
+        if response.json()["importState"] == "Succeeded":
+            logging.info(f"Successfully imported file to workspace {workspace_name}.")
+            for artifact_type in ("datasets", "reports", "dataflows"):
+                self.client.name_cache.invalidate(artifact_type, workspace_id)
+            return response.json()
+        if response.json()["importState"] == "Failed":
+            logging.error("Failed to upload file to workspace.")
+            self.client.force_raise_http_error(response)
+
+        logging.info("Import is currently in progress. . . Please wait.")
+        return None
+
+    def wait_for_import(self, workspace_name: str, import_id: str, timeout: float = None) -> dict:
+        self.workspaces.get_workspace_id(workspace_name)
+        workspace_id = self.workspaces.workspace[workspace_name]
+        return Poller(timeout = timeout).poll(lambda: self.check_import(workspace_name, workspace_id, import_id), f"import {import_id}")
@@ -1,9 +1,8 @@
 #!/usr/bin/env python
 
 import logging
-import requests
 
-from typing import List
+from typing import Iterator, List
 from .utils.utils import Utils
 from .workspaces import Workspaces
 from .dataflows import Dataflows
@@ -27,8 +26,12 @@ class Pipelines:
         self.pipeline_stage_order = None
         self.pipeline_stage = None
         self.pipeline_target_stage = None
-        self._workspace_keys = utils.get_appconfig_keys(key_filter = 'workspace-name*')
         self.pipeline_stages = {'dev': 0, 'test': 1, 'prod': 2}
+
+    @property
+    def _workspace_keys(self) -> dict:
+        # Served from the shared App Configuration snapshot, read on the first deployment instead of in the constructor
+        return utils.get_appconfig_keys(key_filter = 'workspace-name*')
     
     # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/get-pipeline
     def get_pipeline(self, pipeline_name: str) -> List:
@@ -37,7 +40,7 @@ class Pipelines:
 
         url = self.client.base_url + "pipelines/" + self.pipeline[pipeline_name] + "?$expand=stages"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info(f"Successfully retrieved pipeline {self.pipeline[pipeline_name]}.")
@@ -47,36 +50,30 @@ class Pipelines:
             self.client.force_raise_http_error(response)
     
     # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/get-pipelines
-    def get_pipelines(self) -> List:
+    def iter_pipelines(self, page_size: int = None) -> Iterator[dict]:
         self.client.check_token_expiration()
 
         url = self.client.base_url + "pipelines"
-        
-        response = requests.get(url, headers = self.client.json_headers)
 
-        if response.status_code == self.client.http_ok_code:
-            logging.info("Successfully retrieved pipelines.")
-            self.pipelines = response.json()["value"]
-            return self.pipelines
-        else:
-            logging.error("Failed to retrieve pipelines.")
-            self.client.force_raise_http_error(response)
+        return self.client.iter_odata(url, page_size)
+
+    def get_pipelines(self, page_size: int = None) -> List:
+        self.pipelines = list(self.iter_pipelines(page_size))
+        logging.info("Successfully retrieved pipelines.")
+        self.client.name_cache.set_listing(("pipelines",), self.pipelines, 'displayName')
+        return self.pipelines
     
     def get_pipeline_id(self, pipeline_name: str) -> str:
         self.client.check_token_expiration()
-        pipeline_missing = True
+        item = self.client.name_cache.lookup(("pipelines",), pipeline_name, self.get_pipelines, 'displayName')
 
-        self.get_pipelines()
-        
-        for item in self.pipelines:
-            if item['displayName'] == pipeline_name:
-                logging.info(f"Found pipeline with name {pipeline_name} and pipeline id {item['id']}.")
-                self.pipeline = {pipeline_name: item['id']}
-                pipeline_missing = False
-                return self.pipeline
-        if pipeline_missing:
+        if item is None:
             raise RuntimeError(f"Unable to find pipeline with name: '{pipeline_name}'")
 
+        logging.info(f"Found pipeline with name {pipeline_name} and pipeline id {item['id']}.")
+        self.pipeline = {pipeline_name: item['id']}
+        return self.pipeline
+
     def validate_pipeline_stage(self, stage: str):
         stage = stage.lower()
         
@@ -97,7 +94,7 @@ class Pipelines:
 
         url = self.client.base_url + "pipelines/" + self.pipeline[pipeline_name] + "/stages"
                 
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
                    
         if response.status_code == self.client.http_ok_code:
             logging.info(f"Successfully retrieved pipeline stages for pipeline {pipeline_name}.")
@@ -120,14 +117,7 @@ class Pipelines:
     # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/create-pipeline
     def create_pipeline(self, pipeline_name: str) -> None:
         self.client.check_token_expiration()
-        self.get_pipelines()
-        self.pipeline_exists = False
-               
-        for object in self.pipelines:
-            if object['displayName'] == f'{pipeline_name}':
-                logging.info(f"Successfully retrieved pipeline with name {pipeline_name}.")
-                self.pipeline_exists = True
-                break
+        self.pipeline_exists = self.client.name_cache.lookup(("pipelines",), pipeline_name, self.get_pipelines, 'displayName') != None
 
         if self.pipeline_exists:
             logging.warning(f"Pipeline {pipeline_name} already exists, no changes made.")
@@ -136,11 +126,11 @@ class Pipelines:
         logging.info(f"Attempting to create pipeline with name: {pipeline_name}...")
         url = self.client.base_url + "pipelines"
         
-        response = requests.post(url, data={"displayName": pipeline_name}, headers=self.client.url_encoded_headers)
+        response = self.client.post(url, data={"displayName": pipeline_name}, headers=self.client.url_encoded_headers)
 
         if response.status_code == self.client.http_created_code:
             logging.info(f"Successfully created pipeline {pipeline_name}.")
-            self.get_pipelines()
+            self.client.name_cache.invalidate("pipelines")
             return response.json()
         else:
             logging.error(f"Failed to create the new pipeline: '{pipeline_name}':")
@@ -164,7 +154,7 @@ class Pipelines:
                 'workspaceId': self.workspaces.workspace[workspace_name]
             }
 
-            response = requests.post(url, data = request_payload, headers = self.client.url_encoded_headers)
+            response = self.client.post(url, data = request_payload, headers = self.client.url_encoded_headers)
 
             if response.status_code == self.client.http_ok_code:
                 logging.info(f"Successfully assigned workspace with ID {self.workspaces.workspace[workspace_name]} to pipeline {pipeline_name}.")
@@ -192,6 +182,11 @@ class Pipelines:
             elif self.pipeline_stage_order <= 0:
                 raise Exception("Development is the lowest stage in Power BI pipeline. You cannot demote Development to another stage.")
     
+    def invalidate_workspace_content(self) -> None:
+        # A deployment creates or replaces artifacts in the target stage workspace
+        for artifact_type in ("datasets", "reports", "dataflows"):
+            self.client.name_cache.invalidate(artifact_type)
+
     # https://docs.microsoft.com/en-us/rest/api/power-bi/pipelines/deploy-all
     def pipeline_stage_deploy_all(self, pipeline_name: str, type: str, stage: str) -> None:
         self.client.check_token_expiration()
@@ -213,9 +208,10 @@ class Pipelines:
             }
         }
         
-        response = requests.post(request_url, json = request_payload, headers = self.client.json_headers)
+        response = self.client.post(request_url, json = request_payload, headers = self.client.json_headers)
         
         if response.status_code == self.client.http_accepted_code:
+            self.invalidate_workspace_content()
             logging.info(f"Successfully promoted stage: '{self.pipeline_stage}' in pipeline: '{pipeline_name}' to stage: '{list(self.pipeline_stages)[self.pipeline_target_stage]}'.")
             return response
         else:
@@ -284,9 +280,10 @@ class Pipelines:
             }
         }
         
-        response = requests.post(request_url, json = request_payload, headers = self.client.json_headers)
+        response = self.client.post(request_url, json = request_payload, headers = self.client.json_headers)
         
         if response.status_code == self.client.http_accepted_code:
+            self.invalidate_workspace_content()
             logging.info(f"Successfully promoted stage: '{self.pipeline_stage}' in pipeline: '{pipeline_name}' to stage: '{list(self.pipeline_stages)[self.pipeline_target_stage]}'.")
             return response
         else:
@@ -316,7 +313,7 @@ class Pipelines:
             "principalType": principal_type
         }
 
-        response = requests.post(url, json = request_payload, headers = self.client.json_headers)
+        response = self.client.post(url, json = request_payload, headers = self.client.json_headers)
                    
         if response.status_code == self.client.http_ok_code:
             logging.info(f"Successfully assigned user to pipeline: {pipeline_name}.")
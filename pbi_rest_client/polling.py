@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+import heapq
+import logging
+import threading
+
+from abc import ABC, abstractmethod
+from time import monotonic, sleep
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List
+from .config import BaseConfig
+
+config = BaseConfig()
+
+_executor = None
+_timer = None
+_executor_lock = threading.Lock()
+
+def poll_executor() -> ThreadPoolExecutor:
+    ''' Shared pool that runs the checks of background pollers, created on first use '''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers = config.POLL_MAX_WORKERS, thread_name_prefix = "pbi-poller")
+        return _executor
+
+def poll_timer() -> "PollTimer":
+    ''' Shared timer that holds background pollers between their checks, created on first use '''
+    global _timer
+    with _executor_lock:
+        if _timer is None:
+            _timer = PollTimer()
+        return _timer
+
+class PollTimer:
+    def __init__(self):
+        ''' Hands due tasks to the shared poll pool. Waiting tasks sit in a heap on one daemon thread, so however many
+        operations are being polled, pool workers are only busy while a check runs.
+        '''
+        self._heap = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target = self.run, name = "pbi-poll-timer", daemon = True)
+        self._thread.start()
+
+    def schedule(self, delay: float, task: Callable[[], None]) -> None:
+        with self._condition:
+            # The sequence keeps tasks due at the same time in order and spares comparing the callables
+            self._sequence += 1
+            heapq.heappush(self._heap, (monotonic() + delay, self._sequence, task))
+            self._condition.notify()
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > monotonic():
+                    self._condition.wait(self._heap[0][0] - monotonic() if self._heap else None)
+                _, _, task = heapq.heappop(self._heap)
+            poll_executor().submit(task)
+
+class Backoff:
+    def __init__(self, initial: float = None, maximum: float = None, factor: float = None):
+        self.initial = initial or config.POLL_INITIAL_DELAY
+        self.maximum = maximum or config.POLL_MAX_DELAY
+        self.factor = factor or config.POLL_BACKOFF_FACTOR
+        self.current = self.initial
+
+    def next(self) -> float:
+        ''' Returns the delay before the next poll and grows the following one up to the cap '''
+        delay = self.current
+        self.current = min(self.maximum, self.current * self.factor)
+        return delay
+
+    def reset(self) -> None:
+        self.current = self.initial
+
+class Poller:
+    def __init__(self, initial_delay: float = None, max_delay: float = None, factor: float = None, timeout: float = None):
+        ''' Polls a long running operation with exponential backoff
+        Args:
+            initial_delay (float): Seconds before the second poll. The first poll is immediate.
+            max_delay (float): Largest delay between polls.
+            factor (float): Growth of the delay after each pending poll.
+            timeout (float): Overall limit in seconds, None waits forever.
+        '''
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.timeout = config.POLL_TIMEOUT if timeout is None else timeout
+
+    def poll(self, check: Callable, description: str = "operation"):
+        ''' Calls check() until it returns something other than None and returns that value. Exceptions raised by check() propagate. '''
+        backoff = Backoff(self.initial_delay, self.max_delay, self.factor)
+        deadline = None if not self.timeout else monotonic() + self.timeout
+
+        while True:
+            result = check()
+            if result is not None:
+                return result
+            sleep(self.next_delay(backoff, deadline, description))
+
+    def next_delay(self, backoff: Backoff, deadline: float, description: str) -> float:
+        ''' Returns the wait before the next poll, or raises TimeoutError once the deadline has passed '''
+        delay = backoff.next()
+        if deadline is not None:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Timed out after {self.timeout}s waiting for {description}.")
+            delay = min(delay, remaining)
+
+        logging.debug(f"Waiting {delay:.2f}s before polling {description} again.")
+        return delay
+
+    def submit(self, check: Callable, description: str = "operation", callback: Callable[[Future], None] = None) -> Future:
+        ''' Polls in the background and returns a Future for the result. Each check runs on the shared pool and the
+        waits between checks are kept by the shared timer, so no pool worker is held while waiting. Cancelling the
+        Future stops the polling before the next check.
+        '''
+        future = Future()
+        backoff = Backoff(self.initial_delay, self.max_delay, self.factor)
+        deadline = None if not self.timeout else monotonic() + self.timeout
+
+        def attempt() -> None:
+            if future.cancelled():
+                return
+            try:
+                result = check()
+                if result is None:
+                    poll_timer().schedule(self.next_delay(backoff, deadline, description), attempt)
+                    return
+                complete, outcome = future.set_result, result
+            except BaseException as error:
+                complete, outcome = future.set_exception, error
+
+            try:
+                complete(outcome)
+            except InvalidStateError:
+                # Cancelled while the check ran
+                pass
+
+        if callback is not None:
+            future.add_done_callback(callback)
+        poll_executor().submit(attempt)
+        return future
+
+class Job:
+    def __init__(self):
+        ''' State of one long running operation driven by a Scheduler '''
+        self.status = "Pending"
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.next_poll = None
+        self.backoff = Backoff()
+
+    def finish(self, status: str, error: Exception = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished = monotonic()
+
+class Scheduler(ABC):
+    # Jobs in this status are polled once their next_poll time is reached
+    polling_status = "Running"
+
+    def run_jobs(self, jobs: List[Job], max_workers: int = None, thread_name_prefix: str = "pbi-scheduler") -> None:
+        ''' Drives the jobs from the calling thread until every one has finished. Each pass collects work the background pool
+        completed, polls the jobs that are due and starts pending jobs, then sleeps until the next poll or background completion.
+        Args:
+            jobs (list): Jobs in the order they should be considered for starting and polling.
+            max_workers (int): Size of the pool for background work such as uploads and downloads, None runs without a pool.
+        '''
+        background = {}
+        executor = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = thread_name_prefix) if max_workers else None
+
+        try:
+            while any(job.finished is None for job in jobs):
+                self.collect_jobs(background)
+                self.poll_jobs(jobs, executor, background)
+                self.start_jobs(jobs, executor, background)
+                self.wait_for_progress(jobs, background)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait = True)
+
+    @abstractmethod
+    def start_jobs(self, jobs: List[Job], executor: ThreadPoolExecutor, background: Dict) -> None:
+        ''' Starts pending jobs while the limits allow. Work handed to the executor is added to background as future: job. '''
+        pass
+
+    @abstractmethod
+    def poll_jobs(self, jobs: List[Job], executor: ThreadPoolExecutor, background: Dict) -> None:
+        ''' Checks the jobs in polling_status whose next_poll is due and finishes them or schedules their next poll '''
+        pass
+
+    def collect_jobs(self, background: Dict) -> None:
+        ''' Takes the results of completed background futures '''
+        pass
+
+    def wait_for_progress(self, jobs: List[Job], background: Dict) -> None:
+        polls = [job.next_poll for job in jobs if job.status == self.polling_status]
+        if not background and not polls:
+            return
+
+        delay = max(0.0, min(polls) - monotonic()) if polls else None
+        if background:
+            wait(list(background), timeout = delay, return_when = FIRST_COMPLETED)
+        elif delay:
+            sleep(delay)
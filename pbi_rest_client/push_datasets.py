@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+
+import json
+import logging
+
+from datetime import date, datetime
+from itertools import islice
+from time import monotonic, sleep
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, List
+from .config import BaseConfig
+from .workspaces import Workspaces
+from .datasets import Datasets
+from .retry import TokenBucket
+
+config = BaseConfig()
+
+def row_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+class PushDatasets:
+    def __init__(self, client):
+        self.client = client
+        self.workspaces = Workspaces(client)
+        self.datasets = Datasets(client)
+        self.dataset = None
+
+    def table_schema(self, tables) -> List[Dict]:
+        ''' Accepts tables in the API format or as {table: {column: dataType}} and returns the API format '''
+        if isinstance(tables, dict):
+            return [
+                {"name": table, "columns": [{"name": column, "dataType": data_type} for column, data_type in columns.items()]}
+                for table, columns in tables.items()
+            ]
+        return list(tables)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/push-datasets/datasets-post-dataset-in-group
+    def create_push_dataset(self, workspace_name: str, dataset_name: str, tables, retention_policy: str = "None") -> dict:
+        ''' Creates a push dataset, or returns the existing dataset with the same name
+        Args:
+            workspace_name (string): The name of the workspace in Power BI.
+            dataset_name (string): The name of the push dataset.
+            tables (list or dict): Table definitions, e.g. {"Telemetry": {"Timestamp": "DateTime", "Value": "Double"}}.
+                Data types are Int64, Double, Boolean, DateTime and String.
+            retention_policy (string): None, or basicFIFO to keep the newest 200,000 rows.
+        Returns:
+            dict: The dataset.
+        '''
+        self.client.check_token_expiration()
+        self.workspaces.get_workspace_id(workspace_name)
+        workspace_id = self.workspaces.workspace[workspace_name]
+
+        existing = self.client.name_cache.lookup(("datasets", workspace_id), dataset_name, lambda: self.datasets.get_datasets_in_workspace(workspace_name))
+        if existing is not None:
+            logging.info("Push dataset: " + dataset_name + " already exists in workspace: " + workspace_name)
+            self.dataset = existing
+            return self.dataset
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets?defaultRetentionPolicy=" + retention_policy
+
+        payload = {
+            "name": dataset_name,
+            "defaultMode": "Push",
+            "tables": self.table_schema(tables)
+        }
+
+        response = self.client.post(url, json = payload, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_created_code:
+            logging.info("Successfully created push dataset: " + dataset_name + " in workspace: " + workspace_name)
+            self.client.name_cache.invalidate("datasets", workspace_id)
+            self.dataset = response.json()
+            return self.dataset
+        else:
+            logging.error("Failed to create push dataset: " + dataset_name + " in workspace: " + workspace_name)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/push-datasets/datasets-put-table-in-group
+    def update_table(self, workspace_id: str, dataset_id: str, table: Dict) -> None:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/tables/" + table['name']
+
+        response = self.client.put(url, json = table, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            logging.info("Successfully updated table: " + table['name'] + " of push dataset: " + dataset_id)
+        else:
+            logging.error("Failed to update table: " + table['name'] + " of push dataset: " + dataset_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/push-datasets/datasets-post-rows-in-group
+    def post_rows(self, workspace_id: str, dataset_id: str, table_name: str, rows: List[Dict]) -> None:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/tables/" + table_name + "/rows"
+
+        # Serialised here so datetime values become ISO 8601 strings
+        payload = json.dumps({"rows": rows}, default = row_value)
+
+        response = self.client.post(url, data = payload, headers = self.client.json_headers)
+
+        if response.status_code != self.client.http_ok_code:
+            logging.error("Failed to post " + str(len(rows)) + " rows to table: " + table_name + " of push dataset: " + dataset_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/push-datasets/datasets-delete-rows-in-group
+    def delete_rows(self, workspace_id: str, dataset_id: str, table_name: str) -> None:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/datasets/" + dataset_id + "/tables/" + table_name + "/rows"
+
+        response = self.client.delete(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            logging.info("Successfully deleted rows of table: " + table_name + " of push dataset: " + dataset_id)
+        else:
+            logging.error("Failed to delete rows of table: " + table_name + " of push dataset: " + dataset_id)
+            self.client.force_raise_http_error(response)
+
+class RowIngestor:
+    def __init__(self, client, workspace_id: str, dataset_id: str, table_name: str, **kwargs):
+        ''' Streams rows into a push dataset table in full batches sent concurrently within the service limits
+        Args:
+            workspace_id (string): Workspace of the push dataset.
+            dataset_id (string): The push dataset.
+            table_name (string): The table that receives the rows.
+            batch_size (int): Rows per request, at most 10,000.
+            max_workers (int): Requests sent at the same time.
+            max_pending (int): Batches read ahead of the requests in flight. Reading from the iterator pauses when reached.
+            rows_per_hour (int): Row budget of the dataset per hour.
+            requests_per_minute (int): Request budget of the dataset per minute.
+        '''
+        self.push_datasets = PushDatasets(client)
+        self.workspace_id = workspace_id
+        self.dataset_id = dataset_id
+        self.table_name = table_name
+        self.batch_size = min(kwargs.get('batch_size') or config.PUSH_BATCH_ROWS, 10000)
+        self.max_workers = kwargs.get('max_workers') or config.PUSH_MAX_WORKERS
+        self.max_pending = max(self.max_workers, kwargs.get('max_pending') or config.PUSH_MAX_PENDING)
+        rows_per_hour = kwargs.get('rows_per_hour') or config.PUSH_ROWS_PER_HOUR
+        requests_per_minute = kwargs.get('requests_per_minute') or config.PUSH_REQUESTS_PER_MINUTE
+        # Budgets are shared by every ingestor of the same dataset in this process
+        self.row_budget = TokenBucket.shared(("push-rows", dataset_id), rows_per_hour / 3600, rows_per_hour)
+        self.request_budget = TokenBucket.shared(("push-requests", dataset_id), requests_per_minute / 60, requests_per_minute)
+
+    def send(self, rows: List[Dict]) -> int:
+        delay = max(self.row_budget.reserve(len(rows)), self.request_budget.reserve())
+        if delay > 0:
+            logging.info(f"Waiting {delay:.2f}s for the push dataset row and request budget.")
+            sleep(delay)
+        self.push_datasets.post_rows(self.workspace_id, self.dataset_id, self.table_name, rows)
+        return len(rows)
+
+    def ingest(self, rows: Iterable[Dict]) -> Dict:
+        ''' Reads rows from the iterable until it is exhausted and posts them
+        Returns:
+            dict: Rows sent and failed, batches, errors, elapsed seconds and rows per second.
+        '''
+        rows = iter(rows)
+        started = monotonic()
+        sent = failed = batches = 0
+        errors = []
+        in_flight = {}
+
+        def collect(done) -> None:
+            nonlocal sent, failed
+            for future in done:
+                count = in_flight.pop(future)
+                try:
+                    sent += future.result()
+                except Exception as error:
+                    logging.error(f"Failed to post a batch of {count} rows to {self.table_name}: {error}")
+                    failed += count
+                    errors.append(str(error))
+
+        with ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = "pbi-push") as executor:
+            while True:
+                if len(in_flight) >= self.max_pending:
+                    collect(wait(list(in_flight), return_when = FIRST_COMPLETED).done)
+                    continue
+
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                batches += 1
+                in_flight[executor.submit(self.send, batch)] = len(batch)
+                collect([future for future in list(in_flight) if future.done()])
+
+                if batches % 10 == 0:
+                    elapsed = monotonic() - started
+                    logging.info(f"Pushed {sent} rows to {self.table_name} ({sent / elapsed:.0f} rows/s).")
+
+            collect(wait(list(in_flight)).done)
+
+        seconds = monotonic() - started
+        logging.info(f"Pushed {sent} rows in {batches} batches to {self.table_name} in {seconds:.1f}s with {failed} rows failed.")
+        return {
+            "rows": sent,
+            "failed_rows": failed,
+            "batches": batches,
+            "errors": errors,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(sent / seconds, 1) if seconds > 0 else None
+        }
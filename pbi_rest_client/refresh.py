@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+
+import re
+import logging
+
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from .config import BaseConfig
+from .dependencies import dependency_order
+from .workspaces import Workspaces
+from .datasets import Datasets
+from .dataflows import Dataflows
+from .polling import Job, Scheduler
+
+config = BaseConfig()
+
+# Clock skew allowed when matching a history entry to the refresh that was just triggered
+HISTORY_SKEW = timedelta(minutes = 2)
+
+def parse_time(value: str) -> datetime:
+    ''' Parses the ISO 8601 timestamps of the refresh APIs, which end in Z and may carry up to seven fractional digits '''
+    if not value:
+        return None
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value.replace("Z", "+00:00"))
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo = timezone.utc)
+
+class RefreshJob(Job):
+    def __init__(self, entry: Dict):
+        super().__init__()
+        self.workspace_name = entry['workspace_name']
+        self.kind = "dataflow" if 'dataflow' in entry else "dataset"
+        self.item_name = entry[self.kind]
+        self.name = entry.get('name', f"{self.workspace_name}/{self.item_name}")
+        self.depends_on = list(entry.get('depends_on') or [])
+        self.options = dict(entry.get('options') or {})
+        # Any option other than notifyOption makes the service run an enhanced refresh
+        self.enhanced = any(key != 'notifyOption' for key in self.options)
+        self.timeout = entry.get('timeout', config.REFRESH_TIMEOUT)
+        self.dependencies = []
+        self.workspace_id = None
+        self.item_id = None
+        self.capacity = None
+        self.request_id = None
+        self.submitted_at = None
+        self.refresh = None
+
+    def result(self) -> Dict:
+        refresh = self.refresh or {}
+        return {
+            "name": self.name,
+            "type": self.kind,
+            "workspace_name": self.workspace_name,
+            "item_name": self.item_name,
+            "status": self.status,
+            "request_id": self.request_id,
+            "start_time": refresh.get('startTime'),
+            "end_time": refresh.get('endTime'),
+            "error": None if self.error is None else str(self.error),
+            "seconds": None if self.finished is None or self.started is None else round(self.finished - self.started, 3)
+        }
+
+class Refreshes(Scheduler):
+    polling_status = "Refreshing"
+
+    def __init__(self, client, max_concurrency: int = None, max_per_capacity: int = None):
+        ''' Refreshes datasets and dataflows in dependency order
+        Args:
+            max_concurrency (int): Refreshes running at the same time across all capacities.
+            max_per_capacity (int): Refreshes running at the same time on one capacity.
+        '''
+        self.client = client
+        self.max_concurrency = max_concurrency or config.REFRESH_MAX_CONCURRENCY
+        self.max_per_capacity = max_per_capacity or config.REFRESH_MAX_PER_CAPACITY
+
+    def refresh(self, entries: List[Dict], infer_dependencies: bool = True) -> List[Dict]:
+        ''' Triggers the refreshes, waits for all of them and returns their outcome
+        Args:
+            entries (list): Entries with workspace_name and either dataset or dataflow, plus optional name, depends_on
+                (names of entries that must refresh first), options (request body fields: notifyOption, or the enhanced refresh
+                fields type, commitMode, maxParallelism, retryCount, objects, applyRefreshPolicy and effectiveDate) and timeout.
+            infer_dependencies (bool): Make datasets wait for the listed dataflows they read from, using the upstream dataflow links.
+        Returns:
+            list: One result per entry, in input order, with status Succeeded, Failed or Skipped.
+        '''
+        jobs = [RefreshJob(entry) for entry in entries]
+        by_name = {job.name: job for job in jobs}
+
+        if len(by_name) != len(jobs):
+            raise ValueError("Refresh entry names must be unique. Set 'name' on entries that share a workspace and item name.")
+
+        for job in jobs:
+            try:
+                self.resolve(job)
+            except Exception as error:
+                logging.error(f"Failed to resolve {job.kind} {job.item_name} in workspace {job.workspace_name}: {error}")
+                job.finish("Failed", error)
+
+        if infer_dependencies:
+            self.add_upstream_dependencies(jobs)
+
+        for job in jobs:
+            job.dependencies = [by_name[name] for name in job.depends_on]
+
+        order = [by_name[name] for name in dependency_order({job.name: job.depends_on for job in jobs})]
+        self.run_jobs(order)
+
+        succeeded = sum(1 for job in jobs if job.status == "Succeeded")
+        logging.info(f"Refresh finished: {succeeded} of {len(jobs)} refreshes succeeded.")
+        return [job.result() for job in jobs]
+
+    def resolve(self, job: RefreshJob) -> None:
+        workspace = Workspaces(self.client).find_workspace(job.workspace_name)
+        if workspace is None:
+            raise ValueError(f"Workspace {job.workspace_name} does not exist.")
+
+        if job.kind == "dataset":
+            item = Datasets(self.client).get_dataset_in_workspace_id(job.item_name, job.workspace_name)
+            job.item_id = None if item is None else item[job.item_name]
+        else:
+            item = Dataflows(self.client).find_dataflow(job.workspace_name, job.item_name)
+            job.item_id = None if item is None else item['objectId']
+
+        if job.item_id is None:
+            raise ValueError(f"{job.kind.capitalize()} {job.item_name} does not exist in workspace {job.workspace_name}.")
+
+        job.workspace_id = workspace['id']
+        job.capacity = workspace.get('capacityId') or "shared"
+
+    def add_upstream_dependencies(self, jobs: List[RefreshJob]) -> None:
+        dataflows = {job.item_id: job.name for job in jobs if job.kind == "dataflow" and job.item_id}
+        if not dataflows:
+            return
+
+        datasets = Datasets(self.client)
+        links = {}
+        for workspace_id in {job.workspace_id for job in jobs if job.kind == "dataset" and job.workspace_id}:
+            for link in datasets.get_upstream_dataflows(workspace_id):
+                links.setdefault(link['datasetObjectId'], []).append(link['dataflowObjectId'])
+
+        for job in jobs:
+            if job.kind != "dataset":
+                continue
+            for dataflow_id in links.get(job.item_id, []):
+                if dataflow_id in dataflows and dataflows[dataflow_id] not in job.depends_on:
+                    logging.info(f"{job.name} reads from dataflow {dataflows[dataflow_id]} and will refresh after it.")
+                    job.depends_on.append(dataflows[dataflow_id])
+
+    def start_jobs(self, jobs: List[RefreshJob], executor: ThreadPoolExecutor, background: Dict) -> None:
+        running = [job for job in jobs if job.status == "Refreshing"]
+        per_capacity = {}
+        for job in running:
+            per_capacity[job.capacity] = per_capacity.get(job.capacity, 0) + 1
+
+        for job in jobs:
+            if job.status != "Pending":
+                continue
+
+            if any(dependency.status in ("Failed", "Skipped") for dependency in job.dependencies):
+                logging.warning(f"Skipping refresh of {job.name} because a dependency did not refresh.")
+                job.finish("Skipped", RuntimeError("A dependency did not refresh."))
+                continue
+            if any(dependency.status != "Succeeded" for dependency in job.dependencies):
+                continue
+            if len(running) >= self.max_concurrency or per_capacity.get(job.capacity, 0) >= self.max_per_capacity:
+                continue
+
+            job.started = monotonic()
+            job.submitted_at = datetime.now(timezone.utc)
+            try:
+                self.trigger(job)
+            except Exception as error:
+                logging.error(f"Failed to trigger refresh of {job.name}: {error}")
+                job.finish("Failed", error)
+                continue
+
+            job.status = "Refreshing"
+            job.next_poll = monotonic() + job.backoff.next()
+            running.append(job)
+            per_capacity[job.capacity] = per_capacity.get(job.capacity, 0) + 1
+
+    def trigger(self, job: RefreshJob) -> None:
+        if job.kind == "dataset":
+            payload = dict(job.options) if job.enhanced else dict({"notifyOption": "NoNotification"}, **job.options)
+            job.request_id = Datasets(self.client).refresh_dataset_id(job.workspace_id, job.item_id, payload)
+        else:
+            Dataflows(self.client).refresh_dataflow_id(job.workspace_id, job.item_id, job.options.get('notifyOption', "NoNotification"))
+
+    def cancel(self, job: RefreshJob) -> None:
+        # Only enhanced dataset refreshes can be cancelled, anything else keeps running in the service
+        if job.kind != "dataset" or not job.enhanced or not job.request_id:
+            return
+        try:
+            Datasets(self.client).cancel_refresh_id(job.workspace_id, job.item_id, job.request_id)
+        except Exception as error:
+            logging.warning(f"Could not cancel refresh of {job.name}: {error}")
+
+    def poll_jobs(self, jobs: List[RefreshJob], executor: ThreadPoolExecutor, background: Dict) -> None:
+        now = monotonic()
+
+        for job in jobs:
+            if job.status != "Refreshing" or job.next_poll > now:
+                continue
+            try:
+                done = self.check(job)
+            except Exception as error:
+                logging.error(f"Refresh of {job.name} failed: {error}")
+                job.finish("Failed", error)
+                continue
+
+            if done:
+                logging.info(f"Refresh of {job.name} succeeded.")
+                job.finish("Succeeded")
+            elif job.timeout and monotonic() - job.started > job.timeout:
+                self.cancel(job)
+                job.finish("Failed", TimeoutError(f"Timed out after {job.timeout}s waiting for the refresh of {job.name}."))
+            else:
+                job.next_poll = monotonic() + job.backoff.next()
+
+    def check(self, job: RefreshJob) -> bool:
+        ''' Returns True once the refresh has completed, False while it runs, and raises if it failed '''
+        if job.kind == "dataset":
+            history = Datasets(self.client).get_refresh_history(job.workspace_id, job.item_id, top = 10)
+            completed, failed = ("Completed",), ("Failed", "Cancelled", "Disabled")
+        else:
+            history = Dataflows(self.client).get_dataflow_transactions(job.workspace_id, job.item_id)
+            completed, failed = ("Success", "Completed"), ("Failed", "Cancelled")
+
+        job.refresh = self.find_refresh(job, history)
+        if job.refresh is None:
+            return False
+
+        status = job.refresh.get('status')
+        if status in completed:
+            return True
+        if status in failed:
+            raise RuntimeError(f"Refresh {status.lower()}: {job.refresh.get('serviceExceptionJson') or job.refresh.get('refreshType') or status}")
+        return False
+
+    def find_refresh(self, job: RefreshJob, history: List[Dict]) -> Dict:
+        if job.request_id:
+            for entry in history:
+                if entry.get('requestId') == job.request_id:
+                    return entry
+
+        # History is newest first, take the newest entry that started after the refresh was triggered
+        for entry in history:
+            started = parse_time(entry.get('startTime'))
+            if started is not None and started >= job.submitted_at - HISTORY_SKEW:
+                return entry
+        return None
@@ -1,13 +1,16 @@
 #!/usr/bin/env python
 
 import os
+import hashlib
 import logging
-import requests
 
-from typing import List
+from typing import Callable, List
+from .config import BaseConfig
 from .utils.utils import Utils
+from .utils.block_upload import BlockUploader
 from .workspaces import Workspaces
 
+config = BaseConfig()
 utils = Utils()
 
 class Reports:
@@ -24,11 +27,12 @@ class Reports:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/reports"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved reports in workspace: " + workspace_name)
             self.reports = response.json()["value"]
+            self.client.name_cache.set_listing(("reports", self.workspaces.workspace[workspace_name]), self.reports)
             return self.reports
         else:
             logging.error("Failed to retrieve reports in workspace: " + workspace_name)
@@ -36,22 +40,18 @@ class Reports:
     
     def get_report(self, workspace_name: str, report_name: str) -> List:
         self.client.check_token_expiration()
-        self.get_reports(workspace_name)
-        report_found = False
-
-        for item in self.reports:
-            if item['name'] == report_name:
-                logging.info("Found report with name: " + report_name + " in workspace with name: " + workspace_name)
-                report_found = True
-                self.report = item
-                return self.report
-        
-        if report_found == False:
-            logging.warn("Unable to find report with name: " + report_name + " in workspace with name: " + workspace_name)
+        self.workspaces.get_workspace_id(workspace_name)
+        self.report = self.client.name_cache.lookup(("reports", self.workspaces.workspace[workspace_name]), report_name, lambda: self.get_reports(workspace_name))
+
+        if self.report is None:
+            logging.warning("Unable to find report with name: " + report_name + " in workspace with name: " + workspace_name)
             return None
 
+        logging.info("Found report with name: " + report_name + " in workspace with name: " + workspace_name)
+        return self.report
+
     # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/export-report-in-group
-    def export_report(self, workspace_name: str, report_name: str, chunk_size = 128) -> None:
+    def export_report(self, workspace_name: str, report_name: str, chunk_size = None) -> None:
         self.client.check_token_expiration()
         self.get_report(workspace_name, report_name)
 
@@ -60,16 +60,153 @@ class Reports:
 
         url = self.client.base_url + "groups/" + self.workspaces.workspace[workspace_name] + "/reports/" + self.report['id'] + "/Export"
         
-        response = requests.get(url, headers = self.client.json_headers, stream = True)
+        response = self.client.get(url, headers = self.client.json_headers, stream = True)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully exported report: " + report_name + " in workspace: " + workspace_name)
             with open(out_file, 'wb') as fd:
-                for chunk in response.iter_content(chunk_size=chunk_size):
+                for chunk in response.iter_content(chunk_size=chunk_size or config.EXPORT_CHUNK_SIZE):
                     fd.write(chunk)
             with open(out_file, "rb") as fd:
                 blob.upload_blob(fd, overwrite = True)
             return logging.info("Exported PBIX file to: " + out_file)
         else:
             logging.error("Failed to export report: " + report_name + " in workspace: " + workspace_name)
-            self.client.force_raise_http_error(response)
\ No newline at end of file
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/export-report-in-group
+    def export_report_to_blob(self, workspace_name: str, report_name: str, blob_name: str = None, **kwargs) -> dict:
+        ''' Streams the exported PBIX straight into a block blob without writing it to local disk
+        Args:
+            workspace_name (string): The name of the workspace in Power BI.
+            report_name (string): The name of the report to export.
+            blob_name (string): Destination blob, defaults to <report_name>.pbix.
+            chunk_size (int): Optional size in bytes of each response read and staged block.
+            max_workers (int): Optional number of blocks staged at the same time.
+            progress (callable): Optional callback receiving (bytes_uploaded, total_bytes).
+        Returns:
+            dict: Blob name, bytes uploaded, SHA-256 of the content, block count and throughput.
+        '''
+        self.client.check_token_expiration()
+        self.get_report(workspace_name, report_name)
+
+        blob_name = blob_name or report_name + ".pbix"
+        stats = self.export_report_id_to_blob(self.workspaces.workspace[workspace_name], self.report['id'], blob_name, **kwargs)
+
+        logging.info(f"Exported report: {report_name} in workspace: {workspace_name} to blob: {blob_name} ({stats['uploaded_bytes']} bytes in {stats['seconds']}s, {stats['bytes_per_second']} bytes/s).")
+        return stats
+
+    def export_report_id_to_blob(self, workspace_id: str, report_id: str, blob_name: str, **kwargs) -> dict:
+        ''' Same as export_report_to_blob for a report addressed by id, used when the ids are already known from a listing '''
+        chunk_size = kwargs.get('chunk_size') or config.EXPORT_CHUNK_SIZE
+        progress: Callable = kwargs.get('progress')
+
+        blob = utils.blob_client(blob_name)
+        uploader = BlockUploader(chunk_size, kwargs.get('max_workers'))
+        checksum = hashlib.sha256()
+
+        response = self.export_report_id(workspace_id, report_id)
+
+        def chunks():
+            for chunk in response.iter_content(chunk_size = chunk_size):
+                checksum.update(chunk)
+                yield chunk
+
+        total = response.headers.get('Content-Length')
+        with response:
+            stats = uploader.upload_chunks(blob, chunks(), int(total) if total else None, progress)
+
+        return dict(stats, blob_name = blob_name, sha256 = checksum.hexdigest())
+
+    def export_report_id_to_stream(self, workspace_id: str, report_id: str, stream, chunk_size: int = None) -> dict:
+        ''' Writes the exported PBIX of a report addressed by id to a binary file object, hashing it on the way
+        Returns:
+            dict: Bytes written and SHA-256 of the content.
+        '''
+        checksum = hashlib.sha256()
+        size = 0
+
+        response = self.export_report_id(workspace_id, report_id)
+        with response:
+            for chunk in response.iter_content(chunk_size = chunk_size or config.EXPORT_CHUNK_SIZE):
+                checksum.update(chunk)
+                stream.write(chunk)
+                size += len(chunk)
+
+        return {"size": size, "sha256": checksum.hexdigest()}
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/export-report-in-group
+    def export_report_id(self, workspace_id: str, report_id: str):
+        ''' Starts the PBIX download of a report addressed by id and returns the streamed response '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/reports/" + report_id + "/Export"
+
+        response = self.client.get(url, headers = self.client.json_headers, stream = True)
+
+        if response.status_code != self.client.http_ok_code:
+            logging.error("Failed to export report: " + report_id + " in workspace: " + workspace_id)
+            self.client.force_raise_http_error(response)
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/admin/reports-get-reports-in-group-as-admin
+    def get_reports_as_admin(self, workspace_id: str) -> List:
+        ''' Lists the reports of a workspace through the admin API, which unlike get_reports includes modifiedDateTime.
+        The principal needs Tenant.Read.All or admin API access for service principals.
+        '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "admin/groups/" + workspace_id + "/reports"
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            logging.info("Successfully retrieved reports as admin in workspace: " + workspace_id)
+            return response.json()["value"]
+        else:
+            logging.error("Failed to retrieve reports as admin in workspace: " + workspace_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/export-to-file-in-group
+    def export_to(self, workspace_id: str, report_id: str, payload: dict) -> dict:
+        ''' Starts an export-to-file job and returns the export, whose id is used to poll for the file '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/reports/" + report_id + "/ExportTo"
+
+        response = self.client.post(url, json = payload, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_accepted_code:
+            logging.info("Started export of report: " + report_id + " to " + payload['format'])
+            return response.json()
+        else:
+            logging.error("Failed to start export of report: " + report_id + " in workspace: " + workspace_id)
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/get-export-to-file-status-in-group
+    def get_export_to_status(self, workspace_id: str, report_id: str, export_id: str):
+        ''' Returns the status response, its Retry-After header says when to ask again '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/reports/" + report_id + "/exports/" + export_id
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code not in (self.client.http_ok_code, self.client.http_accepted_code):
+            logging.error("Failed to retrieve status of export: " + export_id)
+            self.client.force_raise_http_error(response)
+        return response
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/reports/get-file-of-export-to-file-in-group
+    def get_export_to_file(self, workspace_id: str, report_id: str, export_id: str):
+        ''' Returns the streaming response with the exported file, the caller reads and closes it '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "groups/" + workspace_id + "/reports/" + report_id + "/exports/" + export_id + "/file"
+
+        response = self.client.get(url, headers = self.client.json_headers, stream = True)
+
+        if response.status_code != self.client.http_ok_code:
+            logging.error("Failed to download file of export: " + export_id)
+            self.client.force_raise_http_error(response)
+        return response
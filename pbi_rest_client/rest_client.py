@@ -1,33 +1,231 @@
 #!/usr/bin/env python
 
+import os
 import logging
+import threading
+import weakref
 import requests
 
+from abc import ABC, abstractmethod
+from time import sleep
 from datetime import datetime, timedelta
-from msal import PublicClientApplication, ConfidentialClientApplication
+from typing import Iterator
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from msal import PublicClientApplication, ConfidentialClientApplication, SerializableTokenCache
 from .config import BaseConfig
+from .cache import TTLCache
+from .retry import RetryPolicy, TokenBucket, RetryMetrics
 
 config = BaseConfig()
 
-class RestClient:
-    def __init__(self):
-        self.app = None
-        self.token = None
-        self.account_username = None
+# Seconds before trying again when a background token refresh fails
+TOKEN_REFRESH_RETRY = 30
+
+class BaseClient(ABC):
+    def __init__(self, retry_policy: RetryPolicy = None):
+        ''' What the resource classes use from a client: base URL, status codes, headers, caches and the HTTP verbs.
+        Subclasses send the requests and keep the access token valid.
+        '''
         self.base_url = config.PBI_BASE_URL
         self.http_ok_code = 200
         self.http_created_code = 201
         self.http_accepted_code = 202
         self.expected_codes = [self.http_ok_code, self.http_created_code, self.http_accepted_code]
+        # The Authorization header is added by request() when the request is sent, so these never hold a stale token
+        self.json_headers = dict(config.JSON_HEADERS)
+        self.url_encoded_headers = dict(config.URL_ENCODED_HEADERS)
+        self.multipart_headers = dict(config.MULTIPART_HEADERS)
+        self.name_cache = TTLCache(config.NAME_CACHE_TTL)
+        self.query_cache = TTLCache(config.QUERY_CACHE_TTL)
+        self.odata_page_size = config.ODATA_PAGE_SIZE
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_metrics = RetryMetrics()
+
+    @abstractmethod
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        pass
+
+    @abstractmethod
+    def check_token_expiration(self) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    def rewind_body(self, kwargs: dict) -> bool:
+        ''' Moves uploaded file objects back to the start before a retry. Returns False when the body cannot be replayed. '''
+        bodies = list((kwargs.get('files') or {}).values()) + [kwargs.get('data')]
+
+        for body in bodies:
+            if isinstance(body, tuple):
+                body = body[1]
+            if body is None or isinstance(body, (str, bytes, dict, list)):
+                continue
+            if hasattr(body, 'seek') and (not hasattr(body, 'seekable') or body.seekable()):
+                body.seek(0)
+            else:
+                return False
+        return True
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def iter_odata(self, url: str, page_size: int = None, headers: dict = None) -> Iterator[dict]:
+        ''' Yields the items of an OData collection page by page
+        Args:
+            url (string): Collection URL, optionally with its own query string.
+            page_size (int): Requests pages of this size with $top/$skip. None relies on @odata.nextLink only.
+            headers (dict): Request headers, defaults to the JSON headers.
+        Returns:
+            Iterator: Items of the collection. Only the current page is held in memory.
+        '''
+        skip = 0
+        next_url = self.page_url(url, page_size, skip)
+
+        while next_url != None:
+            self.check_token_expiration()
+            response = self.get(next_url, headers = headers or self.json_headers)
+
+            if response.status_code != self.http_ok_code:
+                self.force_raise_http_error(response)
+
+            page = response.json()
+            items = page.get("value", [])
+            logging.debug(f"Retrieved page of {len(items)} items from {next_url}.")
+
+            if "@odata.nextLink" in page:
+                next_url = page["@odata.nextLink"]
+            elif page_size and len(items) == page_size:
+                skip += page_size
+                next_url = self.page_url(url, page_size, skip)
+            else:
+                next_url = None
+
+            del page
+            yield from items
+
+    def page_url(self, url: str, page_size: int, skip: int) -> str:
+        if not page_size:
+            return url
+        return url + ("&" if "?" in url else "?") + urlencode({"$top": page_size, "$skip": skip}, safe = "$")
+
+    def force_raise_http_error(self, response: int):
+        logging.error(f"Expected response codes: {self.expected_codes}, response was: {response.status_code}: {response.text}.")
+        response.raise_for_status()
+        raise requests.HTTPError(response)
+
+class RestClient(BaseClient):
+    def __init__(self, pool_connections: int = None, pool_maxsize: int = None, retry_policy: RetryPolicy = None, rate_limiter: TokenBucket = None, client_id: str = None, client_secret: str = None):
+        ''' Power BI REST API client signed in as one principal
+        Args:
+            client_id (string): Service principal or public client to sign in with, defaults to POWER_BI_CLIENT_ID.
+            client_secret (string): Secret of the service principal, defaults to POWER_BI_CLIENT_SECRET.
+        '''
+        super().__init__(retry_policy)
+        self.client_id = client_id or config.POWER_BI_CLIENT_ID
+        self.client_secret = client_secret or config.POWER_BI_CLIENT_SECRET
+        self.app = None
+        self.token = None
+        self.account_username = None
         self.authz_header = {"Authorization": self.token}
         self.token_expiration = datetime.today() - timedelta(days = 1)
+        self.token_refresh_margin = timedelta(minutes = config.TOKEN_REFRESH_MINUTES)
+        self._token_lock = threading.Lock()
+        self._token_refresher = None
+        self._token_refresher_stop = threading.Event()
+        # A client that is collected without close() still stops its refresher
+        weakref.finalize(self, self._token_refresher_stop.set)
         self.check_token_expiration()
-        self.json_headers = config.JSON_HEADERS
-        self.json_headers.update(self.authz_header)
-        self.url_encoded_headers = config.URL_ENCODED_HEADERS
-        self.url_encoded_headers.update(self.authz_header)
-        self.multipart_headers = config.MULTIPART_HEADERS
-        self.multipart_headers.update(self.authz_header)
+        self.pool_connections = pool_connections or config.HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or config.HTTP_POOL_MAXSIZE
+        self.session = self.create_session()
+        # Power BI throttles per identity, so every client signed in as the same principal shares one budget
+        self.rate_limiter = rate_limiter or TokenBucket.shared((config.POWER_BI_TENANT_ID, self.client_id), config.RATE_LIMIT_PER_SECOND, config.RATE_LIMIT_BURST)
+
+    def create_session(self) -> requests.Session:
+        # Keep-alive session shared by every resource class so the TCP/TLS handshake to the API is paid once per pooled connection
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = self.pool_connections, pool_maxsize = self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        ''' Sends a request through the pooled session within the tenant request budget. Throttled (429) responses
+        and, for idempotent verbs, server errors and connection failures are retried according to the retry policy.
+        The last response is returned when retries are exhausted so callers keep their own status code handling.
+        '''
+        attempt = 0
+
+        while True:
+            self.wait_for_budget()
+
+            if url.startswith(self.base_url):
+                kwargs['headers'] = dict(kwargs.get('headers') or {}, **self.authz_header)
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self.retry_metrics.record_connection_error()
+                if not self.retry_policy.should_retry_error(method, attempt) or not self.rewind_body(kwargs):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"{method} {url} failed with {type(error).__name__}. Retrying in {delay:.1f}s (attempt {attempt + 1} of {self.retry_policy.max_retries}).")
+            else:
+                self.retry_metrics.record_response(response.status_code)
+                if not self.retry_policy.should_retry(method, response.status_code, attempt) or not self.rewind_body(kwargs):
+                    return response
+                delay = self.retry_policy.delay(attempt, response.headers)
+                if response.status_code == 429:
+                    self.rate_limiter.pause(delay)
+                logging.warning(f"{method} {url} returned {response.status_code}. Retrying in {delay:.1f}s (attempt {attempt + 1} of {self.retry_policy.max_retries}).")
+                response.close()
+
+            self.retry_metrics.record_retry(delay)
+            sleep(delay)
+            attempt += 1
+
+    def wait_for_budget(self) -> None:
+        delay = self.rate_limiter.reserve()
+        if delay > 0:
+            logging.debug(f"Request budget exhausted, waiting {delay:.2f}s.")
+            self.retry_metrics.record_budget_wait(delay)
+            sleep(delay)
+
+    def close(self) -> None:
+        self._token_refresher_stop.set()
+        self.session.close()
+
+    def token_cache(self) -> SerializableTokenCache:
+        ''' Token cache shared with other processes through an encrypted file, so a new process or pipeline stage reuses a
+        valid token instead of signing in again. Falls back to an in-memory cache when persistence is disabled or the
+        platform offers no encryption (e.g. Linux without libsecret).
+        '''
+        if not config.TOKEN_CACHE_FILE:
+            return SerializableTokenCache()
+
+        try:
+            from msal_extensions import build_encrypted_persistence, PersistedTokenCache
+
+            os.makedirs(os.path.dirname(os.path.abspath(config.TOKEN_CACHE_FILE)), exist_ok = True)
+            return PersistedTokenCache(build_encrypted_persistence(config.TOKEN_CACHE_FILE))
+        except Exception as error:
+            logging.warning(f"Encrypted token cache is unavailable, keeping tokens in memory: {error}")
+            return SerializableTokenCache()
 
     def request_bearer_token(self) -> None:
         if self.app == None:
@@ -36,17 +234,19 @@ class RestClient:
 
                 # https://msal-python.readthedocs.io/en/latest/#publicclientapplication
                 self.app = PublicClientApplication(
-                    client_id = config.POWER_BI_CLIENT_ID,
-                    authority = config.AUTHORITY
+                    client_id = self.client_id,
+                    authority = config.AUTHORITY,
+                    token_cache = self.token_cache()
                 )
             elif config.AUTHENTICATION_MODE == 'ServicePrincipal':
                 logging.info('Authentication mode set to: ' + config.AUTHENTICATION_MODE)
 
                 # https://msal-python.readthedocs.io/en/latest/#confidentialclientapplication
                 self.app = ConfidentialClientApplication(
-                    client_id = config.POWER_BI_CLIENT_ID,
-                    client_credential = config.POWER_BI_CLIENT_SECRET,
-                    authority = config.AUTHORITY
+                    client_id = self.client_id,
+                    client_credential = self.client_secret,
+                    authority = config.AUTHORITY,
+                    token_cache = self.token_cache()
                 )
             else:
                 raise Exception("Invalid authentication mode specified. Must be 'ServiceAccount' or 'ServicePrincipal'")
@@ -54,48 +254,136 @@ class RestClient:
         if self.token is None:
             logging.info("Access token does not exist. Attempting to generate access token.")
 
-            if isinstance(self.app, PublicClientApplication):
-                # https://msal-python.readthedocs.io/en/latest/#msal.PublicClientApplication.acquire_token_by_username_password
-                acquire_tokens_result = self.app.acquire_token_by_username_password(
-                    username = config.SERVICE_ACCOUNT_USERNAME,
-                    password = config.SERVICE_ACCOUNT_PASSWORD,
-                    scopes = config.SCOPE
-                )
-            elif isinstance(self.app, ConfidentialClientApplication):
-                # https://msal-python.readthedocs.io/en/latest/#msal.ConfidentialClientApplication.acquire_token_for_client
-                acquire_tokens_result = self.app.acquire_token_for_client(
-                    scopes = config.SCOPE
-                )
-        elif self.token_expiration < datetime.utcnow():
-            logging.info("Access token has expired. Attempting to renew access token.")
+            # A valid token persisted by another process is used before asking Azure AD for a new one
+            acquire_tokens_result = self.acquire_cached_token()
+            if not acquire_tokens_result or 'error' in acquire_tokens_result:
+                acquire_tokens_result = self.acquire_new_token()
+        else:
+            logging.info("Access token is about to expire. Attempting to renew access token.")
 
-            if isinstance(self.app, PublicClientApplication):
-                # https://msal-python.readthedocs.io/en/latest/#msal.PublicClientApplication.acquire_token_silent_with_error
-                acquire_tokens_result = self.app.acquire_token_silent_with_error(scopes = config.SCOPE, account = self.app.get_accounts(self.account_username)[0])
-            elif isinstance(self.app, ConfidentialClientApplication):
-                # https://msal-python.readthedocs.io/en/latest/#msal.ConfidentialClientApplication.acquire_token_silent_with_error
-                acquire_tokens_result = self.app.acquire_token_silent_with_error(scopes = config.SCOPE, account = None)
+            acquire_tokens_result = self.renew_token()
 
         if 'error' in acquire_tokens_result:
-            logging.error(f"Failed to retrieve access token for client id {config.POWER_BI_CLIENT_ID}.")
+            logging.error(f"Failed to retrieve access token for client id {self.client_id}.")
             logging.error("Error: " + acquire_tokens_result['error'])
             raise Exception("Description: " + acquire_tokens_result['error_description'])
         else:
-            logging.info(f"Successfully retrieved access token for client id {config.POWER_BI_CLIENT_ID}.")
-            if isinstance(self.app, PublicClientApplication):
+            logging.info(f"Successfully retrieved access token for client id {self.client_id}.")
+            if isinstance(self.app, PublicClientApplication) and 'id_token_claims' in acquire_tokens_result:
                 self.account_username = acquire_tokens_result['id_token_claims']['preferred_username']
             self.token = acquire_tokens_result['access_token']
             self.token_expiration = datetime.utcnow() + timedelta(seconds=acquire_tokens_result["expires_in"])
             self.authz_header = {"Authorization": "Bearer " + self.token}
     
+    def acquire_cached_token(self, force_refresh: bool = False) -> dict:
+        if isinstance(self.app, PublicClientApplication):
+            accounts = self.app.get_accounts(self.account_username or config.SERVICE_ACCOUNT_USERNAME)
+            if not accounts:
+                return None
+            # https://msal-python.readthedocs.io/en/latest/#msal.PublicClientApplication.acquire_token_silent_with_error
+            return self.app.acquire_token_silent_with_error(scopes = config.SCOPE, account = accounts[0], force_refresh = force_refresh)
+        elif isinstance(self.app, ConfidentialClientApplication):
+            # https://msal-python.readthedocs.io/en/latest/#msal.ConfidentialClientApplication.acquire_token_silent_with_error
+            return self.app.acquire_token_silent_with_error(scopes = config.SCOPE, account = None, force_refresh = force_refresh)
+
+    def renew_token(self) -> dict:
+        margin = self.token_refresh_margin.total_seconds()
+
+        if isinstance(self.app, PublicClientApplication):
+            # Another process sharing the token cache may already have renewed it
+            acquire_tokens_result = self.acquire_cached_token()
+            if not acquire_tokens_result or 'error' in acquire_tokens_result or acquire_tokens_result['expires_in'] <= margin:
+                acquire_tokens_result = self.acquire_cached_token(force_refresh = True)
+            if not acquire_tokens_result or 'error' in acquire_tokens_result:
+                acquire_tokens_result = self.acquire_new_token()
+            return acquire_tokens_result
+
+        # acquire_token_for_client answers from the shared cache first, which also picks up a token renewed by another process.
+        # MSAL keeps serving a cached token until it has less than five minutes left, so one inside the margin is dropped
+        # from the cache to make the second call fetch a new token.
+        acquire_tokens_result = self.acquire_new_token()
+        if 'error' not in acquire_tokens_result and acquire_tokens_result['expires_in'] <= margin:
+            self.drop_cached_access_tokens()
+            acquire_tokens_result = self.acquire_new_token()
+        return acquire_tokens_result
+
+    def drop_cached_access_tokens(self) -> None:
+        cache = self.app.token_cache
+        for item in list(cache.search(cache.CredentialType.ACCESS_TOKEN, query = {"client_id": self.client_id})):
+            cache.remove_at(item)
+
+    def acquire_new_token(self) -> dict:
+        if isinstance(self.app, PublicClientApplication):
+            # https://msal-python.readthedocs.io/en/latest/#msal.PublicClientApplication.acquire_token_by_username_password
+            return self.app.acquire_token_by_username_password(
+                username = config.SERVICE_ACCOUNT_USERNAME,
+                password = config.SERVICE_ACCOUNT_PASSWORD,
+                scopes = config.SCOPE
+            )
+        elif isinstance(self.app, ConfidentialClientApplication):
+            # https://msal-python.readthedocs.io/en/latest/#msal.ConfidentialClientApplication.acquire_token_for_client
+            return self.app.acquire_token_for_client(
+                scopes = config.SCOPE
+            )
+
     def check_token_expiration(self):
-        if self.token_expiration < datetime.utcnow():
-            self.request_bearer_token()
+        remaining = self.token_expiration - datetime.utcnow()
+
+        if remaining <= timedelta(0):
+            # Only the first token, or one the background refresh failed to renew in time, is acquired on the request path.
+            # Concurrent callers wait for a single renewal instead of each requesting a token.
+            with self._token_lock:
+                if self.token_expiration < datetime.utcnow():
+                    self.request_bearer_token()
+            self.start_token_refresher()
+        elif remaining <= self.token_refresh_margin:
+            # Still valid, the background thread renews it
+            self.start_token_refresher()
         else:
             logging.debug("Access token exists and is not expired. Proceeding to use existing token.")
 
-    def force_raise_http_error(self, response: int):
-        logging.error(f"Expected response codes: {self.expected_codes}, response was: {response.status_code}: {response.text}.")
-        response.raise_for_status()
-        raise requests.HTTPError(response)
-    
\ No newline at end of file
+    def start_token_refresher(self) -> None:
+        if self._token_refresher_stop.is_set() or (self._token_refresher is not None and self._token_refresher.is_alive()):
+            return
+        with self._token_lock:
+            if self._token_refresher is None or not self._token_refresher.is_alive():
+                # The thread only holds a weak reference, so it does not keep an unclosed client alive
+                self._token_refresher = threading.Thread(
+                    target = RestClient.refresh_token_in_background,
+                    args = (weakref.ref(self), self._token_refresher_stop),
+                    name = "pbi-token-refresh",
+                    daemon = True
+                )
+                self._token_refresher.start()
+
+    @staticmethod
+    def refresh_token_in_background(client_ref: weakref.ref, stop: threading.Event) -> None:
+        ''' Renews the token TOKEN_REFRESH_MINUTES before it expires until the client is closed or collected '''
+        while not stop.is_set():
+            client = client_ref()
+            if client is None:
+                return
+            delay = client.renew_token_if_due()
+            del client
+            stop.wait(delay)
+
+    def renew_token_if_due(self) -> float:
+        ''' Renews the token when it is inside the refresh margin and returns the seconds until the next check '''
+        margin = self.token_refresh_margin
+        delay = (self.token_expiration - margin - datetime.utcnow()).total_seconds()
+        if delay > 0:
+            return delay
+
+        try:
+            with self._token_lock:
+                if self.token_expiration - datetime.utcnow() <= margin:
+                    self.request_bearer_token()
+        except Exception as error:
+            logging.warning(f"Background token refresh failed, retrying in {TOKEN_REFRESH_RETRY}s: {error}")
+            return TOKEN_REFRESH_RETRY
+
+        remaining = (self.token_expiration - datetime.utcnow()).total_seconds()
+        if remaining <= margin.total_seconds():
+            # The new token is still inside the margin, e.g. tokens that live shorter than the margin. Try again later instead of spinning.
+            return min(TOKEN_REFRESH_RETRY, max(remaining / 2, 1.0))
+        return remaining - margin.total_seconds()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+import random
+import threading
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from time import monotonic
+from .config import BaseConfig
+
+config = BaseConfig()
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = None, backoff_base: float = None, backoff_max: float = None, retry_after_max: float = None, **kwargs):
+        ''' Decides whether and how long to wait before a request is retried
+        Args:
+            max_retries (int): Retries after the first attempt.
+            backoff_base (float): First backoff ceiling in seconds, doubled on each attempt.
+            backoff_max (float): Largest backoff ceiling in seconds.
+            retry_after_max (float): Upper bound applied to server supplied Retry-After values.
+            retry_statuses (tuple): Status codes that may be retried.
+            idempotent_methods (tuple): Verbs that may be retried after a server error or connection failure.
+        '''
+        self.max_retries = config.RETRY_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or config.RETRY_BACKOFF_BASE
+        self.backoff_max = backoff_max or config.RETRY_BACKOFF_MAX
+        self.retry_after_max = retry_after_max or config.RETRY_AFTER_MAX
+        self.retry_statuses = kwargs.get('retry_statuses', (429, 500, 502, 503, 504))
+        self.idempotent_methods = kwargs.get('idempotent_methods', ("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+    def should_retry(self, method: str, status_code: int, attempt: int) -> bool:
+        if attempt >= self.max_retries or status_code not in self.retry_statuses:
+            return False
+        # A throttled request was never processed, so it is safe to resend regardless of the verb
+        return status_code == 429 or method.upper() in self.idempotent_methods
+
+    def should_retry_error(self, method: str, attempt: int) -> bool:
+        return attempt < self.max_retries and method.upper() in self.idempotent_methods
+
+    def delay(self, attempt: int, headers: dict = None) -> float:
+        retry_after = self.retry_after(headers)
+        if retry_after is not None:
+            return min(retry_after, self.retry_after_max)
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def retry_after(self, headers: dict) -> float:
+        value = (headers or {}).get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+class TokenBucket:
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate: float, capacity: float = None):
+        ''' Request budget refilled at rate tokens per second up to capacity. A rate of zero or None disables the budget. '''
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, key, rate: float, capacity: float = None):
+        ''' Returns the bucket registered under key, so every client of the same tenant draws from one budget '''
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(rate, capacity)
+            return cls._shared[key]
+
+    def reserve(self, tokens: float = 1) -> float:
+        ''' Takes tokens from the bucket and returns the seconds the caller must wait before sending '''
+        with self._lock:
+            now = monotonic()
+            wait = max(0.0, self.blocked_until - now)
+            if not self.rate:
+                return wait
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def pause(self, seconds: float) -> None:
+        ''' Holds back every caller of this bucket, used when the service answers with Retry-After '''
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, monotonic() + seconds)
+
+class RetryMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.connection_errors = 0
+        self.backoff_seconds = 0.0
+        self.budget_wait_seconds = 0.0
+
+    def record_response(self, status_code: int) -> None:
+        with self._lock:
+            self.requests += 1
+            if status_code == 429:
+                self.throttled += 1
+            elif status_code >= 500:
+                self.server_errors += 1
+
+    def record_connection_error(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.connection_errors += 1
+
+    def record_retry(self, delay: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+
+    def record_budget_wait(self, delay: float) -> None:
+        with self._lock:
+            self.budget_wait_seconds += delay
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "server_errors": self.server_errors,
+                "connection_errors": self.connection_errors,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "budget_wait_seconds": round(self.budget_wait_seconds, 3)
+            }
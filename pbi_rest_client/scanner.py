@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+
+import logging
+
+from datetime import datetime, timezone
+from time import monotonic, sleep
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+from urllib.parse import urlencode
+from .config import BaseConfig
+from .polling import Job, Scheduler
+from .retry import TokenBucket
+
+config = BaseConfig()
+
+# Workspaces accepted by one getInfo request
+SCAN_BATCH_SIZE = 100
+
+class Catalog:
+    ARTIFACT_TYPES = ("reports", "dashboards", "datasets", "dataflows", "datamarts")
+
+    def __init__(self):
+        ''' In-memory inventory of workspaces and their artifacts, merged from scan results and keyed by id '''
+        self.workspaces = {}
+        self.artifacts = {artifact_type: {} for artifact_type in Catalog.ARTIFACT_TYPES}
+        self.datasource_instances = {}
+        # Artifact ids per workspace, so rescanning a workspace does not walk the whole catalog
+        self.workspace_artifacts = {}
+        self.errors = []
+        self.scanned_at = None
+
+    def merge(self, scan_result: Dict) -> None:
+        ''' Adds or replaces the workspaces of a scan result. Artifacts of a rescanned workspace that are no longer present are dropped. '''
+        for workspace in scan_result.get('workspaces', []):
+            workspace_id = workspace['id']
+            previous = self.workspace_artifacts.get(workspace_id, {})
+            current = self.workspace_artifacts[workspace_id] = {}
+            for artifact_type in Catalog.ARTIFACT_TYPES:
+                items = self.artifacts[artifact_type]
+                for artifact_id in previous.get(artifact_type, ()):
+                    items.pop(artifact_id, None)
+                for item in workspace.get(artifact_type) or []:
+                    items[item['id']] = dict(item, workspaceId = workspace_id)
+                current[artifact_type] = [item['id'] for item in workspace.get(artifact_type) or []]
+            self.workspaces[workspace_id] = {key: value for key, value in workspace.items() if key not in Catalog.ARTIFACT_TYPES}
+
+        for instance in scan_result.get('datasourceInstances') or []:
+            self.datasource_instances[instance.get('datasourceId')] = instance
+
+    def find(self, artifact_type: str, name: str, workspace_id: str = None) -> List[Dict]:
+        ''' Returns the artifacts of a type with the given name, optionally limited to one workspace '''
+        return [
+            item for item in self.artifacts[artifact_type].values()
+            if item.get('name') == name and (workspace_id is None or item.get('workspaceId') == workspace_id)
+        ]
+
+    def in_workspace(self, artifact_type: str, workspace_id: str) -> List[Dict]:
+        items = self.artifacts[artifact_type]
+        return [items[artifact_id] for artifact_id in self.workspace_artifacts.get(workspace_id, {}).get(artifact_type, ()) if artifact_id in items]
+
+    def summary(self) -> Dict:
+        counts = {artifact_type: len(items) for artifact_type, items in self.artifacts.items()}
+        return dict(counts, workspaces = len(self.workspaces), datasource_instances = len(self.datasource_instances), errors = len(self.errors))
+
+class ScanJob(Job):
+    def __init__(self, workspace_ids: List[str], options: Dict, catalog: Catalog):
+        super().__init__()
+        self.workspace_ids = workspace_ids
+        self.options = options
+        self.catalog = catalog
+        self.scan_id = None
+        # Set once the scan succeeded and a scanResult request has been reserved from the budget
+        self.result_reserved = False
+
+class Scanner(Scheduler):
+    def __init__(self, client, max_concurrent_scans: int = None, max_downloads: int = None):
+        ''' Inventories the tenant through the admin Scanner API. The principal needs Tenant.Read.All or admin API access for service principals.
+        Args:
+            max_concurrent_scans (int): Scans running at the same time, the service allows 16.
+            max_downloads (int): Scan results downloaded at the same time.
+        '''
+        self.client = client
+        self.max_concurrent_scans = min(max_concurrent_scans or config.SCAN_MAX_CONCURRENT, 16)
+        self.max_downloads = max_downloads or config.BULK_MAX_WORKERS
+        # getInfo and scanResult are limited per tenant per hour
+        per_hour = config.SCAN_REQUESTS_PER_HOUR
+        self.get_info_budget = TokenBucket.shared(("scanner-get-info", config.POWER_BI_TENANT_ID), per_hour / 3600, per_hour)
+        self.scan_result_budget = TokenBucket.shared(("scanner-scan-result", config.POWER_BI_TENANT_ID), per_hour / 3600, per_hour)
+
+    def wait_for(self, budget: TokenBucket) -> None:
+        delay = budget.reserve()
+        if delay > 0:
+            logging.info(f"Waiting {delay:.1f}s for the scanner API hourly budget.")
+            sleep(delay)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/admin/workspace-info-get-modified-workspaces
+    def get_modified_workspaces(self, modified_since: datetime = None, exclude_personal_workspaces: bool = True, exclude_inactive_workspaces: bool = False) -> List[str]:
+        ''' Returns the ids of workspaces modified since the given time, or of all workspaces when it is None.
+        The service only accepts a modifiedSince within the last 30 days.
+        '''
+        self.client.check_token_expiration()
+
+        params = {
+            "excludePersonalWorkspaces": str(exclude_personal_workspaces),
+            "excludeInActiveWorkspaces": str(exclude_inactive_workspaces)
+        }
+        if modified_since is not None:
+            if modified_since.tzinfo is None:
+                modified_since = modified_since.replace(tzinfo = timezone.utc)
+            params["modifiedSince"] = modified_since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+        url = self.client.base_url + "admin/workspaces/modified?" + urlencode(params)
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            workspace_ids = [item['id'] for item in response.json()]
+            logging.info(f"Found {len(workspace_ids)} modified workspaces.")
+            return workspace_ids
+        else:
+            logging.error("Failed to retrieve modified workspaces.")
+            self.client.force_raise_http_error(response)
+
+    def start_scan(self, workspace_ids: List[str], **kwargs) -> str:
+        ''' Starts a scan of up to 100 workspaces once the getInfo budget allows and returns the scan id
+        Args:
+            lineage (bool): Include lineage between artifacts and upstream dataflows.
+            datasource_details (bool): Include datasources and datasource instances.
+            dataset_schema (bool): Include tables, columns and measures.
+            dataset_expressions (bool): Include DAX and Mashup expressions.
+            artifact_users (bool): Include the users of each artifact.
+        '''
+        self.wait_for(self.get_info_budget)
+        return self.post_scan(workspace_ids, **kwargs)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/admin/workspace-info-post-workspace-info
+    def post_scan(self, workspace_ids: List[str], **kwargs) -> str:
+        ''' Same as start_scan for a caller that has already reserved the request from get_info_budget '''
+        self.client.check_token_expiration()
+
+        params = {
+            "lineage": kwargs.get('lineage', True),
+            "datasourceDetails": kwargs.get('datasource_details', True),
+            "datasetSchema": kwargs.get('dataset_schema', False),
+            "datasetExpressions": kwargs.get('dataset_expressions', False),
+            "getArtifactUsers": kwargs.get('artifact_users', False)
+        }
+        url = self.client.base_url + "admin/workspaces/getInfo?" + urlencode({key: str(value) for key, value in params.items()})
+
+        response = self.client.post(url, json = {"workspaces": list(workspace_ids)}, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_accepted_code:
+            scan_id = response.json()['id']
+            logging.info(f"Started scan {scan_id} of {len(workspace_ids)} workspaces.")
+            return scan_id
+        else:
+            logging.error("Failed to start workspace scan.")
+            self.client.force_raise_http_error(response)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/admin/workspace-info-get-scan-status
+    def get_scan_status(self, scan_id: str) -> Dict:
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "admin/workspaces/scanStatus/" + scan_id
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            return response.json()
+        else:
+            logging.error("Failed to retrieve status of scan: " + scan_id)
+            self.client.force_raise_http_error(response)
+
+    def get_scan_result(self, scan_id: str) -> Dict:
+        ''' Returns the result of a finished scan once the scanResult budget allows '''
+        self.wait_for(self.scan_result_budget)
+        return self.read_scan_result(scan_id)
+
+    # https://docs.microsoft.com/en-us/rest/api/power-bi/admin/workspace-info-get-scan-result
+    def read_scan_result(self, scan_id: str) -> Dict:
+        ''' Same as get_scan_result for a caller that has already reserved the request from scan_result_budget '''
+        self.client.check_token_expiration()
+
+        url = self.client.base_url + "admin/workspaces/scanResult/" + scan_id
+
+        response = self.client.get(url, headers = self.client.json_headers)
+
+        if response.status_code == self.client.http_ok_code:
+            return response.json()
+        else:
+            logging.error("Failed to retrieve result of scan: " + scan_id)
+            self.client.force_raise_http_error(response)
+
+    def scan(self, workspace_ids: Iterable[str] = None, modified_since: datetime = None, catalog: Catalog = None, **kwargs) -> Catalog:
+        ''' Scans workspaces in batches of 100 with up to max_concurrent_scans running at once and merges the results
+        Args:
+            workspace_ids (iterable): Workspaces to scan. By default every workspace modified since modified_since, or all workspaces.
+            modified_since (datetime): Only used when workspace_ids is not given.
+            catalog (Catalog): Catalog to merge into, a new one by default.
+            kwargs: Scan options passed to start_scan.
+        Returns:
+            Catalog: The merged catalog. Failed batches are listed in catalog.errors.
+        '''
+        started_at = datetime.now(timezone.utc)
+        started = monotonic()
+        catalog = catalog or Catalog()
+
+        if workspace_ids is None:
+            workspace_ids = self.get_modified_workspaces(modified_since)
+        workspace_ids = list(workspace_ids)
+
+        jobs = [
+            ScanJob(workspace_ids[index:index + SCAN_BATCH_SIZE], kwargs, catalog)
+            for index in range(0, len(workspace_ids), SCAN_BATCH_SIZE)
+        ]
+        self.run_jobs(jobs, self.max_downloads, "pbi-scan")
+
+        for job in jobs:
+            if job.status == "Failed":
+                catalog.errors.append({"scan_id": job.scan_id, "workspace_ids": job.workspace_ids, "error": str(job.error)})
+
+        catalog.scanned_at = started_at
+        logging.info(f"Scanned {len(workspace_ids)} workspaces in {len(jobs)} batches in {monotonic() - started:.1f}s: {catalog.summary()}")
+        return catalog
+
+    def start_jobs(self, jobs: List[ScanJob], executor: ThreadPoolExecutor, downloads: Dict) -> None:
+        running = sum(1 for job in jobs if job.status in ("Running", "Downloading"))
+
+        for job in jobs:
+            if running >= self.max_concurrent_scans:
+                return
+            if job.status != "Pending":
+                continue
+
+            # The budget wait becomes the job's first poll time instead of blocking the scheduler
+            delay = self.get_info_budget.reserve()
+            job.started = monotonic()
+            job.status = "Running"
+            running += 1
+            if delay > 0:
+                logging.info(f"Scan of {len(job.workspace_ids)} workspaces starts in {delay:.1f}s, waiting for the scanner API hourly budget.")
+                job.next_poll = job.started + delay
+            else:
+                self.post_job(job)
+
+    def post_job(self, job: ScanJob) -> None:
+        try:
+            job.scan_id = self.post_scan(job.workspace_ids, **job.options)
+        except Exception as error:
+            logging.error(f"Failed to start scan of {len(job.workspace_ids)} workspaces: {error}")
+            job.finish("Failed", error)
+            return
+        job.next_poll = monotonic() + job.backoff.next()
+
+    def poll_jobs(self, jobs: List[ScanJob], executor: ThreadPoolExecutor, downloads: Dict) -> None:
+        now = monotonic()
+
+        for job in jobs:
+            if job.status != "Running" or job.next_poll > now:
+                continue
+            if job.scan_id is None:
+                self.post_job(job)
+                continue
+            if job.result_reserved:
+                job.status = "Downloading"
+                downloads[executor.submit(self.read_scan_result, job.scan_id)] = job
+                continue
+            try:
+                status = self.get_scan_status(job.scan_id)['status']
+            except Exception as error:
+                logging.error(f"Failed to poll scan {job.scan_id}: {error}")
+                job.finish("Failed", error)
+                continue
+
+            if status == "Succeeded":
+                delay = self.scan_result_budget.reserve()
+                job.result_reserved = True
+                job.next_poll = monotonic() + delay
+                if delay > 0:
+                    logging.info(f"Result of scan {job.scan_id} is read in {delay:.1f}s, waiting for the scanner API hourly budget.")
+                else:
+                    job.status = "Downloading"
+                    downloads[executor.submit(self.read_scan_result, job.scan_id)] = job
+            elif status == "Failed":
+                job.finish("Failed", RuntimeError(f"Scan {job.scan_id} failed."))
+            else:
+                job.next_poll = monotonic() + job.backoff.next()
+
+    def collect_jobs(self, downloads: Dict) -> None:
+        # Results are merged on the scheduler thread, so the catalog needs no locking
+        for future in [future for future in downloads if future.done()]:
+            job = downloads.pop(future)
+            try:
+                job.catalog.merge(future.result())
+            except Exception as error:
+                logging.error(f"Failed to retrieve result of scan {job.scan_id}: {error}")
+                job.finish("Failed", error)
+                continue
+            job.finish("Succeeded")
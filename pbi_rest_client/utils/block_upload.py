@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+import base64
+import logging
+import os
+
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator
+from ..config import BaseConfig
+
+config = BaseConfig()
+
+class BlockUploader:
+    def __init__(self, block_size: int = None, max_workers: int = None):
+        ''' Uploads a local file or a stream of chunks to a block blob in parallel blocks
+        Args:
+            block_size (int): Size of each staged block in bytes.
+            max_workers (int): Blocks staged at the same time. Memory use is roughly block_size * max_workers.
+        '''
+        self.block_size = block_size or config.IMPORT_BLOCK_SIZE
+        self.max_workers = max_workers or config.IMPORT_UPLOAD_WORKERS
+
+    @staticmethod
+    def block_id(index: int) -> str:
+        # Ids are derived from the block position, so a rerun produces the same ids and can skip staged blocks
+        return base64.b64encode(f"{index:08d}".encode("utf-8")).decode("utf-8")
+
+    def blocks(self, size: int) -> list:
+        ''' Returns (block_id, offset, length) for every block of a file of the given size '''
+        return [
+            (self.block_id(index), offset, min(self.block_size, size - offset))
+            for index, offset in enumerate(range(0, size, self.block_size))
+        ]
+
+    def staged_blocks(self, blob) -> dict:
+        ''' Returns block id to size for the uncommitted blocks already on the blob '''
+        _, uncommitted = blob.get_block_list('uncommitted')
+        return {block.id: block.size for block in uncommitted}
+
+    def stage(self, blob, file_name: str, block_id: str, offset: int, length: int) -> int:
+        with open(file_name, 'rb') as file:
+            file.seek(offset)
+            data = file.read(length)
+        blob.stage_block(block_id, data, length = length)
+        return length
+
+    def stage_data(self, blob, block_id: str, data: bytes) -> int:
+        blob.stage_block(block_id, data, length = len(data))
+        return len(data)
+
+    def rechunk(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        ''' Joins or splits incoming chunks into blocks of block_size bytes, the last block may be shorter '''
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer += chunk
+            while len(buffer) >= self.block_size:
+                yield bytes(buffer[:self.block_size])
+                del buffer[:self.block_size]
+        if buffer:
+            yield bytes(buffer)
+
+    def upload_chunks(self, blob, chunks: Iterable[bytes], total: int = None, progress: Callable[[int, int], None] = None) -> dict:
+        ''' Stages a stream of chunks as blocks while it is being read and commits them, replacing the blob content.
+        At most max_workers blocks are held in memory, reading pauses until a staged block completes.
+        Args:
+            blob (BlobClient): Destination block blob.
+            chunks (iterable): Content of the blob, e.g. a response body read with iter_content.
+            total (int): Expected size in bytes if known, only used for progress reporting.
+            progress (callable): Called with (bytes_uploaded, total) after every staged block.
+        Returns:
+            dict: Bytes uploaded, block count and throughput.
+        '''
+        started = monotonic()
+        block_ids = []
+        in_flight = set()
+        uploaded = 0
+
+        def collect(done) -> None:
+            nonlocal uploaded
+            for future in done:
+                uploaded += future.result()
+                logging.info(f"Staged {uploaded}" + (f" of {total}" if total else "") + f" bytes to {blob.blob_name}.")
+                if progress is not None:
+                    progress(uploaded, total)
+
+        with ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = "pbi-block") as executor:
+            for data in self.rechunk(chunks):
+                if len(in_flight) >= self.max_workers:
+                    done, in_flight = wait(in_flight, return_when = FIRST_COMPLETED)
+                    collect(done)
+                block_id = self.block_id(len(block_ids))
+                block_ids.append(block_id)
+                in_flight.add(executor.submit(self.stage_data, blob, block_id, data))
+            collect(wait(in_flight).done)
+
+        self.commit(blob, block_ids)
+        return self.stats(uploaded, len(block_ids), uploaded, 0, started)
+
+    def commit(self, blob, block_ids: list) -> None:
+        from azure.storage.blob import BlobBlock
+
+        blob.commit_block_list([BlobBlock(block_id = block_id) for block_id in block_ids])
+
+    def stats(self, size: int, blocks: int, uploaded: int, skipped: int, started: float) -> dict:
+        seconds = monotonic() - started
+        return {
+            "size": size,
+            "blocks": blocks,
+            "uploaded_bytes": uploaded,
+            "skipped_bytes": skipped,
+            "seconds": round(seconds, 3),
+            "bytes_per_second": round(uploaded / seconds) if seconds > 0 else None
+        }
+
+    def upload_file(self, blob, file_name: str) -> dict:
+        ''' Stages the missing blocks of the file and commits the block list
+        Returns:
+            dict: Bytes uploaded and skipped, block count and throughput.
+        '''
+        size = os.path.getsize(file_name)
+        blocks = self.blocks(size)
+        staged = self.staged_blocks(blob)
+        pending = [block for block in blocks if staged.get(block[0]) != block[2]]
+        skipped = sum(length for _, _, length in blocks) - sum(length for _, _, length in pending)
+
+        if skipped:
+            logging.info(f"Resuming upload of {file_name}: {len(blocks) - len(pending)} of {len(blocks)} blocks already staged.")
+
+        started = monotonic()
+        uploaded = 0
+        with ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = "pbi-block") as executor:
+            futures = [executor.submit(self.stage, blob, file_name, *block) for block in pending]
+            for count, future in enumerate(futures, 1):
+                uploaded += future.result()
+                logging.info(f"Staged block {count} of {len(pending)} for {file_name} ({uploaded + skipped} of {size} bytes).")
+
+        self.commit(blob, [block_id for block_id, _, _ in blocks])
+        return self.stats(size, len(blocks), uploaded, skipped, started)
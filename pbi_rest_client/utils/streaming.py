@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import io
+
+from itertools import chain
+from typing import Callable, Iterator
+from uuid import uuid4
+
+class MultipartStream:
+    def __init__(self, field_name: str, file_name: str, open_chunks: Callable[[], Iterator[bytes]], size: int, content_type: str = 'application/octet-stream'):
+        ''' Read-only file object that produces a multipart/form-data body around a stream of file chunks
+        Args:
+            field_name (string): Form field name of the file part.
+            file_name (string): File name reported in the Content-Disposition header.
+            open_chunks (callable): Returns a fresh iterator over the file content. Called again when the body is rewound for a retry.
+            size (int): Exact size of the file content in bytes, used for the Content-Length header.
+            content_type (string): Content type of the file part.
+        '''
+        self.boundary = uuid4().hex
+        self.size = size
+        self._open_chunks = open_chunks
+        self._head = (
+            f"--{self.boundary}\r\n"
+            + f"Content-Disposition: form-data; name=\"{field_name}\"; filename=\"{file_name}\"\r\n"
+            + f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self.seek(0)
+
+    @classmethod
+    def from_blob(cls, blob, field_name: str, file_name: str):
+        ''' Streams a blob through the multipart body one download chunk at a time, without a local copy '''
+        size = blob.get_blob_properties().size
+        return cls(field_name, file_name, lambda: blob.download_blob().chunks(), size)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return len(self._head) + self.size + len(self._tail)
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        # Only rewinding is supported, which restarts the underlying download
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("MultipartStream can only be rewound to the start.")
+        self._parts = chain([self._head], self._open_chunks(), [self._tail])
+        self._buffer = memoryview(b"")
+        self._position = 0
+        return 0
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self) - self._position
+
+        out = bytearray()
+        while len(out) < size:
+            if not self._buffer:
+                part = next(self._parts, None)
+                if part is None:
+                    break
+                self._buffer = memoryview(part)
+                continue
+            take = self._buffer[:size - len(out)]
+            out += take
+            self._buffer = self._buffer[len(take):]
+
+        self._position += len(out)
+        return bytes(out)
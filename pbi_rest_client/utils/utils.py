@@ -1,50 +1,197 @@
 #!/usr/bin/env python
 
 import logging
+import threading
 
-from azure.identity import ClientSecretCredential
-from azure.storage.blob import BlobClient
-from azure.keyvault.secrets import SecretClient
-from azure.appconfiguration import AzureAppConfigurationClient, FeatureFlagConfigurationSetting
+from time import monotonic
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
 from ..config import BaseConfig
+from ..cache import TTLCache
 
 config = BaseConfig()
 
+# Cached secrets are dropped this many seconds before the secret itself expires in Key Vault
+SECRET_EXPIRY_MARGIN = 60
+
 class Utils:
-    storage_account_credential = ClientSecretCredential(config.STORAGE_ACCOUNT_TENANT_ID, config.STORAGE_ACCOUNT_CLIENT_ID, config.STORAGE_ACCOUNT_CLIENT_SECRET)
-    app_config_credential = ClientSecretCredential(config.APP_CONFIG_TENANT_ID, config.APP_CONFIG_CLIENT_ID, config.APP_CONFIG_CLIENT_SECRET)
-    key_vault_credential = ClientSecretCredential(config.KEY_VAULT_TENANT_ID, config.KEY_VAULT_CLIENT_ID, config.KEY_VAULT_CLIENT_SECRET)
+    # Credentials are shared by every instance and created on first use, keyed by the config prefix of the service
+    _credentials = {}
+    _credentials_lock = threading.Lock()
+    # One listing of every App Configuration setting by key, shared by every instance and revalidated through the sentinel key
+    _snapshot = None
+    _snapshot_expires = 0.0
+    _snapshot_lock = threading.Lock()
+    # Secret values by name, with one lock per name so concurrent readers of a missing secret fetch it once
+    _secrets = TTLCache(config.KEY_VAULT_CACHE_TTL)
+    _secret_locks = {}
+    _secret_locks_lock = threading.Lock()
 
     def __init__(self) -> None:
-        self.app_config_client = AzureAppConfigurationClient(base_url = config.APP_CONFIG_URI, credential = Utils.app_config_credential)
-        self.key_vault_secret_client = SecretClient(vault_url = config.KEY_VAULT_URI, credential = Utils.key_vault_credential)
+        # Azure SDK clients and the service-account flag are created on first use, so constructing Utils is free
+        self._app_config_client = None
+        self._key_vault_secret_client = None
+        self._auth_mode = None
         self.secret = None
         self.workspaces = {}
         self.feature_flags = {}
-        self.auth_mode = self.get_appconfig_feature_flags('service-account')['enabled']
 
-    def get_keyvault_secret(self, secret_name: str)  -> None:
-        logging.info(f"Retrieving your secret from {config.KEY_VAULT_NAME}.")
+    @classmethod
+    def credential(cls, prefix: str):
+        with cls._credentials_lock:
+            if prefix not in cls._credentials:
+                from azure.identity import ClientSecretCredential
+                cls._credentials[prefix] = ClientSecretCredential(
+                    getattr(config, prefix + "_TENANT_ID"),
+                    getattr(config, prefix + "_CLIENT_ID"),
+                    getattr(config, prefix + "_CLIENT_SECRET")
+                )
+            return cls._credentials[prefix]
+
+    @property
+    def storage_account_credential(self):
+        return Utils.credential("STORAGE_ACCOUNT")
+
+    @property
+    def app_config_credential(self):
+        return Utils.credential("APP_CONFIG")
+
+    @property
+    def key_vault_credential(self):
+        return Utils.credential("KEY_VAULT")
+
+    @property
+    def app_config_client(self):
+        if self._app_config_client is None:
+            from azure.appconfiguration import AzureAppConfigurationClient
+            self._app_config_client = AzureAppConfigurationClient(base_url = config.APP_CONFIG_URI, credential = self.app_config_credential)
+        return self._app_config_client
+
+    @property
+    def key_vault_secret_client(self):
+        if self._key_vault_secret_client is None:
+            from azure.keyvault.secrets import SecretClient
+            self._key_vault_secret_client = SecretClient(vault_url = config.KEY_VAULT_URI, credential = self.key_vault_credential)
+        return self._key_vault_secret_client
+
+    @property
+    def auth_mode(self) -> bool:
+        if self._auth_mode is None:
+            self._auth_mode = self.get_appconfig_feature_flags('service-account')['enabled']
+        return self._auth_mode
+
+    def get_keyvault_secret(self, secret_name: str, refresh: bool = False) -> str:
+        self.secret = self.keyvault_secret(secret_name, refresh)
+        return self.secret
+
+    def keyvault_secret(self, secret_name: str, refresh: bool = False) -> str:
+        ''' Returns a secret from the cache shared by every instance, fetching it from Key Vault when missing or stale
+        Args:
+            secret_name (string): Name of the secret in Key Vault.
+            refresh (bool): Skip the cache and fetch the current value.
+        '''
+        if not refresh:
+            value = Utils._secrets.get(("secret", secret_name))
+            if value is not None:
+                return value
+
+        with self.secret_lock(secret_name):
+            value = None if refresh else Utils._secrets.get(("secret", secret_name))
+            if value is None:
+                logging.info(f"Retrieving your secret from {config.KEY_VAULT_NAME}.")
+                retrieved_secret = self.key_vault_secret_client.get_secret(secret_name)
+                value = retrieved_secret.value
+                Utils._secrets.set(("secret", secret_name), value, self.secret_ttl(retrieved_secret.properties.expires_on))
+            return value
+
+    def secret_ttl(self, expires_on: datetime) -> float:
+        # Never serve a secret past its expiry date, a value of zero or less leaves it uncached
+        ttl = config.KEY_VAULT_CACHE_TTL
+        if expires_on is not None:
+            ttl = min(ttl, (expires_on - datetime.now(timezone.utc)).total_seconds() - SECRET_EXPIRY_MARGIN)
+        return ttl
+
+    def secret_lock(self, secret_name: str) -> threading.Lock:
+        with Utils._secret_locks_lock:
+            return Utils._secret_locks.setdefault(secret_name, threading.Lock())
+
+    def prefetch_keyvault_secrets(self, secret_names: Iterable[str], max_workers: int = None) -> Dict[str, str]:
+        ''' Fetches secrets concurrently into the cache, so later reads do not wait on Key Vault
+        Returns:
+            dict: Secret values by name.
+        '''
+        secret_names = list(dict.fromkeys(secret_names))
+        with ThreadPoolExecutor(max_workers = max_workers or config.KEY_VAULT_MAX_WORKERS, thread_name_prefix = "pbi-secret") as executor:
+            return dict(zip(secret_names, executor.map(self.keyvault_secret, secret_names)))
 
-        retrieved_secret = self.key_vault_secret_client.get_secret(secret_name)
-        self.secret = retrieved_secret.value
+    def invalidate_keyvault_secrets(self, *secret_names: str) -> None:
+        if not secret_names:
+            Utils._secrets.invalidate("secret")
+        for secret_name in secret_names:
+            Utils._secrets.invalidate("secret", secret_name)
     
+    def appconfig_snapshot(self, refresh: bool = False) -> dict:
+        ''' Returns every unlabelled App Configuration setting by key from a single listing call. Once the TTL has passed the sentinel key
+        is checked with its ETag and the listing is only fetched again when the sentinel changed, so updating the sentinel
+        after changing other settings publishes them. Without a sentinel key the listing is fetched again on expiry.
+        '''
+        with Utils._snapshot_lock:
+            if Utils._snapshot is not None and not refresh and monotonic() < Utils._snapshot_expires:
+                return Utils._snapshot
+
+            if refresh or Utils._snapshot is None or self.appconfig_changed(Utils._snapshot):
+                logging.info(f"Loading configuration snapshot from {config.APP_CONFIG_NAME}.")
+                # Only unlabelled settings, the ones get_configuration_setting returns, so labelled variants of a key do not replace them
+                settings = self.app_config_client.list_configuration_settings(label_filter = "\0")
+                Utils._snapshot = {item.key: item for item in settings}
+
+            Utils._snapshot_expires = monotonic() + config.APP_CONFIG_CACHE_TTL
+            return Utils._snapshot
+
+    def appconfig_changed(self, snapshot: dict) -> bool:
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceNotFoundError
+
+        sentinel = snapshot.get(config.APP_CONFIG_SENTINEL_KEY)
+        if sentinel is None:
+            return True
+
+        try:
+            # Returns None when the sentinel still has the same ETag
+            current = self.app_config_client.get_configuration_setting(
+                sentinel.key, label = sentinel.label, etag = sentinel.etag, match_condition = MatchConditions.IfModified
+            )
+        except ResourceNotFoundError:
+            return True
+
+        return current is not None
+
+    def key_matches(self, key: str, key_filter: str) -> bool:
+        # Same rules as the service: comma separated keys, each either exact or ending in a * prefix wildcard
+        for pattern in key_filter.split(','):
+            if key == pattern or (pattern.endswith('*') and key.startswith(pattern[:-1])):
+                return True
+        return False
+
     def get_appconfig_keys(self, **kwargs) -> None:
         key_filter = kwargs.get('key_filter', None)
 
-        if key_filter != None:
-            list_keys = self.app_config_client.list_configuration_settings(key_filter=key_filter)
-        else:
-            list_keys = self.app_config_client.list_configuration_settings()
-        
-        for item in list_keys:
-            self.workspaces[item.key] = item.value
+        for key, item in self.appconfig_snapshot().items():
+            if key_filter == None or self.key_matches(key, key_filter):
+                self.workspaces[key] = item.value
         
         return self.workspaces
 
     def get_appconfig_feature_flags(self, feature_flag_name: str) -> None:
+        from azure.appconfiguration import FeatureFlagConfigurationSetting
+
         feature_flag_config_setting = FeatureFlagConfigurationSetting(feature_id = feature_flag_name)
-        feature_flag = self.app_config_client.get_configuration_setting(feature_flag_config_setting.key)
+        feature_flag = self.appconfig_snapshot().get(feature_flag_config_setting.key)
+
+        if not isinstance(feature_flag, FeatureFlagConfigurationSetting):
+            # Not in the snapshot, ask the service directly so a missing flag fails as it always has
+            feature_flag = self.app_config_client.get_configuration_setting(feature_flag_config_setting.key)
 
         self.feature_flags['key'] = feature_flag.key
         self.feature_flags['feature_id'] = feature_flag.feature_id
@@ -53,12 +200,15 @@ class Utils:
         
         return self.feature_flags
     
-    def blob_client(self, blob_name: str):
+    def blob_client(self, blob_name: str, **kwargs):
+        from azure.storage.blob import BlobClient
+
         blob_client = BlobClient(
             account_url = config.STORAGE_ACCOUNT_URI,
             container_name = config.STORAGE_BLOB_CONTAINER_NAME,
             blob_name = blob_name,
-            credential = Utils.storage_account_credential
+            credential = self.storage_account_credential,
+            **kwargs
         )
 
         return blob_client
\ No newline at end of file
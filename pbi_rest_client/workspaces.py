@@ -1,9 +1,8 @@
 #!/usr/bin/env python
 
 import logging
-import requests
 
-from typing import List
+from typing import Iterator, List
 
 class Workspaces:
     def __init__(self, client):
@@ -17,7 +16,7 @@ class Workspaces:
 
         url = self.client.base_url + "groups?$filter=" + "name eq '" + workspace_name + "'"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             if response.json()["@odata.count"] <= 0:
@@ -31,34 +30,33 @@ class Workspaces:
             self.client.force_raise_http_error(response)
 
     # https://docs.microsoft.com/en-us/rest/api/power-bi/groups/get-groups
-    def get_workspaces(self) -> List:
+    def iter_workspaces(self, page_size: int = None) -> Iterator[dict]:
         self.client.check_token_expiration()
 
         url = self.client.base_url + "groups"
-        
-        response = requests.get(url, headers = self.client.json_headers)
 
-        if response.status_code == self.client.http_ok_code:
-            logging.info("Successfully retrieved workspaces.")
-            self.workspaces = response.json()["value"]
-            return self.workspaces
-        else:
-            logging.error("Failed to retrieve workspaces.")
-            self.client.force_raise_http_error(response)
+        return self.client.iter_odata(url, page_size or self.client.odata_page_size)
+
+    def get_workspaces(self, page_size: int = None) -> List:
+        self.workspaces = list(self.iter_workspaces(page_size))
+        logging.info("Successfully retrieved workspaces.")
+        self.client.name_cache.set_listing(("groups",), self.workspaces)
+        return self.workspaces
 
     def get_workspace_id(self, workspace_name: str) -> str:
         self.client.check_token_expiration()
-        self.get_workspaces()
-        workspace_missing = True
-
-        for item in self.workspaces:
-            if item['name'] == workspace_name:
-                logging.info(f"Found workspace with name {workspace_name} and workspace id {item['id']}.")
-                self.workspace = {workspace_name: item['id']}
-                workspace_missing = False
-                return self.workspace
-        if workspace_missing:
+        item = self.find_workspace(workspace_name)
+
+        if item is None:
             logging.warning(f"Unable to find workspace with name: '{workspace_name}'")
+            return None
+
+        logging.info(f"Found workspace with name {workspace_name} and workspace id {item['id']}.")
+        self.workspace = {workspace_name: item['id']}
+        return self.workspace
+
+    def find_workspace(self, workspace_name: str) -> dict:
+        return self.client.name_cache.lookup(("groups",), workspace_name, self.get_workspaces)
     
     # https://docs.microsoft.com/en-us/rest/api/power-bi/groups/create-group
     def create_workspace(self, workspace_name: str) -> None:
@@ -78,11 +76,11 @@ class Workspaces:
             "name": workspace_name
         }
         
-        response = requests.post(url, data = payload, headers = self.client.url_encoded_headers)
+        response = self.client.post(url, data = payload, headers = self.client.url_encoded_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info(f"Successfully created workspace {workspace_name}.")
-            self.get_workspaces()
+            self.client.name_cache.invalidate("groups")
             return response.json()
         else:
             logging.error(f"Failed to create workspace {workspace_name}.")
@@ -95,7 +93,7 @@ class Workspaces:
 
         url = self.client.base_url + "groups/" + self.workspace[workspace_name] + "/users"
         
-        response = requests.get(url, headers = self.client.json_headers)
+        response = self.client.get(url, headers = self.client.json_headers)
 
         if response.status_code == self.client.http_ok_code:
             logging.info("Successfully retrieved workspace users.")
@@ -115,9 +113,9 @@ class Workspaces:
         if service_principal and not group and not user_account:
             principal_type = "App"
         elif group and not service_principal and not user_account:
-            principal_type = "User"
-        elif user_account and not service_principal and not group:
             principal_type = "Group"
+        elif user_account and not service_principal and not group:
+            principal_type = "User"
         else:
             logging.error("Only one principal type can be specified.")
             return False
@@ -128,7 +126,7 @@ class Workspaces:
             "principalType": principal_type
         }
 
-        response = requests.post(url, json = request_payload, headers = self.client.json_headers)
+        response = self.client.post(url, json = request_payload, headers = self.client.json_headers)
                    
         if response.status_code == self.client.http_ok_code:
             logging.info(f"Successfully assigned user to workspace: {workspace_name}.")